@@ -0,0 +1,86 @@
+"""
+Cost of the configuration work done by every 300 ms Regulation.run tick.
+
+Before: every tick parsed the settings strings and derived the regulation parameters.
+After: every tick reads the prebuilt ConfigSnapshot attributes.
+
+    python benchmarks/bench_config_snapshot.py
+    micropython benchmarks/bench_config_snapshot.py
+"""
+import sys
+import time
+
+sys.path.insert(0, __file__.rsplit('/', 2)[0] if '/' in __file__ else '..')
+
+from main.config_snapshot import ConfigSnapshot, FREQUENCY, WATTER_CONST
+
+TICKS = 20000
+
+DATA = {
+    'sw,TESTING SOFTWARE': '0', 'sw,Wi-Fi AP': '1', 'sw,AC IN ACTIVE: HIGH': '1', 'btn,BOOST-MODE': '0',
+    'in,OVERFLOW-OFFSET': '100', 'in,TUV-VOLUME': '200', 'in,TUV-POWER': '2200', 'in,NIGHT-BOOST': '64800',
+    'in,NIGHT-TEMPERATURE': '55', 'in,MORNING-BOOST': '21600', 'in,MORNING-TEMPERATURE': '40',
+    'in,BOOST-TIMEOUT': '120', 'in,TIME-ZONE': '2', 'in,STOP-SOC': '70', 'in,POWER-RELAY': '1000',
+    'in,TIMEOUT-RELAY': '10', 'in,RELAY-LOAD': '2000', 'DHCP': '1', 'BOOST': '0',
+    'sw,ADAPTIVE POLLING': '0', 'in,POLL-FLOOR': '100', 'in,POLL-CEILING': '300', 'in,SSR2-POWER': '0',
+    'in,SSR1-PRIORITY': '1', 'in,SSR2-PRIORITY': '2', 'in,RELAY-PRIORITY': '3', 'sw,SSR1 BOOST': '1',
+    'sw,SSR2 BOOST': '0', 'sw,RELAY BOOST': '0', 'sw,PI CONTROL': '0', 'in,PI-GAIN-P': '20', 'in,PI-GAIN-I': '60',
+}
+
+
+def legacy_tick(data):
+    # configuration work of the former Regulation.run, in the order it was executed per tick
+    power_step = int(data['in,TUV-POWER']) / (1000 / FREQUENCY / 20 * 2)
+    power_step_count = int(data['in,TUV-POWER']) / power_step
+    power_hyst = power_step / 4
+    overflow_limit = -int(data['in,OVERFLOW-OFFSET'])
+    if power_hyst > (-overflow_limit):
+        power_hyst = (-overflow_limit) - 10
+    tuv_energy_night = WATTER_CONST * int(data['in,TUV-VOLUME']) * (int(data['in,NIGHT-TEMPERATURE']) - 10) / 3600
+    sec_night_boost = tuv_energy_night * 3600 * 3 / 4 / int(data['in,TUV-POWER'])
+    tuv_energy_morning = WATTER_CONST * int(data['in,TUV-VOLUME']) * (int(data['in,MORNING-TEMPERATURE']) - 10) / 3600
+    sec_morning_boost = tuv_energy_night * 3600 * 3 / 4 / int(data['in,TUV-POWER'])
+    soc_stop = int(data['in,STOP-SOC'])
+    relay = int(data['in,POWER-RELAY']) + int(data['in,TIMEOUT-RELAY']) + int(data['in,RELAY-LOAD'])
+    boost = int(data['btn,BOOST-MODE']) + int(data['BOOST']) + int(data['in,BOOST-TIMEOUT'])
+    duty = int(data['in,TUV-POWER'])
+    return power_step_count + power_hyst + sec_night_boost + sec_morning_boost + tuv_energy_morning + soc_stop + relay + boost + duty
+
+
+def snapshot_tick(config, data):
+    power_step_count = config.power_step_count
+    power_hyst = config.power_hyst
+    sec_night_boost = config.sec_night_boost
+    sec_morning_boost = config.sec_morning_boost
+    soc_stop = config.stop_soc
+    relay = config.power_relay + config.timeout_relay + config.relay_load
+    boost = config.boost_mode + (data['BOOST'] != '0') + config.boost_timeout
+    duty = config.tuv_power
+    return power_step_count + power_hyst + sec_night_boost + sec_morning_boost + config.tuv_energy_morning + soc_stop + relay + boost + duty
+
+
+def timed(function, *args):
+    if hasattr(time, 'ticks_us'):
+        start = time.ticks_us()
+        for i in range(TICKS):
+            function(*args)
+        return time.ticks_diff(time.ticks_us(), start) / TICKS
+    start = time.perf_counter()
+    for i in range(TICKS):
+        function(*args)
+    return (time.perf_counter() - start) * 1e6 / TICKS
+
+
+def main():
+    config = ConfigSnapshot(DATA)
+    assert abs(legacy_tick(DATA) - snapshot_tick(config, DATA)) < 1e-6
+    legacy_us = timed(legacy_tick, DATA)
+    snapshot_us = timed(snapshot_tick, config, DATA)
+    rebuild_us = timed(ConfigSnapshot, DATA)
+    print("ticks: {}".format(TICKS))
+    print("parse per tick     {:8.2f} us/tick".format(legacy_us))
+    print("snapshot per tick  {:8.2f} us/tick".format(snapshot_us))
+    print("snapshot rebuild   {:8.2f} us (only on settings change)".format(rebuild_us))
+
+
+main()
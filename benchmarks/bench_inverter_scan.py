@@ -0,0 +1,232 @@
+"""
+Discovery, polling and reconnect of the inverter drivers against sim/inverter_server.py
+on the loopback subnet 127.0.0.0/24.
+
+Discovery: BaseInverter.scan_network over a subnet with the target, inverters of other
+vendors, silent hosts which accept connections but never answer and refusing addresses.
+Polling: driver.poll() round trips per second for several response latencies.
+Reconnect: time until try_reconnect finds the inverter again after it restarted, and
+poll errors with dropped requests.
+Group: InverterGroup.run cycle time with 1 to 4 inverters answering after 50 ms each, and
+two slots of the same vendor discovering two inverters from scann() in the same cycles.
+
+Runs on CPython with the sim/ stand-ins.
+
+    python benchmarks/bench_inverter_scan.py --vendor goodwe --silent 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sim"))
+
+import host
+
+host.install()
+
+import logging
+import replay
+from inverter_server import InverterServer, VENDORS, start_fleet, stop_fleet
+from wifi_manager import FakeWifiManager
+
+PORT: int = 1502
+DRIVERS: dict = {
+    "goodwe": ("main.inverters.goodwe", "Goodwe"),
+    "solax": ("main.inverters.solax", "Solax"),
+    "victron": ("main.inverters.victron", "Victron"),
+    "huawei": ("main.inverters.huawei", "Huawei"),
+    "rs485": ("main.inverters.rs485_tcp", "RS485_Tcp"),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendor", choices=sorted(DRIVERS), default="goodwe")
+    parser.add_argument("--target", type=int, default=120, help="last octet of the inverter address")
+    parser.add_argument("--decoys", type=int, default=8, help="inverters of other vendors in the subnet")
+    parser.add_argument("--silent", type=int, default=2, help="hosts which accept but never answer")
+    parser.add_argument("--polls", type=float, default=2.0, help="seconds of polling per latency")
+    return parser.parse_args()
+
+
+def make_driver(vendor: str, config=None, ip_key: str = "INVERTER_IP_ADDR"):
+    module, name = DRIVERS[vendor]
+    wattmeter = replay.Wattmeter()
+    wattmeter.data_layer.data["U1"] = 230
+    driver = getattr(__import__(module, None, None, [name]), name)(FakeWifiManager(ip="127.0.0.1"), config or replay.make_config(),
+                                                                   wattmeter=wattmeter, ip_key=ip_key)
+    driver.modbus_port = PORT
+    return driver
+
+
+def fleet(args) -> list:
+    servers: list = [InverterServer(args.vendor, "127.0.0.{}".format(args.target), PORT)]
+    others: list = [vendor for vendor in sorted(VENDORS) if vendor != args.vendor]
+    octet: int = 2
+    for i in range(args.decoys):
+        octet += 7
+        servers.append(InverterServer(others[i % len(others)], "127.0.0.{}".format(octet), PORT))
+    for i in range(args.silent):
+        octet += 7
+        servers.append(InverterServer(args.vendor, "127.0.0.{}".format(octet), PORT, silent=True))
+    return servers
+
+
+async def discovery(args, concurrency: int) -> tuple:
+    servers = await start_fleet(fleet(args))
+    driver = make_driver(args.vendor)
+    start = time.perf_counter()
+    modbus_tcp = await driver.scan_network(modbus_port=PORT, ip_address="127.0.0.1", slave_addr=VENDORS[args.vendor][1],
+                                           starting_addr=driver.device_type, number_of_reg=VENDORS[args.vendor][3].__len__(),
+                                           callback=driver.check_msg, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    found = modbus_tcp.slave_ip if modbus_tcp is not None else None
+    if modbus_tcp is not None:
+        await modbus_tcp.close()
+    await stop_fleet(servers)
+    return elapsed, found
+
+
+async def polling(args, latency: float) -> tuple:
+    server = InverterServer(args.vendor, "127.0.0.{}".format(args.target), PORT, latency=latency)
+    await server.start()
+    driver = make_driver(args.vendor)
+    driver.set_ip_address = server.host
+    driver.modbus_tcp = driver.use_connection(await driver.scan_ip_address(server.host, PORT, VENDORS[args.vendor][1],
+                                                                           driver.device_type, len(VENDORS[args.vendor][3]),
+                                                                           driver.check_msg))
+    polls: int = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.polls:
+        await driver.poll()
+        polls += 1
+    elapsed = time.perf_counter() - start
+    await driver.modbus_tcp.close()
+    await server.stop()
+    return polls / elapsed, server.requests / polls, driver.data_layer.data["p1"]
+
+
+async def reconnect(args) -> tuple:
+    address: str = "127.0.0.{}".format(args.target)
+    server = InverterServer(args.vendor, address, PORT)
+    await server.start()
+    driver = make_driver(args.vendor)
+    ident: int = len(VENDORS[args.vendor][3])
+    driver.modbus_tcp = await driver.scan_ip_address(address, PORT, VENDORS[args.vendor][1], driver.device_type, ident, driver.check_msg)
+    await server.stop()
+    await driver.modbus_tcp.close()
+
+    async def restart():
+        await asyncio.sleep(1.0)
+        await server.start()
+
+    restarting = asyncio.create_task(restart())
+    start = time.perf_counter()
+    driver.modbus_tcp = await driver.try_reconnect(PORT, address, VENDORS[args.vendor][1], driver.device_type, ident, driver.check_msg)
+    elapsed = time.perf_counter() - start
+    await restarting
+
+    # one request in ten is lost, every loss costs a timeout and a new connection
+    server.drop = 0.1
+    errors: int = 0
+    polls: int = 0
+    start = time.perf_counter()
+    while polls < 20:
+        try:
+            await driver.poll()
+        except OSError:
+            errors += 1
+        polls += 1
+    lossy = (time.perf_counter() - start) / polls
+    await driver.modbus_tcp.close()
+    await server.stop()
+    return elapsed, driver.modbus_tcp is not None, errors, polls, lossy, server.connections
+
+
+async def group_polling(args, count: int, cycles: int = 10) -> tuple:
+    from main.inverters.group import InverterGroup
+    servers: list = []
+    drivers: list = []
+    for i in range(count):
+        server = InverterServer(args.vendor, "127.0.0.{}".format(args.target + i), PORT, latency=0.05)
+        await server.start()
+        servers.append(server)
+        driver = make_driver(args.vendor)
+        driver.set_ip_address = server.host
+        driver.modbus_tcp = driver.use_connection(await driver.scan_ip_address(server.host, PORT, VENDORS[args.vendor][1],
+                                                                               driver.device_type, len(VENDORS[args.vendor][3]),
+                                                                               driver.check_msg))
+        drivers.append(driver)
+    group = InverterGroup(drivers, [1] * count, replay.make_config())
+    start = time.perf_counter()
+    for i in range(cycles):
+        await group.run()
+    elapsed = (time.perf_counter() - start) / cycles
+    for driver in drivers:
+        await driver.modbus_tcp.close()
+    await stop_fleet(servers)
+    return elapsed, group.data_layer.data["p1"], drivers[0].data_layer.data["p1"]
+
+
+async def group_discovery(args, cycles: int = 50) -> tuple:
+    # both slots start unconnected, their scans run in the same cycles and walk the subnet in the same order,
+    # the first slot's workers reach both inverters of the short range before the second slot starts
+    from main.inverters.base import CONNECTED
+    from main.inverters.group import InverterGroup, INVERTER_SLOTS
+    servers = await start_fleet([InverterServer(args.vendor, "127.0.0.{}".format(3 + i), PORT, latency=0.05)
+                                 for i in range(2)])
+    config = replay.make_config()
+    drivers: list = [make_driver(args.vendor, config, INVERTER_SLOTS[i][1]) for i in range(2)]
+    for driver in drivers:
+        driver.end_ip = 10
+    group = InverterGroup(drivers, [1, 0], config)
+    start = time.perf_counter()
+    cycle: int = 0
+    while cycle < cycles and not all(driver.connection_status == CONNECTED for driver in drivers):
+        await group.run()
+        await asyncio.sleep(0.1)
+        cycle += 1
+    elapsed = time.perf_counter() - start
+    for i in range(2):
+        await group.run()
+    addresses: list = [driver.set_ip_address if driver.connection_status == CONNECTED else None for driver in drivers]
+    for task in group.tasks:
+        if task is not None:
+            task.cancel()
+    for driver in drivers:
+        if driver.modbus_tcp is not None:
+            await driver.modbus_tcp.close()
+    await stop_fleet(servers)
+    return elapsed, cycle, addresses, sorted(group.claimed), group.data_layer.data["p1"]
+
+
+async def run(args):
+    from main.inverters.base import SCAN_CONCURRENCY
+    print("vendor: {}, target 127.0.0.{}, {} decoys, {} silent hosts".format(args.vendor, args.target, args.decoys, args.silent))
+    for concurrency in (1, SCAN_CONCURRENCY):
+        elapsed, found = await discovery(args, concurrency)
+        print("  discovery  concurrency {:2}  {:7.2f} s  found {}".format(concurrency, elapsed, found))
+    for latency in (0.0, 0.005, 0.05):
+        rate, requests, p1 = await polling(args, latency)
+        print("  polling    latency {:5.0f} ms {:8.1f} polls/s  {:.0f} requests/poll".format(latency * 1000, rate, requests))
+    elapsed, found, errors, polls, lossy, connections = await reconnect(args)
+    print("  reconnect  {:7.2f} s after a 1 s restart, found {}".format(elapsed, found))
+    print("  lossy      {} of {} polls failed with 10 % dropped requests, {:.2f} s/poll, {} connections".format(
+        errors, polls, lossy, connections))
+    for count in (1, 2, 4):
+        elapsed, total, single = await group_polling(args, count)
+        print("  group      {} inverters {:7.3f} s/cycle  p1 {} W (one inverter {} W)".format(count, elapsed, total, single))
+    elapsed, cycles, addresses, claimed, total = await group_discovery(args)
+    print("  group scan {:7.2f} s {} cycles, slots on {}, {}, claimed {}, p1 {} W".format(
+        elapsed, cycles, addresses, "distinct" if None not in addresses and len(set(addresses)) == 2 else "NOT distinct",
+        claimed, total))
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(parse_args()))
+
+
+main()
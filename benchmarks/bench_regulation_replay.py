@@ -0,0 +1,75 @@
+"""
+Replay of power traces through Regulation.run at full speed, closed over a simple plant
+(sim/replay.py). Reports per call latency and allocations and the control quality:
+energy exported to the grid, share of the surplus captured by the boiler, settling time
+after steps of the net power and SSR duty oscillation. Every trace runs in the step and the
+PI regulation mode (sw,PI CONTROL) unless --mode selects one of them.
+
+Runs on CPython with the sim/ stand-ins.
+
+    python benchmarks/bench_regulation_replay.py
+    python benchmarks/bench_regulation_replay.py --trace recorded.csv
+    python benchmarks/bench_regulation_replay.py --set in,TUV-POWER=3000
+    python benchmarks/bench_regulation_replay.py --mode pi --set in,PI-GAIN-P=30 --set in,PI-GAIN-I=40
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sim"))
+
+import host
+
+host.install()
+
+import replay
+
+MODES = {"step": "0", "pi": "1"}  # value of sw,PI CONTROL
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", action="append", default=[], help="CSV with net power W[,SOC] per 300 ms tick")
+    parser.add_argument("--set", action="append", default=[], metavar="VARIABLE=VALUE", help="override a setting")
+    parser.add_argument("--minutes", type=int, default=60, help="length of the synthetic traces")
+    parser.add_argument("--mode", choices=tuple(MODES) + ("both",), default="both", help="regulation mode")
+    return parser.parse_args()
+
+
+def run(name, trace, settings):
+    from main.regulation import Regulation
+    results = []
+    for measure_allocations in (False, True):
+        config = replay.make_config(settings)
+        regulation = Regulation(wattmeter=replay.Wattmeter(), config=config)
+        results.append(replay.replay(regulation, config, trace, measure_allocations=measure_allocations))
+    metrics = results[0]
+    metrics["bytes_per_call"] = results[1]["bytes_per_call"]
+    return name, metrics
+
+
+def report(name, m):
+    settle = "{:6.1f} s mean {:6.1f} s max".format(m["settle_mean_s"], m["settle_max_s"]) if m["settle_mean_s"] is not None else "     - "
+    print("{}: {} ticks".format(name, m["ticks"]))
+    print("  latency      {:8.2f} us mean {:8.2f} us p99   {:8.1f} B/call".format(
+        m["latency_mean_us"], m["latency_p99_us"], m["bytes_per_call"]))
+    print("  energy       {:8.1f} Wh exported {:8.1f} Wh boiler {:8.1f} Wh import caused, {:5.1f} % of surplus used".format(
+        m["exported_wh"], m["boiler_wh"], m["extra_import_wh"], m["capture"] * 100))
+    print("  settling     {} over {} steps, {} not settled".format(settle, m["steps"], m["unsettled"]))
+    print("  oscillation  {:8.2f} duty reversals/min {:8.2f} duty travel/tick".format(
+        m["reversals_per_min"], m["duty_travel_per_tick"]))
+
+
+def main():
+    args = parse_args()
+    settings = dict(item.split("=", 1) for item in args.set)
+    traces = [("step", replay.step_trace(args.minutes)), ("clouds", replay.cloud_trace(args.minutes))]
+    for file in args.trace:
+        traces.append((os.path.basename(file), replay.load_trace(file)))
+    modes = tuple(MODES) if args.mode == "both" else (args.mode,)
+    for name, trace in traces:
+        for mode in modes:
+            report(*run("{} [{}]".format(name, mode), trace, dict(settings, **{"sw,PI CONTROL": MODES[mode]})))
+
+
+main()
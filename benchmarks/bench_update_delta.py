@@ -0,0 +1,104 @@
+"""
+Payload and serialisation cost of one /updateData poll.
+
+Full: json of the whole merged wattmeter and inverter data, as sent before.
+Delta: json of the keys ChangeTracker reports changed since the previous poll,
+with one wattmeter and one inverter cycle between polls.
+
+    python benchmarks/bench_update_delta.py
+    micropython benchmarks/bench_update_delta.py
+"""
+import sys
+import time
+
+sys.path.insert(0, __file__.rsplit('/', 2)[0] if '/' in __file__ else '..')
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from main.change_tracker import ChangeTracker
+
+POLLS = 2000
+
+
+def wattmeter_data():
+    data = {}
+    for key in ('HDO', 'I1', 'U1', 'P1', 'E1_P_min', 'E1_N_min', 'E1_P_hour', 'E1_N_hour', 'E1_P_day', 'E1_N_day',
+                'E1_P', 'E1_N', 'I_TUV', 'P_TUV', 'E_TUV_min', 'E_TUV_hour', 'E_TUV_day', 'E_TUV', 'P_REGULATION'):
+        data[key] = 1000
+    data['Pm'] = [60] + [-1500 + i for i in range(60)]
+    data['Es'] = [96] + [i for i in range(96)]
+    data['RUN_TIME'] = 0
+    data['WATTMETER_TIME'] = "18.10.24  12:00:00"
+    data['ID'] = "12345"
+    return data
+
+
+def inverter_data():
+    data = {}
+    for key in ('soc', 'u1', 'u2', 'u3', 'i1', 'i2', 'i3', 'p1', 'p2', 'p3', 'status'):
+        data[key] = 230
+    data['id'] = "GW10K-ET"
+    data['ip'] = "192.168.0.120"
+    data['type'] = "Goodwe"
+    return data
+
+
+def cycle(watt, inverter, n):
+    # values that move every 300 ms wattmeter cycle and 2 s inverter cycle
+    watt['P1'] = -1500 + n % 97
+    watt['I1'] = 640 + n % 13
+    watt['P_REGULATION'] = -1400 + n % 89
+    watt['RUN_TIME'] = n
+    watt['WATTMETER_TIME'] = "18.10.24  12:{:02}:{:02}".format(n // 60 % 60, n % 60)
+    inverter['p1'] = 2000 + n % 31
+    inverter['i1'] = 870 + n % 7
+
+
+def timed_polls(poll, watt, inverter, trackers):
+    size = 0
+    elapsed = 0.0
+    for n in range(POLLS):
+        cycle(watt, inverter, n)
+        since = (trackers[0].version, trackers[1].version)
+        trackers[0].commit(watt)
+        trackers[1].commit(inverter)
+        if hasattr(time, 'ticks_us'):
+            start = time.ticks_us()
+            body = poll(watt, inverter, trackers, since)
+            elapsed += time.ticks_diff(time.ticks_us(), start)
+        else:
+            start = time.perf_counter()
+            body = poll(watt, inverter, trackers, since)
+            elapsed += (time.perf_counter() - start) * 1e6
+        size += len(body)
+    return size / POLLS, elapsed / POLLS
+
+
+def full_poll(watt, inverter, trackers, since):
+    merged = {}
+    merged.update(watt)
+    merged.update(inverter)
+    return json.dumps(merged)
+
+
+def delta_poll(watt, inverter, trackers, since):
+    delta = {}
+    trackers[0].delta(watt, since[0], delta)
+    trackers[1].delta(inverter, since[1], delta)
+    return json.dumps(delta)
+
+
+def main():
+    watt, inverter = wattmeter_data(), inverter_data()
+    full_bytes, full_us = timed_polls(full_poll, watt, inverter, (ChangeTracker(), ChangeTracker()))
+    watt, inverter = wattmeter_data(), inverter_data()
+    delta_bytes, delta_us = timed_polls(delta_poll, watt, inverter, (ChangeTracker(), ChangeTracker()))
+    print("polls: {}".format(POLLS))
+    print("full snapshot {:8.1f} B/poll {:8.2f} us/poll".format(full_bytes, full_us))
+    print("delta         {:8.1f} B/poll {:8.2f} us/poll".format(delta_bytes, delta_us))
+
+
+main()
@@ -0,0 +1,111 @@
+"""
+Microbenchmark of the wattmeter 6002 frame decoding.
+
+Compares the former hand written shift/OR decoding with main.wattmeter_map.FrameDecoder, the decoder
+Wattmeter uses: WATTMETER_MAP.decode_frame and the P1 averaging ring.
+Runs under CPython (tracemalloc peak per sample) and under the MicroPython unix port
+(gc.mem_alloc), only the MicroPython numbers are representative for the ESP32 heap.
+
+    python benchmarks/bench_wattmeter_decode.py
+    micropython benchmarks/bench_wattmeter_decode.py
+"""
+import sys
+import gc
+import time
+
+sys.path.insert(0, __file__.rsplit('/', 2)[0] if '/' in __file__ else '..')
+
+from main.wattmeter_map import FrameDecoder
+
+SAMPLES = 5000
+
+
+class LegacyDecoder:
+    def __init__(self):
+        self.average_power = []
+
+    def decode(self, receive_data, data):
+        data['HDO'] = int(((receive_data[0]) << 8) | (receive_data[1]))
+        data['I1'] = int(((receive_data[2]) << 8) | (receive_data[3]))
+        self.average_power.append(int(((receive_data[4]) << 8) | (receive_data[5])))
+        if len(self.average_power) > 5:
+            self.average_power = self.average_power[1:]
+        actual_power = 0
+        count = 0
+        for power in self.average_power:
+            actual_power += (power - 65536) if power > 32767 else power
+            count += 1
+        data['P1'] = int(actual_power / count)
+        data['U1'] = int(((receive_data[6]) << 8) | (receive_data[7]))
+        data['E1_P_min'] = int(((receive_data[8]) << 8) | (receive_data[9]))
+        data['E1_N_min'] = int(((receive_data[10]) << 8) | (receive_data[11]))
+        data['E1_P_hour'] = int(((receive_data[12]) << 8) | (receive_data[13]))
+        data['E1_N_hour'] = int(((receive_data[14]) << 8) | (receive_data[15]))
+        data['E1_P_day'] = int(((receive_data[16]) << 8) | (receive_data[17]))
+        data['E1_N_day'] = int(((receive_data[18]) << 8) | (receive_data[19]))
+        data['E1_P'] = int(
+            (receive_data[22] << 24) | (receive_data[23] << 16) | (receive_data[20] << 8) | receive_data[21])
+        data['E1_N'] = int(
+            (receive_data[26] << 24) | (receive_data[27] << 16) | (receive_data[24] << 8) | receive_data[25])
+        data['I_TUV'] = int(((receive_data[28]) << 8) | (receive_data[29]))
+        data['P_TUV'] = int(((receive_data[30]) << 8) | (receive_data[31]))
+        data['E_TUV_min'] = int(((receive_data[32]) << 8) | (receive_data[33]))
+        data['E_TUV_hour'] = int(((receive_data[34]) << 8) | (receive_data[35]))
+        data['E_TUV_day'] = int(((receive_data[36]) << 8) | (receive_data[37]))
+        data['P_REGULATION'] = int(((receive_data[38]) << 8) | (receive_data[39]))
+        data['E_TUV'] = int(
+            (receive_data[42] << 24) | (receive_data[43] << 16) | (receive_data[40] << 8) | receive_data[41])
+
+
+def frame(i):
+    registers = (1, 52, (-1500 + i) & 0xFFFF, 231, 12, 3, 480, 2, 7100, 30, 0x5678, 0x0012, 0x0100, 0x0003,
+                 9, 2200, 35, 900, 10200, (-900 + i) & 0xFFFF, 0x4321, 0x0009)
+    data = bytearray(44)
+    for n in range(22):
+        data[2 * n] = registers[n] >> 8
+        data[2 * n + 1] = registers[n] & 0xFF
+    return bytes(data)
+
+
+def measure(decoder, frames):
+    data = {}
+    decoder.decode(frames[0], data)  # create the keys, like DataLayer does at start
+    if hasattr(gc, 'mem_alloc'):
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        start = time.ticks_us()
+        for receive_data in frames:
+            decoder.decode(receive_data, data)
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+    else:
+        # CPython boxes every int above 256, so these bytes overstate what MicroPython allocates
+        import tracemalloc
+        start = time.perf_counter()
+        for receive_data in frames:
+            decoder.decode(receive_data, data)
+        elapsed = (time.perf_counter() - start) * 1e6
+        allocated = 0
+        tracemalloc.start()
+        for receive_data in frames:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            decoder.decode(receive_data, data)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+    return data, elapsed / len(frames), allocated / len(frames)
+
+
+def main():
+    frames = [frame(i % 100) for i in range(SAMPLES)]
+    legacy, legacy_us, legacy_bytes = measure(LegacyDecoder(), frames)
+    current, current_us, current_bytes = measure(FrameDecoder(), frames)
+    assert legacy == current, (legacy, current)
+    print("samples: {}".format(SAMPLES))
+    for name, us, allocated in (("legacy decode", legacy_us, legacy_bytes), ("register map", current_us, current_bytes)):
+        print("{:14} {:8.2f} us/sample {:8.1f} B/sample".format(name, us, allocated))
+
+
+main()
@@ -2,6 +2,10 @@ import bootloader
 from collections import OrderedDict
 import os
 import ulogging
+from utime import ticks_ms, ticks_diff
+from main.config_snapshot import ConfigSnapshot, SNAPSHOT_KEYS
+
+FLUSH_DELAY: int = 2000  # ms without further change before setting.dat is written
 
 
 class Config:
@@ -36,9 +40,28 @@ class Config:
         self.data['in,POWER-RELAY'] = '1000'
         self.data['in,TIMEOUT-RELAY'] = '10'
         self.data['in,RELAY-LOAD'] = '2000'
+        self.data['in,SSR2-POWER'] = '0'
+        self.data['in,SSR1-PRIORITY'] = '1'
+        self.data['in,SSR2-PRIORITY'] = '2'
+        self.data['in,RELAY-PRIORITY'] = '3'
+        self.data['sw,SSR1 BOOST'] = '1'
+        self.data['sw,SSR2 BOOST'] = '0'
+        self.data['sw,RELAY BOOST'] = '0'
+        self.data['sw,PI CONTROL'] = '0'
+        self.data['in,PI-GAIN-P'] = '20'
+        self.data['in,PI-GAIN-I'] = '60'
+
+        self.data['sw,ADAPTIVE POLLING'] = '0'
+        self.data['in,POLL-FLOOR'] = '100'
+        self.data['in,POLL-CEILING'] = '300'
 
         self.data['bti,INVERTER-TYPE'] = '0'
         self.data['INVERTER_IP_ADDR'] = '0'
+        self.data['bti,INVERTER2-TYPE'] = '0'
+        self.data['INVERTER2_IP_ADDR'] = '0'
+        self.data['sw,WEIGHTED SOC'] = '0'
+        self.data['in,BATTERY-CAPACITY'] = '1'
+        self.data['in,BATTERY2-CAPACITY'] = '0'
 
         self.data['DHCP'] = '1'
         self.data['STATIC_IP'] = '192.168.0.130'
@@ -58,34 +81,27 @@ class Config:
             self.logger.setLevel(ulogging.INFO)
 
         self.setting_profile = 'setting.dat'
+        self.dirty: bool = False
+        self.changed_at: int = 0
+        self.load()
+        self.snapshot: ConfigSnapshot = ConfigSnapshot(self.data)
         self.handle_configure('txt,ACTUAL SW VERSION', self.boot.get_version(""))
 
-    # Update self.config from setting.dat and return dict(config)
-    def get_config(self) -> None:
-        setting = {}
-        try:
-            setting = self.read_setting()
-        except OSError:
-            setting = {}
-
+    # Fill self.data from setting.dat once at start, flash is written only by flush()
+    def load(self) -> None:
+        setting: dict = self.read_setting(self.setting_profile)
         if len(setting) != len(self.data):
-            with open(self.setting_profile, 'w') as file:
-                file.write('')
-                file.close()
-
-            for i in self.data:
-                if i in setting:
-                    if self.data[i] != setting[i]:
-                        self.data[i] = setting[i]
-            setting = {}
+            # setting.dat is missing or torn, use the temporary file of an interrupted flush if it is complete
+            recovered: dict = self.read_setting(self.setting_profile + ".tmp")
+            if all(i in recovered for i in self.data):
+                setting = recovered
+            self.dirty = True
 
         for i in self.data:
             if i in setting:
-                if self.data[i] != setting[i]:
-                    self.data[i] = setting[i]
+                self.data[i] = setting[i]
             else:
-                setting[i] = self.data[i]
-                self.write_setting(setting)
+                self.dirty = True
 
         if self.data['ID'] == '0':
             _id = bytearray(os.urandom(4))
@@ -93,53 +109,67 @@ class Config:
             for i in range(0, len(_id)):
                 rand_id += str((int(_id[i])))
             self.data['ID'] = rand_id[-5:]
-            self.handle_configure('ID', self.data['ID'])
+            self.dirty = True
 
+        self.flush(force=True)
+
+    # Return in-memory config, it is always the authoritative copy
+    def get_config(self) -> OrderedDict:
         return self.data
 
-    # Update self.config. Write new value to self.config and to file setting.dat
+    # Update self.data and the snapshot, the change reaches setting.dat with the next flush()
     def handle_configure(self, variable: str, value: str) -> bool:
         try:
             if variable == 'bt,RESET PV-ROUTER':
+                self.flush(force=True)
                 from machine import reset
                 reset()
 
-            if len(variable) > 0:
-                try:
-                    setting = self.read_setting()
-                except OSError:
-                    setting: dict = {}
-
-                if setting[variable] != value:
-                    setting[variable] = value
-                    self.write_setting(setting)
-                    self.get_config()
-                    return True
-            else:
+            if variable not in self.data or self.data[variable] == value:
                 return False
+
+            self.data[variable] = value
+            self.dirty = True
+            self.changed_at = ticks_ms()
+            if variable in SNAPSHOT_KEYS:
+                self.snapshot = ConfigSnapshot(self.data)
+            return True
         except Exception as e:
             self.logger.error("handle_configure exception: {}.".format(e))
             return False
 
-    def read_setting(self) -> dict:
-        with open(self.setting_profile) as f:
-            lines: list[str] = f.readlines()
-        setting: dict = {}
+    # Write pending changes once they settled for FLUSH_DELAY ms, so a burst of changes costs one write
+    def flush(self, force: bool = False) -> bool:
+        if not self.dirty:
+            return False
+        if not force and ticks_diff(ticks_ms(), self.changed_at) < FLUSH_DELAY:
+            return False
         try:
-            for line in lines:
-                variable, value = line.strip("\n").split(";")
-                setting[variable] = value
-            return setting
+            self.write_setting(self.data)
+            self.dirty = False
+            return True
+        except OSError as e:
+            self.logger.error("flush exception: {}.".format(e))
+            return False
 
+    def read_setting(self, file: str) -> dict:
+        setting: dict = {}
+        try:
+            with open(file) as f:
+                for line in f:
+                    variable, value = line.strip("\n").split(";")
+                    setting[variable] = value
+        except OSError:
+            pass
         except Exception as e:
             self.logger.error("read_setting exception: {}.".format(e))
-            self.write_setting(self.data)
-            return self.data
+        return setting
 
-    # method for write data to file.dat
-    def write_setting(self, setting: OrderedDict[str, str]) -> None:
+    # Write whole setting to temporary file and swap it in, setting.dat is never left half written
+    def write_setting(self, setting: OrderedDict) -> None:
         lines: list[str] = []
         for variable, value in setting.items():
             lines.append("%s;%s\n" % (variable, value))
-        with open(self.setting_profile, "w") as f:
+        with open(self.setting_profile + ".tmp", "w") as f:
             f.write(''.join(lines))
+        os.rename(self.setting_profile + ".tmp", self.setting_profile)
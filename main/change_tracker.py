@@ -0,0 +1,35 @@
+class ChangeTracker:
+    """
+    Remembers for every key of a data dict the version in which its value last changed.
+    Scalars are compared with the committed value, lists by identity first, so a list
+    modified in place has to be reported with touch().
+    """
+
+    def __init__(self) -> None:
+        self.version: int = 0
+        self.changed: dict = {}  # key -> version of the last change
+        self.values: dict = {}  # key -> value at the last change
+
+    # Report a key changed in place, it is included in the next commit
+    def touch(self, key: str) -> None:
+        self.changed[key] = self.version + 1
+
+    def commit(self, data: dict) -> int:
+        self.version += 1
+        for key, value in data.items():
+            if key not in self.values:
+                self.values[key] = value
+                self.changed[key] = self.version
+            else:
+                previous = self.values[key]
+                if previous is not value and previous != value:
+                    self.values[key] = value
+                    self.changed[key] = self.version
+        return self.version
+
+    # Copy into out the keys of data changed after version since
+    def delta(self, data: dict, since: int, out: dict) -> dict:
+        for key, version in self.changed.items():
+            if version > since and key in data:
+                out[key] = data[key]
+        return out
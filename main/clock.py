@@ -0,0 +1,80 @@
+import time
+
+# rollover events, the bits of MINUTE, HOUR and DAY match the wattmeter counter reset registers 100..102
+MINUTE: int = 0x01
+HOUR: int = 0x02
+DAY: int = 0x04
+SYNC: int = 0x08  # RTC was set, the jump itself is not published as a rollover
+
+
+class Clock:
+    """
+    Wall time sampled once per tick and shared by the loops.
+    localtime() and the WATTMETER_TIME text are only rebuilt when the second changes, minute, hour and day
+    rollovers are detected here once and published to the subscribed callbacks.
+    """
+
+    def __init__(self) -> None:
+        self.synced: bool = False  # RTC set from NTP or by the app
+        self.start_up_time: int = 0  # seconds of the last sync, RUN_TIME counts from it
+        self.seconds: int = 0
+        self.now: tuple = ()
+        self.previous: tuple = ()  # localtime before the last rollover
+        self.text: str = ''
+        self.listeners: list = []  # (events, callback)
+        self.sample()
+
+    def subscribe(self, events: int, callback) -> None:
+        """
+        callback(events) is called from tick() with the rollovers that happened, if any of them is in events.
+        """
+        self.listeners.append((events, callback))
+
+    def sample(self, seconds: int | None = None) -> None:
+        self.seconds = time.time() if seconds is None else seconds
+        self.now = time.localtime(self.seconds)
+        self.text = "{0:02}.{1:02}.{2:02}  {3:02}:{4:02}:{5:02}".format(self.now[2], self.now[1], self.now[0] % 100,
+                                                                    self.now[3], self.now[4], self.now[5])
+
+    def tick(self, seconds: int | None = None) -> int:
+        if seconds is None:
+            seconds = time.time()
+        if seconds == self.seconds:
+            return 0
+        previous: tuple = self.now
+        self.sample(seconds)
+        events: int = 0
+        if self.now[:5] != previous[:5]:
+            events |= MINUTE
+            if self.now[:4] != previous[:4]:
+                events |= HOUR
+                if self.now[:3] != previous[:3]:
+                    events |= DAY
+            self.previous = previous
+            self.publish(events)
+        return events
+
+    def sync(self, seconds: int | None = None) -> None:
+        """
+        RTC was set, continue from the new time without publishing the jump as minute, hour and day rollovers.
+        """
+        self.sample(seconds)
+        self.previous = self.now
+        self.synced = True
+        self.start_up_time = self.seconds
+        self.publish(SYNC)
+
+    def resume(self, seconds: int, start_up_time: int) -> None:
+        """
+        RTC kept running through a reset, continue as synced from the time saved before it,
+        the rollovers missed during the reboot are published by the following tick.
+        """
+        self.synced = True
+        self.start_up_time = start_up_time
+        self.sample(seconds)
+        self.tick()
+
+    def publish(self, events: int) -> None:
+        for mask, callback in self.listeners:
+            if mask & events:
+                callback(events)
@@ -0,0 +1,76 @@
+FREQUENCY: int = 20
+WATTER_CONST: int = 4180
+TEMP_INPUT: int = 10  # teplota vstupni vody
+
+# keys of Config.data the snapshot depends on, any other key can change without rebuilding it
+SNAPSHOT_KEYS: tuple = (
+    'sw,TESTING SOFTWARE', 'sw,Wi-Fi AP', 'sw,AC IN ACTIVE: HIGH', 'btn,BOOST-MODE', 'in,OVERFLOW-OFFSET',
+    'in,TUV-VOLUME', 'in,TUV-POWER', 'in,NIGHT-BOOST', 'in,NIGHT-TEMPERATURE', 'in,MORNING-BOOST',
+    'in,MORNING-TEMPERATURE', 'in,BOOST-TIMEOUT', 'in,TIME-ZONE', 'in,STOP-SOC', 'in,POWER-RELAY',
+    'in,TIMEOUT-RELAY', 'in,RELAY-LOAD', 'DHCP', 'sw,ADAPTIVE POLLING', 'in,POLL-FLOOR',
+    'in,POLL-CEILING', 'in,SSR2-POWER', 'in,SSR1-PRIORITY', 'in,SSR2-PRIORITY', 'in,RELAY-PRIORITY', 'sw,SSR1 BOOST',
+    'sw,SSR2 BOOST', 'sw,RELAY BOOST', 'sw,PI CONTROL', 'in,PI-GAIN-P', 'in,PI-GAIN-I',
+)
+
+
+class ConfigSnapshot:
+    """
+    Typed copy of the settings used in the hot loops together with the regulation parameters
+    derived from them. Config rebuilds it only when one of SNAPSHOT_KEYS changes.
+    """
+
+    def __init__(self, data: dict) -> None:
+        self.testing_software: bool = data['sw,TESTING SOFTWARE'] == '1'
+        self.wifi_ap: bool = data['sw,Wi-Fi AP'] == '1'
+        self.ac_in_active_high: bool = data['sw,AC IN ACTIVE: HIGH'] == '1'
+        self.boost_mode: int = int(data['btn,BOOST-MODE'])
+        self.overflow_offset: int = int(data['in,OVERFLOW-OFFSET'])
+        self.tuv_volume: int = int(data['in,TUV-VOLUME'])
+        self.tuv_power: int = int(data['in,TUV-POWER'])
+        self.night_boost: int = int(data['in,NIGHT-BOOST'])
+        self.night_temperature: int = int(data['in,NIGHT-TEMPERATURE'])
+        self.morning_boost: int = int(data['in,MORNING-BOOST'])
+        self.morning_temperature: int = int(data['in,MORNING-TEMPERATURE'])
+        self.boost_timeout: int = int(data['in,BOOST-TIMEOUT'])
+        self.time_zone: int = int(data['in,TIME-ZONE'])
+        self.stop_soc: int = int(data['in,STOP-SOC'])
+        self.power_relay: int = int(data['in,POWER-RELAY'])
+        self.timeout_relay: int = int(data['in,TIMEOUT-RELAY'])
+        self.relay_load: int = int(data['in,RELAY-LOAD'])
+        self.dhcp: bool = data['DHCP'] == '1'
+        self.adaptive_polling: bool = data['sw,ADAPTIVE POLLING'] == '1'
+        self.poll_floor: int = int(data['in,POLL-FLOOR'])
+        self.poll_ceiling: int = max(int(data['in,POLL-CEILING']), self.poll_floor)
+        self.ssr2_power: int = int(data['in,SSR2-POWER'])
+
+        # outputs indexed SSR1, SSR2, relay as in main.dispatcher, order is by priority and then by index
+        self.output_power: tuple = (self.tuv_power, self.ssr2_power, self.relay_load)
+        self.output_boost: tuple = (data['sw,SSR1 BOOST'] == '1', data['sw,SSR2 BOOST'] == '1',
+                                    data['sw,RELAY BOOST'] == '1')
+        priorities: tuple = (int(data['in,SSR1-PRIORITY']), int(data['in,SSR2-PRIORITY']),
+                             int(data['in,RELAY-PRIORITY']))
+        self.output_order: tuple = tuple(sorted(range(0, 3), key=lambda i: priorities[i] * 3 + i))
+        self.pwm_capacity: int = self.tuv_power + self.ssr2_power
+
+        # PI regulace, zesileni v procentech regulacni odchylky za periodu
+        self.pi_control: bool = data['sw,PI CONTROL'] == '1'
+        self.pi_gain_p: float = int(data['in,PI-GAIN-P']) / 100
+        self.pi_gain_i: float = int(data['in,PI-GAIN-I']) / 100
+
+        self.power_step: float = self.tuv_power / (1000 / FREQUENCY / 20 * 2)  # 1000ms 20ms
+        self.power_step_count: float = self.tuv_power / self.power_step if self.power_step else 0
+        self.power_hyst: float = self.power_step / 4  # hystereze regulace 1/4 minimalniho kroku
+        self.overflow_limit: int = -self.overflow_offset
+        if self.power_hyst > (-self.overflow_limit):
+            self.power_hyst = (-self.overflow_limit) - 10
+
+        # vypocet energie pro nocni boost
+        self.tuv_energy_night: float = WATTER_CONST * self.tuv_volume * (self.night_temperature - TEMP_INPUT) / 3600
+        # vypocet energie pro ranni boost
+        self.tuv_energy_morning: float = WATTER_CONST * self.tuv_volume * (self.morning_temperature - TEMP_INPUT) / 3600
+        # vypocet sekund se ma nahrivat boost, pocitejme ze 1/4 v bojleru zustala, takze 3/4
+        self.sec_night_boost: float = 0
+        self.sec_morning_boost: float = 0
+        if self.tuv_power > 0:
+            self.sec_night_boost = self.tuv_energy_night * 3600 * 3 / 4 / self.tuv_power
+            self.sec_morning_boost = self.tuv_energy_night * 3600 * 3 / 4 / self.tuv_power
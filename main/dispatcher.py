@@ -0,0 +1,64 @@
+from machine import Pin, PWM
+from main.config_snapshot import FREQUENCY
+
+# outputs, the index of an output in ConfigSnapshot.output_power, output_boost and output_order
+SSR1: int = 0
+SSR2: int = 1
+RELAY: int = 2
+
+SSR1_PIN: int = 33
+SSR2_PIN: int = 23
+RELAY_PIN: int = 19
+
+PWM_MAX: int = 1023
+PWM_OFF: int = 0
+
+
+class Dispatcher:
+    """
+    Drives SSR1, SSR2 and the relay. The power the regulation wants to divert is split over the PWM outputs
+    in the order of their priority, every output up to its own rating, outputs with boost enabled are held
+    at full power while a boost is active. The relay is switched by the regulation: the PWM outputs before it
+    absorb the surplus first, so it is left on the grid only once they are full, the power of the PWM outputs
+    after it counts as surplus available to the relay.
+    """
+
+    def __init__(self) -> None:
+        # PWM starts at 50 % duty on ESP32 unless told otherwise, SSR2 is created only once it has a rating
+        self.pwm: list = [PWM(Pin(SSR1_PIN), FREQUENCY, duty=PWM_OFF), None]
+        self.relay: Pin = Pin(RELAY_PIN, Pin.OUT)
+        self.power: list = [0, 0, 0]  # W requested from every output
+        self.duty: list = [-1, -1]  # last duty written, nothing written yet
+
+    def split(self, target: int, boost: bool, config) -> None:
+        remaining: int = target
+        for output in config.output_order:
+            if output == RELAY:
+                continue
+            rating: int = config.output_power[output]
+            if boost and config.output_boost[output]:
+                power: int = rating
+            else:
+                power = rating if remaining > rating else remaining
+                remaining -= power
+            self.power[output] = power
+            duty: int = int(power / rating * 1024) if rating > 0 else PWM_OFF
+            if duty > PWM_MAX:
+                duty = PWM_MAX
+            if duty != self.duty[output]:
+                if self.pwm[output] is None:
+                    if rating == 0:
+                        continue
+                    self.pwm[output] = PWM(Pin(SSR2_PIN), FREQUENCY, duty=PWM_OFF)
+                self.duty[output] = duty
+                self.pwm[output].duty(duty)
+        self.power[RELAY] = config.output_power[RELAY] if self.relay.value() else 0
+
+    # W taken by PWM outputs after the relay, the relay can have it
+    def lower_power(self, config) -> int:
+        power: int = 0
+        for output in reversed(config.output_order):
+            if output == RELAY:
+                break
+            power += self.power[output]
+        return power
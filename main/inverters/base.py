@@ -1,25 +1,36 @@
-from umodbus.tcp import TCP
+import errno
 import uasyncio as asyncio
 from collections import OrderedDict
 import ulogging
+from main.inverters.modbus_tcp import AsyncTCP
+from main.register_map import RegisterMap
+from main.change_tracker import ChangeTracker
 
 UNCONNECTED: int = 0
 CONNECTED: int = 1
 SEARCHING: int = 2
 
+SCAN_CONCURRENCY: int = 6  # parallel TCP connects while scanning, ESP32 has a limited socket pool
+SCAN_TIMEOUT: int = 2  # seconds per address, connect and read together
+
 
 class BaseInverter:
-    def __init__(self, wifi_manager, config, wattmeter=None):
+    def __init__(self, wifi_manager, config, wattmeter=None, ip_key: str = 'INVERTER_IP_ADDR'):
         self.wifi_manager = wifi_manager
         self.start_ip: int = 1
         self.end_ip: int = 254
         self.data_layer: Datalayer = Datalayer()
         self.config: object = config
-        self.set_ip_address: str = self.config.data['INVERTER_IP_ADDR']
+        self.ip_key: str = ip_key  # config key remembering the address found by the scan
+        self.group = None  # InverterGroup the inverter is polled in
+        self.set_ip_address: str = self.config.data[ip_key]
         self.connection_status: int = UNCONNECTED
         self.reconnect_error_cnt: int = 0
         self.max_reconnect_error_cnt: int = 10
         self.wattmeter = wattmeter
+        self.slave_addr: int = 1
+        self.register_map: RegisterMap = None
+        self.split_reads: bool = False  # device refused the gap registers of the merged blocks
 
         self.logger = ulogging.getLogger(__name__)
         if int(self.config.data['sw,TESTING SOFTWARE']) == 1:
@@ -33,70 +44,136 @@ class BaseInverter:
     async def scann(self):
         raise NotImplementedError("Implement me!")
 
-    def process_msg(self):
-        raise NotImplementedError("Implement me!")
+    # Derive values which are not read directly from the register map
+    def process_msg(self) -> None:
+        pass
+
+    async def poll(self) -> None:
+        try:
+            await self.register_map.read(self.modbus_tcp, self.slave_addr, self.data_layer.data, self.split_reads)
+        except OSError as e:
+            if e.errno == errno.EIO:
+                # fall back to exact ranges for good, only for this device
+                self.split_reads = True
+            raise
+        self.process_msg()
+
+    async def scan_ip_address(self, ip_address: str, modbus_port: int, slave_addr: int, starting_addr: int, number_of_reg: int, clbck: callable, timeout: int = 3,
+                              retries: int = 3) -> AsyncTCP | None:
+        modbus_tcp = AsyncTCP(slave_ip=ip_address, slave_port=modbus_port, timeout=timeout)
+        try:
+            await asyncio.wait_for(modbus_tcp.connect(), timeout=timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
 
-    async def scan_ip_address(self, ip_address: str, modbus_port: int, slave_addr: int, starting_addr: int, number_of_reg: int, clbck: callable, timeout: int = 3) -> TCP | None:
-        reader = None
-        writer = None
-        self.data_layer.data["ip"] = ip_address
+        found: bool = False
         try:
-            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip_address, modbus_port), timeout=timeout)
-        except asyncio.TimeoutError:
-            pass
-        if writer is not None and reader is not None:
-            writer.close()
-            await writer.wait_closed()
-            modbus_tcp = TCP(slave_ip=ip_address, slave_port=modbus_port, timeout=5)
             response = None
-            for i in range(0, 3):
+            for i in range(0, retries):
                 try:
-                    response = modbus_tcp.read_holding_registers(slave_addr=slave_addr,
-                                                                 starting_addr=starting_addr,
-                                                                 register_qty=number_of_reg)
-                except Exception as e:
+                    response = await modbus_tcp.read_holding_registers(slave_addr=slave_addr,
+                                                                       starting_addr=starting_addr,
+                                                                       register_qty=number_of_reg)
+                    break
+                except OSError as e:
                     self.logger.error(f"Timeout error occurs: {e}")
 
-            if clbck(response) is True:
-                self.connection_status = CONNECTED
-                self.set_ip_address = ip_address
-                self.config.handle_configure(variable="INVERTER_IP_ADDR", value=ip_address)
+            if response is not None and clbck(response) is True:
+                found = True
                 return modbus_tcp
-
-        writer.close()
-        await writer.wait_closed()
-        return None
-
-    async def scan_network(self, modbus_port: int, ip_address: str, slave_addr: int, starting_addr: int, number_of_reg: int, callback: callable) -> TCP:
-        if self.set_ip_address != '0':
+            return None
+        finally:
+            if not found:
+                await modbus_tcp.close()
+
+    # Take over the connection of a successful probe, the probes themselves leave the driver untouched
+    def use_connection(self, modbus_tcp: AsyncTCP) -> AsyncTCP:
+        self.connection_status = CONNECTED
+        self.set_ip_address = modbus_tcp.slave_ip
+        self.data_layer.data["ip"] = modbus_tcp.slave_ip
+        self.config.handle_configure(variable=self.ip_key, value=modbus_tcp.slave_ip)
+        return modbus_tcp
+
+    async def scan_network(self, modbus_port: int, ip_address: str, slave_addr: int, starting_addr: int, number_of_reg: int, callback: callable,
+                           concurrency: int = SCAN_CONCURRENCY, timeout: int = SCAN_TIMEOUT) -> AsyncTCP | None:
+        if self.group is not None:
+            # addresses reserved by the previous search are free again
+            self.group.release_all(self)
+        if self.set_ip_address != '0' and (self.group is None or self.group.claim(self.set_ip_address, self)):
             response = await self.try_reconnect(modbus_port, self.set_ip_address, slave_addr, starting_addr, number_of_reg, callback)
             if response is not None:
                 return response
+            if self.group is not None:
+                self.group.release(self.set_ip_address, self)
 
+        self.connection_status = SEARCHING
         ip_address_base = '.'.join(ip_address.split('.')[:3])
-        for ip_suffix in range(self.start_ip, self.end_ip + 1):
-            self.connection_status = SEARCHING
+        # all workers pull addresses from one shared iterator, so every address is probed exactly once
+        ip_suffixes = iter(range(self.start_ip, self.end_ip + 1))
+        workers: list = []
+        for i in range(0, concurrency):
+            workers.append(asyncio.create_task(self.scan_worker(workers, ip_suffixes, ip_address_base, modbus_port, slave_addr,
+                                                                starting_addr, number_of_reg, callback, timeout)))
+        results = await asyncio.gather(*workers, return_exceptions=True)
+        # probes finishing before the cancellation reached them found a device too, keep the first one only
+        winner: AsyncTCP | None = None
+        for result in results:
+            if result is None or isinstance(result, BaseException):
+                continue
+            if winner is None:
+                winner = result
+            else:
+                await result.close()
+        if self.group is not None:
+            # workers whose device lost keep their reservation, only the winner's address stays claimed
+            self.group.release_all(self)
+            if winner is not None:
+                self.group.claim(winner.slave_ip, self)
+        if winner is not None:
+            return self.use_connection(winner)
+        self.connection_status = UNCONNECTED
+        return None
+
+    async def scan_worker(self, workers: list, ip_suffixes, ip_address_base: str, modbus_port: int, slave_addr: int, starting_addr: int,
+                          number_of_reg: int, callback: callable, timeout: int) -> AsyncTCP | None:
+        for ip_suffix in ip_suffixes:
             ip_address = ip_address_base + f".{ip_suffix}"
+            if self.group is not None and not self.group.claim(ip_address, self):
+                # probed or found by another inverter of the group, a second inverter of the same vendor
+                # scanning in the same cycle must not find the first one again
+                continue
+            found: bool = False
             try:
-                self.logger.info(f"Try found inverter on ip address: {ip_address}")
-                result = await self.scan_ip_address(ip_address, modbus_port, slave_addr, starting_addr, number_of_reg, callback)
+                self.logger.debug(f"Try found inverter on ip address: {ip_address}")
+                # one read and one deadline for the whole probe, a host which accepts and stays silent costs timeout only
+                result = await asyncio.wait_for(self.scan_ip_address(ip_address, modbus_port, slave_addr, starting_addr, number_of_reg,
+                                                                     callback, timeout, retries=1), timeout)
                 if result is not None:
+                    found = True
                     self.logger.info(f"Device found on ip address: {ip_address}")
+                    current = asyncio.current_task()
+                    for worker in workers:
+                        if worker is not current:
+                            worker.cancel()
                     return result
             except asyncio.TimeoutError:
                 pass
             except Exception as e:
                 self.logger.info(e)
-        self.connection_status = UNCONNECTED
+            finally:
+                # also when the worker is cancelled because another one found the device
+                if not found and self.group is not None:
+                    self.group.release(ip_address, self)
+        return None
 
-    async def try_reconnect(self, modbus_port: int, ip_address: str, slave_addr: int, starting_addr: int, number_of_reg: int, callback: callable) -> TCP | None:
+    async def try_reconnect(self, modbus_port: int, ip_address: str, slave_addr: int, starting_addr: int, number_of_reg: int, callback: callable) -> AsyncTCP | None:
         for i in range(0, 5):
             try:
                 self.logger.info(f"Try to reconnect on ip address: {ip_address}")
                 result = await self.scan_ip_address(ip_address, modbus_port, slave_addr, starting_addr, number_of_reg, callback)
                 if result is not None:
                     self.logger.info(f"Device found on ip address: {ip_address}")
-                    return result
+                    return self.use_connection(result)
             except asyncio.TimeoutError:
                 pass
             except Exception as e:
@@ -126,3 +203,9 @@ class Datalayer:
         self.data["id"]: str = "-,-"
         self.data["ip"]: str = ""
         self.data["type"]: str = ""
+        self.version: int = 0  # incremented by commit() after every change of data
+        self.tracker: ChangeTracker = ChangeTracker()
+
+    # Mark the end of a cycle, readers serialise the data once per version
+    def commit(self) -> None:
+        self.version = self.tracker.commit(self.data)
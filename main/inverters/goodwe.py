@@ -1,33 +1,37 @@
 from main.inverters.base import BaseInverter
-from umodbus.tcp import TCP
+from main.inverters.modbus_tcp import AsyncTCP
+from main.register_map import RegisterMap, BIG_ENDIAN
 from gc import collect
-from asyncio import sleep
 
 collect()
 
+# field, address, count, scale, divisor, signed, word order
+REGISTER_MAP: RegisterMap = RegisterMap((
+    ("p1", 36005, 1, -1, 1, True, BIG_ENDIAN),
+    ("p2", 36006, 1, -1, 1, True, BIG_ENDIAN),
+    ("p3", 36007, 1, -1, 1, True, BIG_ENDIAN),
+    ("i1", 36055, 1, 10, 1, False, BIG_ENDIAN),
+    ("i2", 36056, 1, 10, 1, False, BIG_ENDIAN),
+    ("i3", 36057, 1, 10, 1, False, BIG_ENDIAN),
+    ("soc", 37007, 1, 1, 1, True, BIG_ENDIAN),
+), max_gap=50)
+
 
 class Goodwe(BaseInverter):
 
     def __init__(self, *args, **kwargs):
         super(Goodwe, self).__init__(*args, **kwargs)
         self.modbus_port: int = 502
-        self.modbus_tcp: TCP = None
+        self.modbus_tcp: AsyncTCP = None
         self.device_type: int = 35011
         self.data_layer.data["type"] = "Goodwe"
+        self.register_map: RegisterMap = REGISTER_MAP
 
     async def run(self):
         self.data_layer.data["status"] = self.connection_status
         if self.modbus_tcp is not None:
             try:
-                response = self.modbus_tcp.read_holding_registers(slave_addr=1, starting_addr=36055, register_qty=3)
-                self.process_msg(response, starting_addr=36055)
-                await sleep(1)
-                response = self.modbus_tcp.read_holding_registers(slave_addr=1, starting_addr=36005, register_qty=3)
-                self.process_msg(response, starting_addr=36005)
-                await sleep(1)
-                response = self.modbus_tcp.read_holding_registers(slave_addr=1, starting_addr=37007, register_qty=1)
-                self.process_msg(response, starting_addr=37007)
-
+                await self.poll()
                 self.reconnect_error_cnt = 0
                 self.data_layer.data["ip"] = self.set_ip_address
 
@@ -58,7 +62,7 @@ class Goodwe(BaseInverter):
 
     async def scann(self) -> None:
         self.data_layer.data["status"] = 2
-        self.modbus_tcp: TCP = await self.scan_network(modbus_port=self.modbus_port,
+        self.modbus_tcp: AsyncTCP = await self.scan_network(modbus_port=self.modbus_port,
                                                        ip_address=self.wifi_manager.get_ip(),
                                                        slave_addr=1,
                                                        starting_addr=self.device_type,
@@ -66,25 +70,17 @@ class Goodwe(BaseInverter):
                                                        callback=self.check_msg)
         collect()
 
-    def process_msg(self, response: tuple, starting_addr: int) -> None:
-        if starting_addr == 36055 and len(response) > 2:
-            self.data_layer.data["u1"] = self.wattmeter.data_layer.data["U1"]
-            self.data_layer.data["i1"] = int(response[0]) * 10 if self.data_layer.data["p1"] > 0 else int(
-                response[0]) * -10
-            self.data_layer.data["u2"] = self.wattmeter.data_layer.data["U1"]
-            self.data_layer.data["i2"] = int(response[1]) * 10 if self.data_layer.data["p2"] > 0 else int(
-                response[1]) * -10
-            self.data_layer.data["u3"] = self.wattmeter.data_layer.data["U1"]
-            self.data_layer.data["i3"] = int(response[2]) * 10 if self.data_layer.data["p3"] > 0 else int(
-                response[2]) * -10
-
-        if starting_addr == 36005 and len(response) > 2:
-            self.data_layer.data["p1"] = (response[0] - 65535) * -1 if response[0] > 32767 else response[0] * -1
-            self.data_layer.data["p2"] = (response[1] - 65535) * -1 if response[1] > 32767 else response[1] * -1
-            self.data_layer.data["p3"] = (response[2] - 65535) * -1 if response[2] > 32767 else response[2] * -1
-
-        elif starting_addr == 37007 and len(response) > 0:
-            self.data_layer.data["soc"] = response[0]
+    def process_msg(self) -> None:
+        self.data_layer.data["u1"] = self.wattmeter.data_layer.data["U1"]
+        self.data_layer.data["u2"] = self.wattmeter.data_layer.data["U1"]
+        self.data_layer.data["u3"] = self.wattmeter.data_layer.data["U1"]
+        # current registers are unsigned, direction follows the phase power
+        if self.data_layer.data["p1"] <= 0:
+            self.data_layer.data["i1"] = -self.data_layer.data["i1"]
+        if self.data_layer.data["p2"] <= 0:
+            self.data_layer.data["i2"] = -self.data_layer.data["i2"]
+        if self.data_layer.data["p3"] <= 0:
+            self.data_layer.data["i3"] = -self.data_layer.data["i3"]
 
     def check_msg(self, result: tuple) -> bool:
         device_type = ''
@@ -0,0 +1,179 @@
+import uasyncio as asyncio
+import ulogging
+from main.inverters.base import Datalayer, UNCONNECTED, CONNECTED, SEARCHING
+
+POLL_WAIT: int = 1500  # ms the group waits for the polls of connected inverters before aggregating
+POLL_CHECK: int = 20  # ms between checks of the running polls
+
+# config keys of every inverter slot: type, remembered address, battery capacity
+INVERTER_SLOTS: tuple = (
+    ('bti,INVERTER-TYPE', 'INVERTER_IP_ADDR', 'in,BATTERY-CAPACITY'),
+    ('bti,INVERTER2-TYPE', 'INVERTER2_IP_ADDR', 'in,BATTERY2-CAPACITY'),
+)
+
+
+def make_inverter(inverter_type: int, wifi, config, wattmeter, ip_key: str):
+    # drivers are imported only when configured, every module costs heap
+    if inverter_type == 1:
+        from main.inverters.goodwe import Goodwe
+        return Goodwe(wifi, config, wattmeter=wattmeter, ip_key=ip_key)
+    elif inverter_type == 2:
+        from main.inverters.solax import Solax
+        return Solax(wifi, config, ip_key=ip_key)
+    elif inverter_type == 3:
+        from main.inverters.victron import Victron
+        return Victron(wifi, config, wattmeter=wattmeter, ip_key=ip_key)
+    elif inverter_type == 4:
+        from main.inverters.huawei import Huawei
+        return Huawei(wifi, config, ip_key=ip_key)
+    elif inverter_type == 5:
+        from main.inverters.infigy import Infigy
+        return Infigy(wifi, config, ip_key=ip_key)
+    elif inverter_type == 6:
+        from main.inverters.rs485_tcp import RS485_Tcp
+        return RS485_Tcp(wifi, config, ip_key=ip_key)
+    return None
+
+
+def make_group(wifi, config, wattmeter):
+    """
+    InverterGroup of the configured inverter slots, None when no inverter is configured.
+    """
+    inverters: list = []
+    capacities: list = []
+    for type_key, ip_key, capacity_key in INVERTER_SLOTS:
+        inverter = make_inverter(int(config.data[type_key]), wifi, config, wattmeter, ip_key)
+        if inverter is not None:
+            inverters.append(inverter)
+            capacities.append(int(config.data[capacity_key]))
+    if not inverters:
+        return None
+    return InverterGroup(inverters, capacities, config)
+
+
+class InverterGroup:
+    """
+    Inverters and battery systems of one installation polled concurrently, each in its own task,
+    so a device which is scanning or reconnecting does not delay the polls of the others.
+    data_layer has the keys of a single inverter: phase power and current are summed over the
+    connected devices, voltage is their mean and soc the minimum or the capacity weighted mean
+    of the devices with a battery (capacity above 0), the last value while none of them is connected.
+    """
+
+    def __init__(self, inverters: list, capacities: list, config) -> None:
+        self.inverters: list = inverters
+        self.capacities: list = capacities
+        self.config = config
+        self.tasks: list = [None] * len(inverters)
+        self.data_layer: Datalayer = Datalayer()
+        self.data_layer.data["type"] = ",".join(inverter.data_layer.data["type"] for inverter in inverters)
+        self.connection_status: int = UNCONNECTED
+        self.claimed: dict = {}  # ip address -> inverter probing it or connected to it
+        for inverter in inverters:
+            inverter.group = self
+
+        self.logger = ulogging.getLogger("InverterGroup")
+        if config.snapshot.testing_software:
+            self.logger.setLevel(ulogging.DEBUG)
+        else:
+            self.logger.setLevel(ulogging.INFO)
+
+    def is_claimed(self, ip_address: str, inverter) -> bool:
+        for other in self.inverters:
+            if other is not inverter and other.connection_status == CONNECTED and other.set_ip_address == ip_address:
+                return True
+        return False
+
+    def claim(self, ip_address: str, inverter) -> bool:
+        """
+        Reserve ip_address for inverter before probing it, False when another inverter of the group holds it.
+        The reservation is kept while the inverter is connected to the address.
+        """
+        owner = self.claimed.get(ip_address)
+        if (owner is not None and owner is not inverter) or self.is_claimed(ip_address, inverter):
+            return False
+        self.claimed[ip_address] = inverter
+        return True
+
+    def release(self, ip_address: str, inverter) -> None:
+        if self.claimed.get(ip_address) is inverter:
+            del self.claimed[ip_address]
+
+    def release_all(self, inverter) -> None:
+        for ip_address in [ip_address for ip_address, owner in self.claimed.items() if owner is inverter]:
+            del self.claimed[ip_address]
+
+    async def step(self, inverter) -> None:
+        try:
+            if inverter.connection_status == UNCONNECTED:
+                await inverter.scann()
+            await inverter.run()
+        except Exception as e:
+            self.logger.error("{} error: {}".format(inverter.data_layer.data["type"], e))
+
+    async def run(self) -> None:
+        polls: list = []
+        for i in range(0, len(self.inverters)):
+            task = self.tasks[i]
+            if task is None or task.done():
+                task = asyncio.create_task(self.step(self.inverters[i]))
+                self.tasks[i] = task
+                if self.inverters[i].connection_status == CONNECTED:
+                    polls.append(task)
+        waited: int = 0
+        while waited < POLL_WAIT and any(not task.done() for task in polls):
+            await asyncio.sleep_ms(POLL_CHECK)
+            waited += POLL_CHECK
+        self.aggregate()
+
+    def aggregate(self) -> None:
+        data: dict = self.data_layer.data
+        phases: tuple = ("p1", "p2", "p3", "i1", "i2", "i3")
+        for key in phases:
+            data[key] = 0
+        voltages: list = [0, 0, 0]
+        voltage_count: list = [0, 0, 0]
+        soc_min: int | None = None
+        soc_sum: int = 0
+        capacity_sum: int = 0
+        connected: int = 0
+        ids: list = []
+        ips: list = []
+        for i in range(0, len(self.inverters)):
+            inverter = self.inverters[i]
+            inverter.data_layer.commit()
+            source: dict = inverter.data_layer.data
+            ids.append(source["id"])
+            ips.append(source["ip"])
+            if inverter.connection_status != CONNECTED:
+                continue
+            connected += 1
+            for key in phases:
+                data[key] += source[key]
+            for phase in range(0, 3):
+                voltage: int = source["u{}".format(phase + 1)]
+                if voltage > 0:
+                    voltages[phase] += voltage
+                    voltage_count[phase] += 1
+            if self.capacities[i] > 0:
+                if soc_min is None or source["soc"] < soc_min:
+                    soc_min = source["soc"]
+                soc_sum += source["soc"] * self.capacities[i]
+                capacity_sum += self.capacities[i]
+        for phase in range(0, 3):
+            data["u{}".format(phase + 1)] = voltages[phase] // voltage_count[phase] if voltage_count[phase] else 0
+        # without a connected battery the last soc is kept, a drop to 0 would engage the SOC lock during an outage
+        if self.config.data['sw,WEIGHTED SOC'] == '1' and capacity_sum > 0:
+            data["soc"] = soc_sum // capacity_sum
+        elif soc_min is not None:
+            data["soc"] = soc_min
+        data["id"] = ",".join(ids)
+        data["ip"] = ",".join(ips)
+        if connected > 0:
+            self.connection_status = CONNECTED
+        elif any(inverter.connection_status == SEARCHING for inverter in self.inverters):
+            self.connection_status = SEARCHING
+        else:
+            self.connection_status = UNCONNECTED
+        data["status"] = self.connection_status
+        self.data_layer.commit()
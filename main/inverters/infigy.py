@@ -1,5 +1,5 @@
 from main.inverters.base import BaseInverter
-from umodbus.tcp import TCP
+from main.inverters.modbus_tcp import AsyncTCP
 
 
 class Infigy(BaseInverter):
@@ -0,0 +1,75 @@
+import uasyncio as asyncio
+import struct
+import errno
+
+READ_HOLDING_REGISTERS: int = 0x03
+READ_INPUT_REGISTERS: int = 0x04
+
+MBAP_HEADER_LENGTH: int = 7
+
+
+class AsyncTCP:
+    """
+    Awaitable Modbus TCP client. Every request has its own deadline, so an unresponsive
+    inverter only delays the task that awaits it, never the whole event loop.
+    Errors are raised as OSError with errno set, like the socket errors of umodbus.tcp.TCP.
+    """
+
+    def __init__(self, slave_ip: str, slave_port: int = 502, timeout: int = 3) -> None:
+        self.slave_ip: str = slave_ip
+        self.slave_port: int = slave_port
+        self.timeout: int = timeout
+        self.transaction_id: int = 0
+        self.reader = None
+        self.writer = None
+
+    async def connect(self) -> None:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.slave_ip, self.slave_port)
+
+    async def close(self) -> None:
+        writer = self.writer
+        self.reader = None
+        self.writer = None
+        if writer is not None:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def read_holding_registers(self, slave_addr: int, starting_addr: int, register_qty: int, signed: bool = True) -> tuple:
+        return await self.read_registers(READ_HOLDING_REGISTERS, slave_addr, starting_addr, register_qty, signed)
+
+    async def read_input_registers(self, slave_addr: int, starting_addr: int, register_qty: int, signed: bool = True) -> tuple:
+        return await self.read_registers(READ_INPUT_REGISTERS, slave_addr, starting_addr, register_qty, signed)
+
+    async def read_registers(self, function_code: int, slave_addr: int, starting_addr: int, register_qty: int, signed: bool) -> tuple:
+        try:
+            return await asyncio.wait_for(self.request(function_code, slave_addr, starting_addr, register_qty, signed), self.timeout)
+        except asyncio.TimeoutError:
+            # the reply may still arrive later and would be read as the answer to the next request
+            await self.close()
+            raise OSError(errno.ETIMEDOUT, "Modbus request timed out")
+        except EOFError:
+            await self.close()
+            raise OSError(errno.ECONNRESET, "Connection closed by inverter")
+        except OSError:
+            await self.close()
+            raise
+
+    async def request(self, function_code: int, slave_addr: int, starting_addr: int, register_qty: int, signed: bool) -> tuple:
+        await self.connect()
+        self.transaction_id = (self.transaction_id + 1) & 0xFFFF
+        self.writer.write(struct.pack('>HHHBBHH', self.transaction_id, 0, 6, slave_addr, function_code, starting_addr, register_qty))
+        await self.writer.drain()
+
+        # MBAP header, function code and byte count (or exception code)
+        header = await self.reader.readexactly(MBAP_HEADER_LENGTH + 2)
+        transaction_id, protocol_id, length, unit_id, function, byte_count = struct.unpack('>HHHBBB', header)
+        if function & 0x80:
+            raise OSError(errno.EIO, "Modbus exception code {}".format(byte_count))
+        payload = await self.reader.readexactly(byte_count)
+        if transaction_id != self.transaction_id or function != function_code or byte_count != register_qty * 2:
+            raise OSError(errno.EIO, "Unexpected Modbus response")
+        return struct.unpack(('>{}h' if signed else '>{}H').format(register_qty), payload)
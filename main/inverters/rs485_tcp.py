@@ -1,25 +1,40 @@
 from main.inverters.base import BaseInverter
-from umodbus.tcp import TCP
+from main.inverters.modbus_tcp import AsyncTCP
+from main.register_map import RegisterMap, BIG_ENDIAN
 from gc import collect
 
 collect()
 
+# field, address, count, scale, divisor, signed, word order
+REGISTER_MAP: RegisterMap = RegisterMap((
+    ("u1", 0, 1, 1, 1, True, BIG_ENDIAN),
+    ("u2", 1, 1, 1, 1, True, BIG_ENDIAN),
+    ("u3", 2, 1, 1, 1, True, BIG_ENDIAN),
+    ("i1", 3, 1, 1, 1, True, BIG_ENDIAN),
+    ("i2", 4, 1, 1, 1, True, BIG_ENDIAN),
+    ("i3", 5, 1, 1, 1, True, BIG_ENDIAN),
+    ("p1", 6, 1, 1, 1, True, BIG_ENDIAN),
+    ("p2", 7, 1, 1, 1, True, BIG_ENDIAN),
+    ("p3", 8, 1, 1, 1, True, BIG_ENDIAN),
+    ("soc", 9, 1, 1, 1, True, BIG_ENDIAN),
+))
+
 
 class RS485_Tcp(BaseInverter):
 
     def __init__(self, *args, **kwargs):
         super(RS485_Tcp, self).__init__(*args, **kwargs)
         self.modbus_port: int = 502
-        self.modbus_tcp: TCP = None
+        self.modbus_tcp: AsyncTCP = None
         self.device_type: int = 50
         self.data_layer.data["type"] = "RS485/TCP"
+        self.register_map: RegisterMap = REGISTER_MAP
 
     async def run(self):
         self.data_layer.data["status"] = self.connection_status
         if self.modbus_tcp is not None:
             try:
-                response = self.modbus_tcp.read_holding_registers(slave_addr=1, starting_addr=0, register_qty=11)
-                self.process_msg(response, starting_addr=0x0)
+                await self.poll()
                 self.reconnect_error_cnt = 0
                 self.data_layer.data["ip"] = self.set_ip_address
 
@@ -49,7 +64,7 @@ class RS485_Tcp(BaseInverter):
 
     async def scann(self) -> None:
         self.data_layer.data["status"] = 2
-        self.modbus_tcp: TCP = await self.scan_network(modbus_port=self.modbus_port,
+        self.modbus_tcp: AsyncTCP = await self.scan_network(modbus_port=self.modbus_port,
                                                        ip_address=self.wifi_manager.get_ip(),
                                                        slave_addr=1,
                                                        starting_addr=self.device_type,
@@ -57,21 +72,6 @@ class RS485_Tcp(BaseInverter):
                                                        callback=self.check_msg)
         collect()
 
-    def process_msg(self, response: tuple, starting_addr: int) -> None:
-
-        if starting_addr == 0x0:
-            print(response)
-            self.data_layer.data["u1"] = int(response[0])
-            self.data_layer.data["u2"] = int(response[1])
-            self.data_layer.data["u3"] = int(response[2])
-            self.data_layer.data["i1"] = int(response[3])
-            self.data_layer.data["i2"] = int(response[4])
-            self.data_layer.data["i3"] = int(response[5])
-            self.data_layer.data["p1"] = int(response[6])
-            self.data_layer.data["p2"] = int(response[7])
-            self.data_layer.data["p3"] = int(response[8])
-            self.data_layer.data["soc"] = int(response[9])
-
     def check_msg(self, result: tuple) -> bool:
         device_type = ''
         for i in result:
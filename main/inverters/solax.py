@@ -1,33 +1,39 @@
 from main.inverters.base import BaseInverter
-from umodbus.tcp import TCP
+from main.inverters.modbus_tcp import AsyncTCP
+from main.inverters.modbus_tcp import READ_INPUT_REGISTERS
+from main.register_map import RegisterMap, BIG_ENDIAN, LITTLE_ENDIAN
 from gc import collect
-from asyncio import sleep
 
 collect()
 
+# field, address, count, scale, divisor, signed, word order
+REGISTER_MAP: RegisterMap = RegisterMap((
+    ("soc", 0x1C, 1, 1, 1, True, BIG_ENDIAN),
+    ("u1", 0x6A, 1, 1, 10, True, BIG_ENDIAN),
+    ("u2", 0x6E, 1, 1, 10, True, BIG_ENDIAN),
+    ("u3", 0x72, 1, 1, 10, True, BIG_ENDIAN),
+    ("p1", 0x82, 2, -1, 1, True, LITTLE_ENDIAN),
+    ("p2", 0x84, 2, -1, 1, True, LITTLE_ENDIAN),
+    ("p3", 0x86, 2, -1, 1, True, LITTLE_ENDIAN),
+), function_code=READ_INPUT_REGISTERS)
+
 
 class Solax(BaseInverter):
 
     def __init__(self, *args, **kwargs):
         super(Solax, self).__init__(*args, **kwargs)
         self.modbus_port: int = 502
-        self.modbus_tcp: TCP = None
+        self.modbus_tcp: AsyncTCP = None
         self.device_type: int = 0x0
         self.data_layer.data["type"] = "Solax"
+        self.register_map: RegisterMap = REGISTER_MAP
         #self.reset_wifi_dongle()
 
     async def run(self):
         self.data_layer.data["status"] = self.connection_status
         if self.modbus_tcp is not None:
             try:
-                response = self.modbus_tcp.read_input_registers(slave_addr=1, starting_addr=0x006A, register_qty=11)
-                self.process_msg(response, starting_addr=0x006A)
-                await sleep(1)
-                response = self.modbus_tcp.read_input_registers(slave_addr=1, starting_addr=0x0082, register_qty=6)
-                self.process_msg(response, starting_addr=0x0082)
-                await sleep(1)
-                response = self.modbus_tcp.read_input_registers(slave_addr=1, starting_addr=0x1C, register_qty=1)
-                self.process_msg(response, starting_addr=0x1C)
+                await self.poll()
                 self.reconnect_error_cnt = 0
                 self.data_layer.data["ip"] = self.set_ip_address
 
@@ -69,7 +75,7 @@ class Solax(BaseInverter):
     async def scann(self) -> None:
         #self.reset_wifi_dongle()
         self.data_layer.data["status"] = 2
-        self.modbus_tcp: TCP = await self.scan_network(modbus_port=self.modbus_port,
+        self.modbus_tcp: AsyncTCP = await self.scan_network(modbus_port=self.modbus_port,
                                                        ip_address=self.wifi_manager.get_ip(),
                                                        slave_addr=1,
                                                        starting_addr=self.device_type,
@@ -77,26 +83,13 @@ class Solax(BaseInverter):
                                                        callback=self.check_msg)
         collect()
 
-    def process_msg(self, response: tuple, starting_addr: int) -> None:
-
-        if starting_addr == 0x006A:
-            self.data_layer.data["u1"] = int(response[0] / 10)
-            self.data_layer.data["u2"] = int(response[4] / 10)
-            self.data_layer.data["u3"] = int(response[8] / 10)
-
-        elif starting_addr == 0x0082:
-            self.data_layer.data["p1"] = -1 * int((response[1] << 16) | response[0])
-            self.data_layer.data["p2"] = -1 * int((response[3] << 16) | response[2])
-            self.data_layer.data["p3"] = -1 * int((response[5] << 16) | response[4])
-            self.data_layer.data["i1"] = int((self.data_layer.data["p1"] * 100) / self.data_layer.data["u1"]) if (
-                    self.data_layer.data["u1"] > 0) else 0
-            self.data_layer.data["i2"] = int((self.data_layer.data["p2"] * 100) / self.data_layer.data["u2"]) if (
-                    self.data_layer.data["u2"] > 0) else 0
-            self.data_layer.data["i3"] = int((self.data_layer.data["p3"] * 100) / self.data_layer.data["u3"]) if (
-                    self.data_layer.data["u3"] > 0) else 0
-
-        elif starting_addr == 0x1C:
-            self.data_layer.data["soc"] = int(response[0])
+    def process_msg(self) -> None:
+        self.data_layer.data["i1"] = int((self.data_layer.data["p1"] * 100) / self.data_layer.data["u1"]) if (
+                self.data_layer.data["u1"] > 0) else 0
+        self.data_layer.data["i2"] = int((self.data_layer.data["p2"] * 100) / self.data_layer.data["u2"]) if (
+                self.data_layer.data["u2"] > 0) else 0
+        self.data_layer.data["i3"] = int((self.data_layer.data["p3"] * 100) / self.data_layer.data["u3"]) if (
+                self.data_layer.data["u3"] > 0) else 0
 
     def check_msg(self, result: tuple) -> bool:
         device_type = ''
@@ -1,29 +1,35 @@
 from main.inverters.base import BaseInverter
-from umodbus.tcp import TCP
+from main.inverters.modbus_tcp import AsyncTCP
+from main.register_map import RegisterMap, BIG_ENDIAN
 from gc import collect
-from asyncio import sleep
 
 collect()
 
+# field, address, count, scale, divisor, signed, word order
+REGISTER_MAP: RegisterMap = RegisterMap((
+    ("p1", 820, 1, 1, 1, True, BIG_ENDIAN),
+    ("p2", 821, 1, 1, 1, True, BIG_ENDIAN),
+    ("p3", 822, 1, 1, 1, True, BIG_ENDIAN),
+    ("soc", 843, 1, 1, 1, True, BIG_ENDIAN),
+), max_gap=24)
+
 
 class Victron(BaseInverter):
 
     def __init__(self, *args, **kwargs):
         super(Victron, self).__init__(*args, **kwargs)
         self.modbus_port: int = 502
-        self.modbus_tcp: TCP = None
+        self.modbus_tcp: AsyncTCP = None
         self.device_type: int = 800
         self.data_layer.data["type"] = "Victron"
+        self.register_map: RegisterMap = REGISTER_MAP
+        self.slave_addr: int = 100
 
     async def run(self):
         self.data_layer.data["status"] = self.connection_status
         if self.modbus_tcp is not None:
             try:
-                response = self.modbus_tcp.read_holding_registers(slave_addr=100, starting_addr=820, register_qty=3)
-                self.process_msg(response, starting_addr=820)
-                await sleep(1)
-                response = self.modbus_tcp.read_holding_registers(slave_addr=100, starting_addr=843, register_qty=1)
-                self.process_msg(response, starting_addr=843)
+                await self.poll()
                 self.reconnect_error_cnt = 0
                 self.data_layer.data["ip"] = self.set_ip_address
 
@@ -54,7 +60,7 @@ class Victron(BaseInverter):
 
     async def scann(self) -> None:
         self.data_layer.data["status"] = 2
-        self.modbus_tcp: TCP = await self.scan_network(modbus_port=self.modbus_port,
+        self.modbus_tcp: AsyncTCP = await self.scan_network(modbus_port=self.modbus_port,
                                                        ip_address=self.wifi_manager.get_ip(),
                                                        slave_addr=100,
                                                        starting_addr=self.device_type,
@@ -62,24 +68,16 @@ class Victron(BaseInverter):
                                                        callback=self.check_msg)
         collect()
 
-    def process_msg(self, response: tuple, starting_addr: int) -> None:
-
-        if starting_addr == 820:
-            self.data_layer.data["u1"] = self.wattmeter.data_layer.data["U1"]
-            self.data_layer.data["p1"] = int(response[0])
-            self.data_layer.data["u2"] = self.wattmeter.data_layer.data["U1"]
-            self.data_layer.data["p2"] = int(response[1])
-            self.data_layer.data["u3"] = self.wattmeter.data_layer.data["U1"]
-            self.data_layer.data["p3"] = int(response[2])
-            self.data_layer.data["i1"] = int((self.data_layer.data["p1"] * 100) / self.data_layer.data["u1"]) if (
-                    self.data_layer.data["u1"] > 0) else 0
-            self.data_layer.data["i2"] = int((self.data_layer.data["p2"] * 100) / self.data_layer.data["u2"]) if (
-                    self.data_layer.data["u2"] > 0) else 0
-            self.data_layer.data["i3"] = int((self.data_layer.data["p3"] * 100) / self.data_layer.data["u3"]) if (
-                    self.data_layer.data["u3"] > 0) else 0
-
-        elif starting_addr == 843:
-            self.data_layer.data["soc"] = int(response[0])
+    def process_msg(self) -> None:
+        self.data_layer.data["u1"] = self.wattmeter.data_layer.data["U1"]
+        self.data_layer.data["u2"] = self.wattmeter.data_layer.data["U1"]
+        self.data_layer.data["u3"] = self.wattmeter.data_layer.data["U1"]
+        self.data_layer.data["i1"] = int((self.data_layer.data["p1"] * 100) / self.data_layer.data["u1"]) if (
+                self.data_layer.data["u1"] > 0) else 0
+        self.data_layer.data["i2"] = int((self.data_layer.data["p2"] * 100) / self.data_layer.data["u2"]) if (
+                self.data_layer.data["u2"] > 0) else 0
+        self.data_layer.data["i3"] = int((self.data_layer.data["p3"] * 100) / self.data_layer.data["u3"]) if (
+                self.data_layer.data["u3"] > 0) else 0
 
     def check_msg(self, result: tuple) -> bool:
         device_type = ''
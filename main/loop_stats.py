@@ -0,0 +1,50 @@
+class Timing:
+    """
+    Count, last, minimum, mean and maximum of one measured duration, kept in plain ints.
+    """
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: int = 0
+        self.last: int = 0
+        self.min: int = 0
+        self.max: int = 0
+
+    def add(self, value: int) -> None:
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.last = value
+        self.total += value
+        self.count += 1
+
+    def as_dict(self) -> dict:
+        return {"last": self.last, "min": self.min, "avg": self.total // self.count if self.count else 0, "max": self.max, "count": self.count}
+
+
+class LoopStats:
+    """
+    Timing of the wattmeter/regulation loop, served by /loopStats.
+    """
+
+    def __init__(self) -> None:
+        self.uart_rtt: Timing = Timing()  # us, request to decoded frame
+        self.regulation: Timing = Timing()  # us, valid frame to SSR duty set
+        self.cycle: Timing = Timing()  # ms, start to start of interface_handler cycles
+        self.valid_frames: int = 0
+        self.invalid_frames: int = 0
+        self.period: int = 0  # ms, poll period chosen for the next cycle
+        self.volatility: int = 0  # W, smoothed change of P_REGULATION between frames
+
+    def reset(self) -> None:
+        self.uart_rtt = Timing()
+        self.regulation = Timing()
+        self.cycle = Timing()
+        self.valid_frames = 0
+        self.invalid_frames = 0
+
+    def as_dict(self) -> dict:
+        return {"UART_RTT_US": self.uart_rtt.as_dict(), "REGULATION_US": self.regulation.as_dict(), "CYCLE_MS": self.cycle.as_dict(),
+                "VALID_FRAMES": self.valid_frames, "INVALID_FRAMES": self.invalid_frames, "PERIOD_MS": self.period,
+                "VOLATILITY_W": self.volatility}
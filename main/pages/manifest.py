@@ -0,0 +1,12 @@
+# Autogenerated file, run tools/build_pages.py after changing main/template
+PAGE_DIR = __file__.rsplit('/', 1)[0] if '/' in __file__ else '.'
+
+# page: (gzip file, strong ETag, size)
+PAGES = {
+    'datatable.html': (PAGE_DIR + '/datatable.html.gz', '"92538730f3d8e5ed"', 48),
+    'energyChart.html': (PAGE_DIR + '/energyChart.html.gz', '"2386aaa3acaa160c"', 53),
+    'main.html': (PAGE_DIR + '/main.html.gz', '"ea5312ce85d612ac"', 186),
+    'overview.html': (PAGE_DIR + '/overview.html.gz', '"90eaffada03e0b46"', 52),
+    'powerChart.html': (PAGE_DIR + '/powerChart.html.gz', '"7116235a2c81b32e"', 54),
+    'settings.html': (PAGE_DIR + '/settings.html.gz', '"c8bc1c2b8de499dd"', 51),
+}
@@ -0,0 +1,83 @@
+# word order of 32-bit values
+BIG_ENDIAN: int = 0  # high word first
+LITTLE_ENDIAN: int = 1  # low word first
+
+MAX_GAP: int = 16  # unused registers that may be read to join two ranges into one transaction
+MAX_BLOCK: int = 125  # Modbus limit of registers per read request
+
+
+class RegisterMap:
+    """
+    Declarative description of a device's registers.
+    Each register is a tuple (field, address, count, scale, divisor, signed, word order),
+    value of field is int(raw * scale / divisor). Registers are read with function_code
+    (0x03 holding, 0x04 input). Nearby registers are planned into as few
+    read transactions as possible and decoders are precompiled to offsets inside the block.
+    The map is shared by all drivers of a vendor, whether a device needs the exact ranges is kept by the driver.
+    """
+
+    def __init__(self, registers: tuple, function_code: int = 0x03, max_gap: int = MAX_GAP, max_block: int = MAX_BLOCK) -> None:
+        self.function_code: int = function_code
+        self.blocks: list = self.plan(registers, max_gap, max_block)
+        # plan without reading unused registers, used when the device rejects a merged block
+        self.split_blocks: list = self.plan(registers, 0, max_block)
+
+    @staticmethod
+    def plan(registers: tuple, max_gap: int, max_block: int) -> list:
+        ranges: list = []
+        for register in sorted(registers, key=lambda r: r[1]):
+            address: int = register[1]
+            end: int = address + register[2]
+            if ranges and address - ranges[-1][1] <= max_gap and end - ranges[-1][0] <= max_block:
+                ranges[-1][1] = max(ranges[-1][1], end)
+                ranges[-1][2].append(register)
+            else:
+                ranges.append([address, end, [register]])
+
+        blocks: list = []
+        for start, end, members in ranges:
+            decoders: list = []
+            for field, address, count, scale, divisor, signed, word_order in members:
+                decoders.append((field, address - start, count, scale, divisor, signed, word_order))
+            blocks.append((start, end - start, tuple(decoders)))
+        return blocks
+
+    async def read(self, modbus_tcp, slave_addr: int, target: dict, split: bool = False) -> None:
+        for block in self.split_blocks if split else self.blocks:
+            registers = await modbus_tcp.read_registers(self.function_code, slave_addr, block[0], block[1], False)
+            self.decode(block[2], registers, target)
+
+    def decode_frame(self, data: bytes, target: dict) -> None:
+        """
+        Decode a raw big-endian frame starting at the first register of the map straight into target.
+        Words are taken from byte offsets, so no intermediate tuple or list is allocated per frame.
+        """
+        for field, offset, count, scale, divisor, signed, word_order in self.blocks[0][2]:
+            offset <<= 1
+            word: int = (data[offset + 2] << 8) | data[offset + 3] if count == 2 else 0
+            target[field] = self.convert((data[offset] << 8) | data[offset + 1], word, count, scale, divisor, signed,
+                                         word_order)
+
+    @classmethod
+    def decode(cls, decoders: tuple, registers: tuple, target: dict) -> None:
+        for field, offset, count, scale, divisor, signed, word_order in decoders:
+            word: int = registers[offset + 1] if count == 2 else 0
+            target[field] = cls.convert(registers[offset], word, count, scale, divisor, signed, word_order)
+
+    # Value of a register, or of a 32-bit pair with word the register after it, in engineering units
+    @staticmethod
+    def convert(value: int, word: int, count: int, scale: int, divisor: int, signed: bool, word_order: int) -> int:
+        if count == 2:
+            if word_order == BIG_ENDIAN:
+                value = (value << 16) | word
+            else:
+                value = (word << 16) | value
+            if signed and value > 0x7FFFFFFF:
+                value -= 0x100000000
+        elif signed and value > 0x7FFF:
+            value -= 0x10000
+        if scale != 1:
+            value *= scale
+        if divisor != 1:
+            value = int(value / divisor)
+        return value
@@ -1,21 +1,14 @@
-from machine import Pin, PWM
 from collections import OrderedDict
 import ulogging
+from main.config_snapshot import ConfigSnapshot
+from main.clock import MINUTE
+from main.dispatcher import Dispatcher, SSR1, RELAY
 
-SSR1_PIN: int = 33
-SSR2_PIN: int = 23
-RELAY_PIN: int = 19
-
-FREQUENCY: int = 20
-WATTER_CONST: int = 4180
 MODE_OFF: int = 0
 MODE_HDO: int = 1
 MODE_BOOST: int = 2
 MODE_HDO_BOOST: int = 3
 
-PWM_MAX: int = 1023
-PWM_OFF: int = 0
-
 OVERFLOW_TIMEOUT: int = 120  # v sekundach
 
 SOC_HYST: int = 5
@@ -28,76 +21,69 @@ class Regulation:
         self.power_hyst: int = 0
         self.power_step_count: int = 0
         self.power_step: int = 0
-        self.ssr1: PWM = PWM(Pin(SSR1_PIN), FREQUENCY)
-        self.relay = Pin(19, Pin.OUT)
+        self.dispatcher: Dispatcher = Dispatcher()
+        self.relay = self.dispatcher.relay
         self.config: OrderedDict[str, str] = config
         self.wattmeter = wattmeter
         self.target_power: int = 0
-        self.temp_input: int = 10
-        self.tuv_energy_night: int = 0
-        self.tuv_energy_morning: int = 0
         self.overflow_limit: int = -30  # limit pro handlovani pretoku
         self.delay: int = 0
         self.overflow_checker_cnt: int = 0
         self.soc_off: bool = False
 
         self.relay_timeout_cnt: int = 0
-        self.last_minute: int = 0
-
         self.boost_timeout_cnt: int = 0
-        self.last_minute1: int = 0
 
         self.target_duty: int = 0
-        self.sec_night_boost: int = 0  # kolik sekund se musinahrivat aby se dosahlo teloty boostu
-        self.sec_morning_boost: int = 0
+        self.last_error: float = 0  # regulacni odchylka predchozi periody PI regulace
+        self.pi_state: tuple = (0, 0)  # target_power a last_error pred poslednim krokem PI regulace
         self.power_simulator: int = 0
         self.overflow_cnt_checker: int = 0
 
         self.logger = ulogging.getLogger("Regulation")
-        if int(self.config.data['sw,TESTING SOFTWARE']) == 1:
+        if self.config.snapshot.testing_software:
             self.logger.setLevel(ulogging.DEBUG)
         else:
             self.logger.setLevel(ulogging.INFO)
 
+        self.wattmeter.clock.subscribe(MINUTE, self.minute_rollover)
+
+    # odpocet minut sepnuteho rele a manualniho boostu
+    def minute_rollover(self, events: int) -> None:
+        if self.relay.value() == 1:
+            self.relay_timeout_cnt -= 1
+        if self.config.data['BOOST'] != '0':
+            self.boost_timeout_cnt -= 1
+
     def run(self, hour: int, minute: int, power: int, soc: int | None = None) -> None:
+        config: ConfigSnapshot = self.config.snapshot
 
         if power > 32767:  # max kladne cislo
             power = power - 65536  # uint16 vcetne 0
 
         actual_time: int = hour * 3600 + minute * 60  # kolikata sekunda od pulnoci
 
-        self.power_step = int(self.config.data['in,TUV-POWER']) / (1000 / FREQUENCY / 20 * 2)  # 1000ms 20ms
-        self.power_step_count = int(self.config.data['in,TUV-POWER']) / self.power_step
-        self.power_hyst = self.power_step / 4  # hystereze regulace 1/4 minimalniho kroku
-        self.overflow_limit = -int(self.config.data['in,OVERFLOW-OFFSET'])
-        if self.power_hyst > (-self.overflow_limit):
-            self.power_hyst = (-self.overflow_limit) - 10  # z te konstanty udelat parametr?
-
-        # vypocet energie pro nocni boost
-        self.tuv_energy_night = WATTER_CONST * int(self.config.data['in,TUV-VOLUME']) * (
-                int(self.config.data['in,NIGHT-TEMPERATURE']) - self.temp_input) / 3600
-        # vypocet sekund se ma nahrivat nocni boost, pocitejme ze 1/4 v bojleru zustala, takze 3/4
-        self.sec_night_boost = self.tuv_energy_night * 3600 * 3 / 4 / int(self.config.data['in,TUV-POWER'])
-        # vypocet energie pro ranni boost
-        self.tuv_energy_morning = WATTER_CONST * int(self.config.data['in,TUV-VOLUME']) * (
-                int(self.config.data['in,MORNING-TEMPERATURE']) - self.temp_input) / 3600
-        # vypocet sekund se ma nahrivat ranni boost, pocitejme ze 1/4 v bojleru zustala, takze 3/4
-        self.sec_morning_boost = self.tuv_energy_night * 3600 * 3 / 4 / int(self.config.data['in,TUV-POWER'])
+        self.power_step = config.power_step
+        self.power_step_count = config.power_step_count
+        self.power_hyst = config.power_hyst
+        self.overflow_limit = config.overflow_limit
 
         # self.logger.debug("Power = {}W".format(power))
 
         self.soc_off = self.get_soc_lock(soc)
 
         self.delay += 1
-        if self.delay > 0:  # regulaci zpomalit, jinak kmita
+        if config.pi_control:
+            self.pi_step(power, config)
+        elif self.delay > 0:  # regulaci zpomalit, jinak kmita
             # regulace po periodach 20ms
             if power < self.overflow_limit:
                 self.delay = 0
                 # self.logger.debug("Přidávám")
                 if power < (-self.power_hyst):
                     self.target_power += self.power_step
-                    if self.target_power > int(self.config.data['in,TUV-POWER']):
-                        self.target_power = int(self.config.data['in,TUV-POWER'])
+                    if self.target_power > config.pwm_capacity:
+                        self.target_power = config.pwm_capacity
             elif power > (self.overflow_limit + self.power_hyst):
                 self.delay = 0
                 # self.logger.debug("Ubírám")
@@ -108,80 +94,102 @@ class Regulation:
         if self.soc_off:
             self.target_power = 0
 
-        if power < (-int(self.config.data['in,POWER-RELAY'])):
+        # vykon PWM vystupu s nizsi prioritou nez rele pripada rele
+        lower_power: int = self.dispatcher.lower_power(config)
+        if (power - lower_power) < (-config.power_relay):
             if not self.soc_off:
                 if self.relay.value() == 0:
-                    self.relay_timeout_cnt = int(self.config.data['in,TIMEOUT-RELAY'])
-                    self.last_minute = minute
-                self.relay.on()
-                self.wattmeter.data_layer.data["RELAY"] = 1
+                    self.relay_timeout_cnt = config.timeout_relay
+                    self.relay.on()
+                    self.wattmeter.data_layer.data["RELAY"] = 1
+                    # rele prebira vykon od vystupu s nizsi prioritou
+                    self.target_power -= min(config.relay_load, lower_power)
+                    if self.target_power < 0:
+                        self.target_power = 0
             else:
                 self.relay.off()
+                self.wattmeter.data_layer.data["RELAY"] = 0
 
-        self.logger.debug(
-            f"Power: {power}W, Minute: {minute}, timeout: {self.relay_timeout_cnt}, Relay: {self.relay.value()}, Target: {self.target_power}, Step: {self.power_step} ")
+        if config.testing_software:
+            self.logger.debug(
+                f"Power: {power}W, Minute: {minute}, timeout: {self.relay_timeout_cnt}, Relay: {self.relay.value()}, Target: {self.target_power}, Step: {self.power_step} ")
 
         if self.relay.value() == 1:
-            if self.last_minute != minute:
-                self.relay_timeout_cnt -= 1
-                self.last_minute = minute
             if (self.relay_timeout_cnt < 1):
-                if (int(self.config.data['in,POWER-RELAY']) + power) > int(self.config.data['in,RELAY-LOAD']):
+                if (config.power_relay + power) > config.relay_load and lower_power == 0:
                     self.relay.off()
                     self.wattmeter.data_layer.data["RELAY"] = 0
+                    if config.pi_control and not self.soc_off:
+                        # PI ubral vykon podle mereni se sepnutym rele, krok se opakuje s vykonem bez rele
+                        self.target_power, self.last_error = self.pi_state
+                        self.pi_step(power - config.relay_load, config)
 
                     # jednou za nejakou periodu nastav SSR na 0, aby se overilo, zda jsou stale pretoky > overflow_limit
-        if self.delay == 0 and ((actual_time - self.overflow_cnt_checker) > OVERFLOW_TIMEOUT):
+        if not config.pi_control and self.delay == 0 and ((actual_time - self.overflow_cnt_checker) > OVERFLOW_TIMEOUT):
             self.overflow_cnt_checker = actual_time
             self.target_power = 0
 
-        # pokud je aktivovany nejaky BOOST
-        if int(self.config.data['btn,BOOST-MODE']) == MODE_BOOST:
+        # pokud je aktivovany nejaky BOOST, vystupy s povolenym boostem jedou naplno
+        boost: bool = False
+        if config.boost_mode == MODE_BOOST:
 
             if self.get_boost_status(actual_time):
-                self.target_power = int(self.config.data['in,TUV-POWER'])
+                boost = True
                 # self.logger.debug("SSR sepnuto casovym boostem")
 
-        elif int(self.config.data['btn,BOOST-MODE']) == MODE_HDO:
+        elif config.boost_mode == MODE_HDO:
 
             if self.wattmeter.data_layer.data['HDO'] != 0:
-                self.target_power = int(self.config.data['in,TUV-POWER'])
+                boost = True
                 # self.logger.debug("SSR sepnuto HDOckem")
 
-        elif int(self.config.data['btn,BOOST-MODE']) == MODE_HDO_BOOST:
+        elif config.boost_mode == MODE_HDO_BOOST:
             if self.get_boost_status(actual_time) and self.wattmeter.data_layer.data['HDO'] != 0:
-                self.target_power = int(self.config.data['in,TUV-POWER'])
+                boost = True
                 # self.logger.debug("ssr sepnuto casovym boostem a soucasne HDO")
 
         # manualni boost talcitkem v apce
-        if int(self.config.data['BOOST']) == 0:
-            self.boost_timeout_cnt = int(self.config.data['in,BOOST-TIMEOUT'])
+        if self.config.data['BOOST'] == '0':
+            self.boost_timeout_cnt = config.boost_timeout
         else:
-            if self.last_minute1 != minute:
-                self.boost_timeout_cnt -= 1
-                self.last_minute1 = minute
             if self.boost_timeout_cnt < 0:
                 self.config.data['BOOST'] = "0"
             else:
-                self.target_power = int(self.config.data['in,TUV-POWER'])
-
-        self.target_duty = int((self.target_power / int(self.config.data['in,TUV-POWER'])) * 1024)
-        if self.target_duty > PWM_MAX:
-            self.target_duty = PWM_MAX
-        self.ssr1.duty(self.target_duty)
+                boost = True
+
+        if boost and config.output_boost[RELAY] and self.relay.value() == 0:
+            self.relay_timeout_cnt = config.timeout_relay
+            self.relay.on()
+            self.wattmeter.data_layer.data["RELAY"] = 1
+
+        self.dispatcher.split(int(self.target_power), boost, config)
+        self.target_duty = self.dispatcher.duty[SSR1]
+
+    # PI regulace v prirustkovem tvaru, integratorem je samotny target_power
+    def pi_step(self, power: int, config: ConfigSnapshot) -> None:
+        self.pi_state = (self.target_power, self.last_error)
+        error: float = config.overflow_limit - power
+        if -config.power_hyst < error < config.power_hyst:
+            error = 0
+        self.target_power += config.pi_gain_p * (error - self.last_error) + config.pi_gain_i * error
+        self.last_error = error
+        # anti-windup, vystup je omezeny rozsahem PWM vystupu a integrator se za mezi nenacita
+        if self.target_power > config.pwm_capacity:
+            self.target_power = config.pwm_capacity
+        elif self.target_power < 0:
+            self.target_power = 0
 
     def get_boost_status(self, time_sec: int) -> bool:
-        if (int(self.config.data['in,NIGHT-BOOST']) - self.sec_night_boost) < time_sec < int(
-                self.config.data['in,NIGHT-BOOST']):
+        config: ConfigSnapshot = self.config.snapshot
+        if (config.night_boost - config.sec_night_boost) < time_sec < config.night_boost:
             return True
-        elif (int(self.config.data['in,MORNING-BOOST']) - self.sec_morning_boost) < time_sec < int(
-                self.config.data['in,MORNING-BOOST']):
+        elif (config.morning_boost - config.sec_morning_boost) < time_sec < config.morning_boost:
             return True
         else:
             return False
 
     def get_soc_lock(self, soc: int) -> bool:
-        soc_stop: int = int(self.config.data['in,STOP-SOC'])
+        soc_stop: int = self.config.snapshot.stop_soc
         if soc != None:
             if soc < soc_stop:
                 return True
@@ -0,0 +1,62 @@
+from array import array
+
+
+class RingBuffer:
+    """
+    Fixed capacity history of records, each made of `width` ints, stored in one preallocated array.
+    Appending overwrites the oldest record when full, nothing is reallocated after construction.
+    """
+
+    def __init__(self, capacity: int, width: int = 1) -> None:
+        self.capacity: int = capacity
+        self.width: int = width
+        self.values: array = array('i', bytearray(4 * capacity * width))
+        self.start: int = 0  # index of the oldest record
+        self.count: int = 0
+        self.version: int = 0  # incremented on every change of the content
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, *values) -> None:
+        if self.count < self.capacity:
+            position: int = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            position = self.start
+            self.start = (self.start + 1) % self.capacity
+        offset: int = position * self.width
+        for i in range(0, self.width):
+            self.values[offset + i] = values[i]
+        self.version += 1
+
+    def set_last(self, index: int, value: int) -> None:
+        if self.count > 0:
+            position: int = (self.start + self.count - 1) % self.capacity
+            if self.values[position * self.width + index] != value:
+                self.values[position * self.width + index] = value
+                self.version += 1
+
+    def clear(self) -> None:
+        self.start = 0
+        self.count = 0
+        self.version += 1
+
+    def export(self, out: list) -> list:
+        """
+        Write the records oldest first into out as [length, values...], the JSON shape used by the charts.
+        out is reused, it only grows while the buffer is filling up.
+        """
+        length: int = self.count * self.width + 1 if self.count > 0 else 0
+        while len(out) < max(length, 1):
+            out.append(0)
+        if len(out) > max(length, 1):
+            del out[max(length, 1):]
+        out[0] = length
+        i: int = 1
+        for record in range(0, self.count):
+            offset: int = ((self.start + record) % self.capacity) * self.width
+            for j in range(0, self.width):
+                out[i] = self.values[offset + j]
+                i += 1
+        return out
@@ -5,9 +5,12 @@ from ntptime import settime
 from asyn import Lock
 from gc import mem_free, collect
 from machine import WDT, RTC
+from utime import ticks_ms, ticks_diff
 from main import web_server_app
 from main import wattmeter
 from main import __config__
+from main.clock import Clock
+from main.inverters.group import make_group
 import ulogging
 
 EVSE_ERR: int = 1
@@ -26,31 +29,15 @@ class TaskHandler:
         self.config.get_config()
         self.wifi_manager = wifi
         watt_interface = wattmeter_com_interface.Interface(115200, lock=Lock(30))
-        self.wattmeter = wattmeter.Wattmeter(wattmeter_interface=watt_interface, config=self.config)
+        self.clock = Clock()
+        self.wattmeter = wattmeter.Wattmeter(wattmeter_interface=watt_interface, config=self.config, clock=self.clock)
 
-        if self.config.data['DHCP'] == '0':
+        if not self.config.snapshot.dhcp:
             print("== Setting static IP ==")
             self.set_static_ip()
 
-        self.inverter = None
-        if int(self.config.data['bti,INVERTER-TYPE']) == 1:
-            from main.inverters.goodwe import Goodwe
-            self.inverter = Goodwe(wifi, self.config, wattmeter=self.wattmeter)
-        elif int(self.config.data['bti,INVERTER-TYPE']) == 2:
-            from main.inverters.solax import Solax
-            self.inverter = Solax(wifi, self.config)
-        elif int(self.config.data['bti,INVERTER-TYPE']) == 3:
-            from main.inverters.victron import Victron
-            self.inverter = Victron(wifi, self.config, wattmeter=self.wattmeter)
-        elif int(self.config.data['bti,INVERTER-TYPE']) == 4:
-            from main.inverters.huawei import Huawei
-            self.inverter = Huawei(wifi, self.config)
-        elif int(self.config.data['bti,INVERTER-TYPE']) == 5:
-            from main.inverters.infigy import Infigy
-            self.inverter = Infigy(wifi, self.config)
-        elif int(self.config.data['bti,INVERTER-TYPE']) == 6:
-            from main.inverters.rs485_tcp import RS485_Tcp
-            self.inverter = RS485_Tcp(wifi, self.config)
+        # all configured inverters behind one aggregated data layer, None without inverters
+        self.inverter = make_group(wifi, self.config, self.wattmeter)
 
         self.web_server_app = web_server_app.WebServerApp(wifi, self.wattmeter, watt_interface, self.config, self.inverter)
         self.setting_after_new_connection: bool = False
@@ -63,7 +50,7 @@ class TaskHandler:
         self.wifi_manager.turnONAp()
 
         self.logger = ulogging.getLogger(__name__)
-        if int(self.config.data['sw,TESTING SOFTWARE']) == 1:
+        if self.config.snapshot.testing_software:
             self.logger.setLevel(ulogging.DEBUG)
         else:
             self.logger.setLevel(ulogging.INFO)
@@ -86,17 +73,17 @@ class TaskHandler:
 
     async def time_handler(self) -> None:
         while True:
-            if self.wifi_manager.is_connected() and self.wattmeter.time_init is False:
+            if self.wifi_manager.is_connected() and not self.clock.synced:
                 try:
                     self.logger.info("Setting time.")
                     settime()
                     rtc = RTC()
                     import utime
                     tampon1 = utime.time()
-                    tampon2 = tampon1 + int(self.config.data["in,TIME-ZONE"]) * 3600
+                    tampon2 = tampon1 + self.config.snapshot.time_zone * 3600
                     (year, month, mday, hour, minute, second, weekday, yearday) = utime.localtime(tampon2)
                     rtc.datetime((year, month, mday, 0, hour, minute, second, 0))
-                    self.wattmeter.time_init = True
+                    self.clock.sync()
                     self.led_error_handler.remove_state(TIME_SYNC_ERR)
                     self.errors &= ~TIME_SYNC_ERR
                 except Exception as e:
@@ -114,10 +101,10 @@ class TaskHandler:
                 if self.wifi_manager.is_connected():
                     if self.ap_timeout > 0:
                         self.ap_timeout -= 1
-                    elif (int(self.config.data['sw,Wi-Fi AP']) == 0) and self.ap_timeout == 0:
+                    elif (not self.config.snapshot.wifi_ap) and self.ap_timeout == 0:
                         self.wifi_manager.turnOfAp()
                         self.led_wifi_handler.remove_state(AP)
-                    elif int(self.config.data['sw,Wi-Fi AP']) == 1:
+                    elif self.config.snapshot.wifi_ap:
                         self.wifi_manager.turnONAp()
 
                     self.led_wifi_handler.add_state(WIFI)
@@ -142,12 +129,18 @@ class TaskHandler:
             await asyncio.sleep(2)
 
     async def interface_handler(self) -> None:
+        last_start: int | None = None
         while True:
+            started: int = ticks_ms()
+            if last_start is not None:
+                self.wattmeter.loop_stats.cycle.add(ticks_diff(started, last_start))
+            last_start = started
             try:
                 if self.inverter is not None:
                     await self.wattmeter.wattmeter_handler(inverter_data=self.inverter.data_layer.data)
                 else:
                     await self.wattmeter.wattmeter_handler()
+                self.web_server_app.notify()
                 self.led_error_handler.remove_state(WATTMETER_ERR)
                 self.errors &= ~WATTMETER_ERR
             except Exception as e:
@@ -155,23 +148,22 @@ class TaskHandler:
                 self.errors |= WATTMETER_ERR
                 self.logger.info("interface_handler error: {}".format(e))
 
-            await asyncio.sleep(0.3)
+            await asyncio.sleep_ms(self.wattmeter.poll_delay(ticks_diff(ticks_ms(), started)))
 
     # Handler for time
     async def system_handler(self) -> None:
         while True:
             self.config.data['ERRORS'] = str(self.errors)
+            self.config.flush()
             self.wdt.feed()
             collect()
             await asyncio.sleep(1)
 
     async def inverter_handler(self) -> None:
         while True:
-            if self.wifi_manager.is_connected():
-                if self.inverter is not None and self.inverter.connection_status == 0:
-                    await self.inverter.scann()
-                if self.inverter is not None:
-                    await self.inverter.run()
+            if self.wifi_manager.is_connected() and self.inverter is not None:
+                await self.inverter.run()
+                self.web_server_app.notify()
             await asyncio.sleep(2)
 
     def main_task_handler_run(self) -> None:
@@ -0,0 +1,255 @@
+import struct
+from utime import localtime, mktime
+
+SERIES_MAGIC: bytes = b'WRS1'
+SERIES_HEADER: str = '<4sHHI'  # magic, record size, resolution in minutes, segment number
+SERIES_HEADER_SIZE: int = 12
+SERIES_RECORD: str = '<IhhhHHHHH'  # start, P min, max, avg, TUV min, max, avg, minutes, HDO minutes
+SERIES_RECORD_SIZE: int = 20
+POWER_MIN: int = -32768  # range of the P fields (h)
+POWER_MAX: int = 32767
+TUV_MAX: int = 65535  # range of the TUV fields (H)
+# resolution in seconds, records per segment file, segment files kept
+TIERS: tuple = (
+    (60, 1440, 2),  # a day per file, today and all of yesterday
+    (900, 672, 4),  # a week per file, 3 to 4 weeks
+    (3600, 672, 3),  # 4 weeks per file, 8 to 12 weeks
+)
+MAX_BUCKETS: int = 1440  # buckets returned by one query
+
+
+class TimeSeries:
+    """
+    Minute log of grid power, TUV power and HDO kept in circular tiers of 1 min, 15 min and 1 h.
+    Each tier is a fixed number of segment files and the file and offset of a period follow from its
+    start time, so appends only extend the current file, a query seeks straight to its window and the
+    oldest segment is truncated and reused when the tier wraps. Coarser tiers are folded from the finer
+    one whenever one of their periods is complete.
+    """
+
+    def __init__(self, prefix: str = 'series') -> None:
+        self.prefix: str = prefix
+        self.buffer: bytearray = bytearray(SERIES_RECORD_SIZE)
+        self.segments: list = [None] * len(TIERS)  # segment number known to be in the current file of each tier
+        # open period of each tier above the first, [start, P min, max, sum, TUV min, max, sum, minutes, HDO minutes]
+        self.pending: list = [None] * len(TIERS)
+        self.restored: bool = False
+        self.last: int | None = None  # start of the last appended minute
+        # envelope of the frames inside the current minute
+        self.power_min: int = 0
+        self.power_max: int = 0
+        self.tuv_min: int = 0
+        self.tuv_max: int = 0
+        self.samples: int = 0
+
+    # Called for every valid wattmeter frame, gives the minute records their min and max
+    def sample(self, power: int, tuv: int) -> None:
+        if self.samples == 0:
+            self.power_min = self.power_max = power
+            self.tuv_min = self.tuv_max = tuv
+        else:
+            if power < self.power_min:
+                self.power_min = power
+            elif power > self.power_max:
+                self.power_max = power
+            if tuv < self.tuv_min:
+                self.tuv_min = tuv
+            elif tuv > self.tuv_max:
+                self.tuv_max = tuv
+        self.samples += 1
+
+    def append(self, start: int, power: int, tuv: int, hdo: int) -> None:
+        """
+        Store the minute beginning at start with its average grid and TUV power from the energy counters.
+        """
+        start -= start % TIERS[0][0]
+        if not self.restored:
+            self.restore(start)
+        if self.samples == 0:
+            self.sample(power, tuv)
+        # out of range values would fail to pack, or wrap on MicroPython, the coarser tiers are built from these
+        record: tuple = (start, self.clamp(min(self.power_min, power), POWER_MIN, POWER_MAX),
+                         self.clamp(max(self.power_max, power), POWER_MIN, POWER_MAX),
+                         self.clamp(power, POWER_MIN, POWER_MAX),
+                         self.clamp(min(self.tuv_min, tuv), 0, TUV_MAX),
+                         self.clamp(max(self.tuv_max, tuv), 0, TUV_MAX),
+                         self.clamp(tuv, 0, TUV_MAX), 1, 1 if hdo else 0)
+        self.samples = 0
+        self.last = start
+        self.write(0, record)
+        self.fold(1, record)
+
+    @staticmethod
+    def clamp(value: int, low: int, high: int) -> int:
+        return low if value < low else high if value > high else value
+
+    def fold(self, level: int, record: tuple) -> None:
+        if level >= len(TIERS):
+            return
+        resolution: int = TIERS[level][0]
+        period: list = self.pending[level]
+        if period is not None and period[0] != record[0] - record[0] % resolution:
+            # the period was left incomplete, e.g. the router was off
+            self.close(level)
+        self.add(level, record)
+        if (record[0] + TIERS[level - 1][0]) % resolution == 0:
+            self.close(level)
+
+    def add(self, level: int, record: tuple) -> None:
+        if self.pending[level] is None:
+            self.pending[level] = self.period(record[0] - record[0] % TIERS[level][0], record)
+        self.merge(self.pending[level], record)
+
+    @staticmethod
+    def period(start: int, record: tuple) -> list:
+        return [start, record[1], record[2], 0, record[4], record[5], 0, 0, 0]
+
+    @staticmethod
+    def merge(period: list, record: tuple) -> None:
+        # averages are weighted by the minutes behind them
+        if record[1] < period[1]:
+            period[1] = record[1]
+        if record[2] > period[2]:
+            period[2] = record[2]
+        period[3] += record[3] * record[7]
+        if record[4] < period[4]:
+            period[4] = record[4]
+        if record[5] > period[5]:
+            period[5] = record[5]
+        period[6] += record[6] * record[7]
+        period[7] += record[7]
+        period[8] += record[8]
+
+    def close(self, level: int) -> None:
+        record: tuple = self.summary(self.pending[level])
+        self.pending[level] = None
+        self.write(level, record)
+        self.fold(level + 1, record)
+
+    @staticmethod
+    def summary(period: list) -> tuple:
+        return (period[0], period[1], period[2], period[3] // period[7], period[4], period[5], period[6] // period[7],
+                period[7], period[8])
+
+    # The open periods are lost on reset, rebuild them from the records of the finer tiers
+    def restore(self, start: int) -> None:
+        self.restored = True
+        for level in range(1, len(TIERS)):
+            period_start: int = start - start % TIERS[level][0]
+            for record in self.records(level - 1, period_start, start):
+                self.add(level, record)
+
+    def file(self, level: int, segment: int) -> str:
+        return "{}{}_{}.bin".format(self.prefix, level, segment % TIERS[level][2])
+
+    def write(self, level: int, record: tuple) -> None:
+        resolution, per_file, files = TIERS[level]
+        index: int = record[0] // resolution
+        segment: int = index // per_file
+        file: str = self.file(level, segment)
+        if self.segments[level] != segment:
+            if self.read_segment(file) != segment:
+                # slot still holds the segment one full ring ago, start it over
+                with open(file, "wb") as f:
+                    f.write(struct.pack(SERIES_HEADER, SERIES_MAGIC, SERIES_RECORD_SIZE, resolution // 60, segment))
+            self.segments[level] = segment
+        # a gap after the end of the file reads back as zeros, which is no valid record
+        with open(file, "r+b") as f:
+            f.seek(SERIES_HEADER_SIZE + (index % per_file) * SERIES_RECORD_SIZE)
+            f.write(struct.pack(SERIES_RECORD, *record))
+
+    @staticmethod
+    def read_segment(file: str) -> int | None:
+        try:
+            with open(file, "rb") as f:
+                header: bytes = f.read(SERIES_HEADER_SIZE)
+        except OSError:
+            return None
+        if len(header) != SERIES_HEADER_SIZE:
+            return None
+        magic, size, minutes, segment = struct.unpack(SERIES_HEADER, header)
+        if magic != SERIES_MAGIC or size != SERIES_RECORD_SIZE:
+            return None
+        return segment
+
+    def records(self, level: int, start: int, end: int):
+        """
+        Yield the stored records of a tier with start <= period start < end.
+        """
+        resolution, per_file, files = TIERS[level]
+        index: int = -(-start // resolution)
+        last: int = (end - 1) // resolution
+        while index <= last:
+            segment: int = index // per_file
+            stop: int = min(last, (segment + 1) * per_file - 1)
+            file: str = self.file(level, segment)
+            if self.read_segment(file) == segment:
+                with open(file, "rb") as f:
+                    f.seek(SERIES_HEADER_SIZE + (index % per_file) * SERIES_RECORD_SIZE)
+                    while index <= stop:
+                        if f.readinto(self.buffer) != SERIES_RECORD_SIZE:
+                            break
+                        record: tuple = struct.unpack(SERIES_RECORD, self.buffer)
+                        if record[0] == index * resolution:
+                            yield record
+                        index += 1
+            index = stop + 1
+
+    def oldest(self, level: int, now: int) -> int:
+        # start of the oldest period still kept by the tier
+        resolution, per_file, files = TIERS[level]
+        return ((now // resolution) // per_file - files + 1) * per_file * resolution
+
+    def plan(self, start: int, end: int, step: int) -> tuple:
+        """
+        (tier, bucket length) for a query, the coarsest tier not coarser than step which still holds start.
+        The bucket length is rounded to the tier resolution and grown to return at most MAX_BUCKETS buckets.
+        """
+        level: int = 0
+        for i in range(0, len(TIERS)):
+            if TIERS[i][0] <= step:
+                level = i
+        now: int = self.last if self.last is not None else end
+        while level + 1 < len(TIERS) and start < self.oldest(level, now):
+            level += 1
+        resolution: int = TIERS[level][0]
+        step = max(step, -(-(end - start) // MAX_BUCKETS), resolution)
+        return level, -(-step // resolution) * resolution
+
+    def query(self, start: int, end: int, step: int):
+        """
+        Yield (start, P min, max, avg, TUV min, max, avg, minutes, HDO minutes) buckets of step seconds
+        covering start <= time < end, reading only the records inside the window.
+        """
+        level, step = self.plan(start, end, step)
+        start -= start % step
+        bucket: list | None = None
+        for record in self.stored(level, start, end):
+            bucket_start: int = record[0] - record[0] % step
+            if bucket is not None and bucket[0] != bucket_start:
+                yield self.summary(bucket)
+                bucket = None
+            if bucket is None:
+                bucket = self.period(bucket_start, record)
+            self.merge(bucket, record)
+        if bucket is not None:
+            yield self.summary(bucket)
+
+    def stored(self, level: int, start: int, end: int):
+        # records of the tier followed by the open periods up to it, so coarse queries include the last minutes
+        yield from self.records(level, start, end)
+        for i in range(level, 0, -1):
+            period: list = self.pending[i]
+            if period is not None and start <= period[0] < end:
+                yield self.summary(period)
+
+    @staticmethod
+    def to_seconds(stamp: int) -> int:
+        # YYYYMMDDhhmm of the RTC local time to RTC seconds
+        return mktime((stamp // 100000000, stamp // 1000000 % 100, stamp // 10000 % 100, stamp // 100 % 100,
+                       stamp % 100, 0, 0, 0))
+
+    @staticmethod
+    def to_stamp(seconds: int) -> int:
+        year, month, day, hour, minute = localtime(seconds)[:5]
+        return (((year * 100 + month) * 100 + day) * 100 + hour) * 100 + minute
@@ -1,189 +1,295 @@
 import ujson as json
-import time
 from machine import Pin, UART
 from gc import collect, mem_free
 import ulogging
 from main.regulation import Regulation
 from collections import OrderedDict
+from main.wattmeter_map import FrameDecoder
+from main.ring_buffer import RingBuffer
+from main.change_tracker import ChangeTracker
+from main.loop_stats import LoopStats
+from main.clock import Clock, MINUTE, HOUR, DAY, SYNC
+from main.time_series import TimeSeries
+from utime import ticks_us, ticks_diff
+import struct
+import os
+
+DAILY_MAGIC: bytes = b'WRD1'
+DAILY_HEADER: str = '<4sHH'  # magic, record size, reserved
+DAILY_HEADER_SIZE: int = 8
+DAILY_RECORD: str = '<HBBIII'  # year, month, day, P, N, TUV energy
+DAILY_DATE: str = '<HBB'
+DAILY_RECORD_SIZE: int = 16
+LEGACY_DAILY_CONSUMPTION: str = 'daily_consumption.dat'
+MONTHLY_MAGIC: bytes = b'WRM1'
+MONTHLY_HEADER: str = '<4sHHI'  # magic, month count, checksum, YYYYMMDD of last included day
+MONTHLY_HEADER_SIZE: int = 12
+MONTHLY_HISTORY: int = 36
+PM_HISTORY: int = 60  # minutes
+FIXED_POLL_PERIOD: int = 300  # ms poll period when adaptive polling is off
+VOLATILITY_WEIGHT: int = 4  # P_REGULATION change is smoothed over about this many frames
+ES_HISTORY: int = 24  # hours
+# wattmeter registers clearing the minute, hour and day energy counters when 1 is written to them,
+# register i is reset for the clock event bit 1 << i
+RESET_REGISTERS: tuple = (100, 101, 102)
+STATE_FILE: str = 'wattmeter_state.bin'
+STATE_MAGIC: bytes = b'WRW1'
+# magic, saved at, start up time, closed minute, closed day (year, month, day), pending resets, relay,
+# target power, relay timeout, boost timeout, Pm values, Es values
+STATE_HEADER: str = '<4sIIIHBBBBihhHH'
+STATE_HEADER_SIZE: int = 34
+STATE_PERIOD: int = 5  # minutes between snapshots
+STATE_MAX_AGE: int = 900  # seconds, an older snapshot or one from before an RTC reset is ignored
 
 
 class Wattmeter:
 
-    def __init__(self, wattmeter_interface, config: OrderedDict[str, str]):
+    def __init__(self, wattmeter_interface, config: OrderedDict[str, str], clock: Clock):
         self.relay: Pin = Pin(19, Pin.OUT)
         self.wattmeter_interface = wattmeter_interface
         self.data_layer: DataLayer = DataLayer()
-        self.daily_consumption: str = 'daily_consumption.dat'
-        self.time_init: bool = False
-        self.time_offset: bool = False
-        self.last_minute: int = 0
-        self.last_hour: int = 0
-        self.last_day: int = 0
-        self.last_month: int = 0
-        self.last_year: int = 0
-        self.average_power: list = []
-        self.start_up_time: int = 0
+        self.daily_consumption: str = 'daily_consumption.bin'
+        self.monthly_consumption: str = 'monthly_consumption.bin'
+        self.clock: Clock = clock
+        self.pending_resets: int = 0  # clock events whose counters were not read and reset yet
+        self.closed_day: tuple = ()  # (year, month, day) waiting for its daily record
+        self.closed_minute: int = 0  # seconds of the minute waiting for its time series record
+        self.time_series: TimeSeries = TimeSeries()
+        self.frame_decoder: FrameDecoder = FrameDecoder()
+        self.loop_stats: LoopStats = LoopStats()
+        self.last_regulation_power: int | None = None
         self.config = config
         self.data_layer.data['ID'] = self.config.data['ID']
         self.logger = ulogging.getLogger("Wattmeter")
 
         self.regulation = Regulation(wattmeter=self, config=self.config)
+        self.clock.subscribe(MINUTE | HOUR | DAY | SYNC, self.rollover)
+        self.restore_state()
 
-        if int(self.config.data['sw,TESTING SOFTWARE']) == 1:
+        if self.config.snapshot.testing_software:
             self.logger.setLevel(ulogging.DEBUG)
         else:
             self.logger.setLevel(ulogging.INFO)
 
-        self.file_handler = FileHandler(debug=int(self.config.data['sw,TESTING SOFTWARE']))
+        self.file_handler = FileHandler(debug=int(self.config.snapshot.testing_software), monthly_file=self.monthly_consumption)
+        self.file_handler.migrate(LEGACY_DAILY_CONSUMPTION, self.daily_consumption)
 
     async def wattmeter_handler(self, inverter_data=None) -> None:
 
-        if (self.time_offset is False) and self.time_init:
-            self.start_up_time = time.time()
-            self.last_minute = int(time.localtime()[4])
-            self.last_day = int(time.localtime()[2])
-            self.last_month = int(time.localtime()[1])
-            self.last_year = int(time.localtime()[0])
-            self.data_layer.data['D'] = self.file_handler.read_data(self.daily_consumption)
-            self.data_layer.data["M"] = self.file_handler.get_monthly_energy(self.daily_consumption)
-            self.time_offset = True
-
-        self.data_layer.data['RUN_TIME'] = time.time() - self.start_up_time
-        curent_year: str = str(time.localtime()[0])[-2:]
-        self.data_layer.data['WATTMETER_TIME'] = (
-            "{0:02}.{1:02}.{2}  {3:02}:{4:02}:{5:02}".format(time.localtime()[2], time.localtime()[1], curent_year,
-                                                             time.localtime()[3], time.localtime()[4],
-                                                             time.localtime()[5]))
-
-        await self.__read_wattmeter_data(6002, 22)
-        battery_soc = inverter_data['soc'] if inverter_data is not None else None
-        self.regulation.run(hour=time.localtime()[3], minute=time.localtime()[4], power=self.data_layer.data['P_REGULATION'], soc=battery_soc)
+        self.clock.tick()
+        now: tuple = self.clock.now
+        self.data_layer.data['RUN_TIME'] = self.clock.seconds - self.clock.start_up_time
+        self.data_layer.data['WATTMETER_TIME'] = self.clock.text
 
-        if (self.last_minute != int(time.localtime()[4])) and self.time_init:
-            minute_energy: int = self.data_layer.data['E1_P_min'] - self.data_layer.data['E1_N_min']
-            if len(self.data_layer.data["Pm"]) < 61:
-                self.data_layer.data["Pm"].append(minute_energy * 6)
-            else:
-                self.data_layer.data["Pm"] = self.data_layer.data["Pm"][1:]
-                self.data_layer.data["Pm"].append(minute_energy * 6)
+        # regulate right after a valid frame, a failed read must not repeat the last control step on stale power
+        # and leaves the rollovers pending, their counters are read and reset in the next successful transaction
+        resets: int = self.pending_resets
+        if not await self.__read_wattmeter_data(6002, 22, resets):
+            self.data_layer.commit()
+            return
 
-            self.data_layer.data["Pm"][0] = len(self.data_layer.data["Pm"])
-
-            async with self.wattmeter_interface as w:
-                await w.write_wattmeter_register(100, [1])
-
-            self.last_minute = int(time.localtime()[4])
-
-        if self.time_init:
-            if self.last_hour != int(time.localtime()[3]):
-
-                async with self.wattmeter_interface as w:
-                    await w.write_wattmeter_register(101, [1])
+        self.pending_resets = 0
+        battery_soc = inverter_data['soc'] if inverter_data is not None else None
+        started: int = ticks_us()
+        self.regulation.run(hour=now[3], minute=now[4], power=self.data_layer.data['P_REGULATION'], soc=battery_soc)
+        self.loop_stats.regulation.add(ticks_diff(ticks_us(), started))
+        self.update_volatility(self.data_layer.data['P_REGULATION'])
+        self.time_series.sample(self.data_layer.data['P1'], self.data_layer.data['P_TUV'])
 
-                self.last_hour = int(time.localtime()[3])
-                if len(self.data_layer.data["Es"]) < 97:
-                    self.data_layer.data["Es"].append(self.last_hour)
-                    self.data_layer.data["Es"].append(self.data_layer.data['E1_P_hour'])
-                    self.data_layer.data["Es"].append(self.data_layer.data['E_TUV_hour'])
-                    self.data_layer.data["Es"].append(self.data_layer.data['HDO'])
-                else:
-                    self.data_layer.data["Es"] = self.data_layer.data["Es"][4:]
-                    self.data_layer.data["Es"].append(self.last_hour)
-                    self.data_layer.data["Es"].append(self.data_layer.data['E1_P_hour'])
-                    self.data_layer.data["Es"].append(self.data_layer.data['E_TUV_hour'])
-                    self.data_layer.data["Es"].append(self.data_layer.data['HDO'])
+        if resets & MINUTE:
+            minute_energy: int = self.data_layer.data['E1_P_min'] - self.data_layer.data['E1_N_min']
+            self.data_layer.pm.append(minute_energy * 6)
+            self.time_series.append(self.closed_minute, minute_energy * 6, self.data_layer.data['E_TUV_min'] * 6,
+                                    self.data_layer.data['HDO'])
 
-                self.data_layer.data["Es"][0] = len(self.data_layer.data["Es"])
+        if self.clock.synced:
+            if resets & HOUR:
+                self.data_layer.es.append(now[3], self.data_layer.data['E1_P_hour'],
+                                          self.data_layer.data['E_TUV_hour'], self.data_layer.data['HDO'])
 
             else:
-                if len(self.data_layer.data["Es"]) < 97:
-                    self.data_layer.data["Es"][len(self.data_layer.data["Es"]) - 3] = self.data_layer.data['E1_P_hour']
-                    self.data_layer.data["Es"][len(self.data_layer.data["Es"]) - 2] = self.data_layer.data['E_TUV_hour']
-                    self.data_layer.data["Es"][len(self.data_layer.data["Es"]) - 1] = self.data_layer.data['HDO']
-                else:
-                    self.data_layer.data["Es"][94] = self.data_layer.data['E1_P_hour']
-                    self.data_layer.data["Es"][95] = self.data_layer.data['E_TUV_hour']
-                    self.data_layer.data["Es"][96] = self.data_layer.data['HDO']
-
-        if (self.last_day != int(time.localtime()[2])) and self.time_init and self.time_offset:
-            day: dict = {("{0:02}/{1:02}/{2}".format(self.last_month, self.last_day, str(self.last_year)[-2:])): [
-                self.data_layer.data["E1_P_day"], self.data_layer.data["E1_N_day"], self.data_layer.data["E_TUV_day"]]}
-            async with self.wattmeter_interface as w:
-                await w.write_wattmeter_register(102, [1])
-
-            self.last_year = int(time.localtime()[0])
-            self.last_month = int(time.localtime()[1])
-            self.last_day = int(time.localtime()[2])
-            self.file_handler.write_data(self.daily_consumption, day)
-            self.data_layer.data["D"] = self.file_handler.read_data(self.daily_consumption)
-            self.data_layer.data["M"] = self.file_handler.get_monthly_energy(self.daily_consumption)
-
-    async def __read_wattmeter_data(self, reg: int, length: int) -> None:
+                self.data_layer.es.set_last(1, self.data_layer.data['E1_P_hour'])
+                self.data_layer.es.set_last(2, self.data_layer.data['E_TUV_hour'])
+                self.data_layer.es.set_last(3, self.data_layer.data['HDO'])
+
+        if resets & DAY:
+            day: tuple = self.closed_day
+            energy: list = [self.data_layer.data["E1_P_day"], self.data_layer.data["E1_N_day"], self.data_layer.data["E_TUV_day"]]
+            self.file_handler.write_data(self.daily_consumption, day, energy)
+
+        if resets & MINUTE and now[4] % STATE_PERIOD == 0:
+            self.save_state()
+
+        self.data_layer.commit()
+
+    def save_state(self) -> None:
+        """
+        Snapshot of the histories, regulation state and rollover markers, it lets a reset with
+        a running RTC continue without waiting for NTP and with the charts filled.
+        """
+        if not self.clock.synced:
+            return
+        regulation = self.regulation
+        pm: list = self.data_layer.pm.export(self.data_layer.data["Pm"])
+        es: list = self.data_layer.es.export(self.data_layer.data["Es"])
+        pm_count: int = max(0, pm[0] - 1)
+        es_count: int = max(0, es[0] - 1)
+        try:
+            with open(STATE_FILE + ".tmp", "wb") as f:
+                f.write(struct.pack(STATE_HEADER, STATE_MAGIC, self.clock.seconds, self.clock.start_up_time,
+                                    self.closed_minute, *(self.closed_day or (0, 0, 0)), self.pending_resets,
+                                    regulation.relay.value(), int(regulation.target_power), regulation.relay_timeout_cnt,
+                                    regulation.boost_timeout_cnt, pm_count, es_count))
+                f.write(struct.pack("<{}i".format(pm_count), *pm[1:pm_count + 1]))
+                f.write(struct.pack("<{}i".format(es_count), *es[1:es_count + 1]))
+            os.rename(STATE_FILE + ".tmp", STATE_FILE)
+        except OSError as e:
+            self.logger.error("Saving state failed: {}".format(e))
+
+    def restore_state(self) -> None:
+        try:
+            with open(STATE_FILE, "rb") as f:
+                header: bytes = f.read(STATE_HEADER_SIZE)
+                if len(header) != STATE_HEADER_SIZE:
+                    return
+                (magic, saved_at, start_up_time, closed_minute, year, month, day, pending_resets, relay, target_power,
+                 relay_timeout, boost_timeout, pm_count, es_count) = struct.unpack(STATE_HEADER, header)
+                if magic != STATE_MAGIC or not saved_at <= self.clock.seconds < saved_at + STATE_MAX_AGE:
+                    return
+                values: bytes = f.read(4 * (pm_count + es_count))
+        except OSError:
+            return
+        if len(values) != 4 * (pm_count + es_count) or es_count % self.data_layer.es.width:
+            return
+        self.logger.info("Restoring state saved {} s ago.".format(self.clock.seconds - saved_at))
+        values = struct.unpack("<{}i".format(pm_count + es_count), values)
+        for i in range(0, pm_count):
+            self.data_layer.pm.append(values[i])
+        for i in range(pm_count, pm_count + es_count, self.data_layer.es.width):
+            self.data_layer.es.append(*values[i:i + self.data_layer.es.width])
+
+        regulation = self.regulation
+        regulation.target_power = target_power
+        regulation.relay_timeout_cnt = relay_timeout
+        regulation.boost_timeout_cnt = boost_timeout
+        if relay:
+            regulation.relay.on()
+            self.data_layer.data["RELAY"] = 1
+        self.pending_resets = pending_resets
+        self.closed_minute = closed_minute
+        self.closed_day = (year, month, day) if year else ()
+        # publishes the minutes, hours and days which passed during the reboot
+        self.clock.resume(saved_at, start_up_time)
+        self.data_layer.commit()
+
+    # Clock subscriber, rollovers after the time sync queue the counter resets for the next transaction.
+    # The first hour record starts right at the sync.
+    def rollover(self, events: int) -> None:
+        if not self.clock.synced:
+            return
+        if events & SYNC:
+            self.pending_resets = HOUR
+            return
+        if events & MINUTE and not self.pending_resets & MINUTE:
+            self.closed_minute = self.clock.seconds - self.clock.now[5] - 60
+        if events & DAY and not self.pending_resets & DAY:
+            self.closed_day = self.clock.previous[:3]
+        self.pending_resets |= events
+
+    # Read the frame and, when it arrived, write the counter resets in the same lock acquisition.
+    # Resets are only sent after a good frame, otherwise the closed period would be lost unread.
+    async def __read_wattmeter_data(self, reg: int, length: int, resets: int = 0) -> bool:
 
         try:
             async with self.wattmeter_interface as w:
+                started: int = ticks_us()
                 receive_data = await w.read_wattmeter_register(reg, length)
+                self.loop_stats.uart_rtt.add(ticks_diff(ticks_us(), started))
+                if resets and len(receive_data) >= length * 2:
+                    for start, values in self.reset_writes(resets):
+                        await w.write_wattmeter_register(start, values)
 
             if (len(receive_data) >= length * 2) and (reg == 6002):
-
-                hdo_input: int = int(((receive_data[0]) << 8) | (receive_data[1]))
-                if hdo_input == 1 and '1' == self.config.data['sw,AC IN ACTIVE: HIGH']:
-                    self.data_layer.data['HDO'] = 1
-                elif hdo_input == 0 and '0' == self.config.data['sw,AC IN ACTIVE: HIGH']:
-                    self.data_layer.data['HDO'] = 1
+                data: dict = self.data_layer.data
+                self.frame_decoder.decode(receive_data, data)
+
+                hdo_input: int = data['HDO']
+                if hdo_input == 1 and self.config.snapshot.ac_in_active_high:
+                    data['HDO'] = 1
+                elif hdo_input == 0 and not self.config.snapshot.ac_in_active_high:
+                    data['HDO'] = 1
                 else:
-                    self.data_layer.data['HDO'] = 0
-
-                self.data_layer.data['I1'] = int(((receive_data[2]) << 8) | (receive_data[3]))
-
-                self.average_power.append(int(((receive_data[4]) << 8) | (receive_data[5])))
-                if len(self.average_power) > 5:
-                    self.average_power = self.average_power[1:]
-                actual_power: int = 0
-                count: int = 0
-                for power in self.average_power:
-                    actual_power += (power - 65536) if power > 32767 else power
-                    count += 1
-                self.data_layer.data['P1'] = int(actual_power / count)
-                self.data_layer.data['U1'] = int(((receive_data[6]) << 8) | (receive_data[7]))
-                self.data_layer.data['E1_P_min'] = int(((receive_data[8]) << 8) | (receive_data[9]))
-                self.data_layer.data['E1_N_min'] = int(((receive_data[10]) << 8) | (receive_data[11]))
-                self.data_layer.data['E1_P_hour'] = int(((receive_data[12]) << 8) | (receive_data[13]))
-                self.data_layer.data['E1_N_hour'] = int(((receive_data[14]) << 8) | (receive_data[15]))
-                self.data_layer.data['E1_P_day'] = int(((receive_data[16]) << 8) | (receive_data[17]))
-                self.data_layer.data['E1_N_day'] = int(((receive_data[18]) << 8) | (receive_data[19]))
-                self.data_layer.data['E1_P'] = int(
-                    (receive_data[22] << 24) | (receive_data[23] << 16) | (receive_data[20] << 8) | receive_data[21])
-                self.data_layer.data['E1_N'] = int(
-                    (receive_data[26] << 24) | (receive_data[27] << 16) | (receive_data[24] << 8) | receive_data[25])
-                self.data_layer.data['I_TUV'] = int(((receive_data[28]) << 8) | (receive_data[29]))
-                self.data_layer.data['P_TUV'] = int(((receive_data[30]) << 8) | (receive_data[31]))
-                self.data_layer.data['E_TUV_min'] = int(((receive_data[32]) << 8) | (receive_data[33]))
-                self.data_layer.data['E_TUV_hour'] = int(((receive_data[34]) << 8) | (receive_data[35]))
-                self.data_layer.data['E_TUV_day'] = int(((receive_data[36]) << 8) | (receive_data[37]))
-                self.data_layer.data['P_REGULATION'] = int(((receive_data[38]) << 8) | (receive_data[39]))
-                self.data_layer.data['E_TUV'] = int(
-                    (receive_data[42] << 24) | (receive_data[43] << 16) | (receive_data[40] << 8) | receive_data[41])
+                    data['HDO'] = 0
+
+                self.loop_stats.valid_frames += 1
+                return True
 
             else:
                 self.logger.debug("Timed out waiting for result.")
 
         except Exception as e:
             self.logger.error("Exception: {}. UART is probably not connected.".format(e))
+        self.loop_stats.invalid_frames += 1
+        return False
+
+    @staticmethod
+    def reset_writes(resets: int) -> list:
+        """
+        Group the reset registers selected by the resets mask into runs of adjacent registers,
+        each run is written as one multi register frame, e.g. a new hour clears 100 and 101 at once.
+        """
+        writes: list = []
+        for i in range(0, len(RESET_REGISTERS)):
+            if resets & (1 << i):
+                if writes and writes[-1][0] + len(writes[-1][1]) == RESET_REGISTERS[i]:
+                    writes[-1][1].append(1)
+                else:
+                    writes.append((RESET_REGISTERS[i], [1]))
+        return writes
+
+    def update_volatility(self, power: int) -> None:
+        if power > 32767:
+            power -= 65536
+        if self.last_regulation_power is not None:
+            change: int = abs(power - self.last_regulation_power)
+            self.loop_stats.volatility += (change - self.loop_stats.volatility) // VOLATILITY_WEIGHT
+        self.last_regulation_power = power
+
+    def poll_delay(self, cycle_ms: int) -> int:
+        """
+        Milliseconds to sleep before the next cycle which took cycle_ms, so cycles start once per period.
+        In adaptive mode the period moves from POLL-CEILING towards POLL-FLOOR as the surplus changes
+        by up to one regulation step between frames, and never drops below twice the UART round trip.
+        """
+        config = self.config.snapshot
+        if not config.adaptive_polling:
+            self.loop_stats.period = FIXED_POLL_PERIOD
+            return max(0, FIXED_POLL_PERIOD - cycle_ms)
+        step: int = max(1, int(config.power_step))
+        volatility: int = min(self.loop_stats.volatility, step)
+        period: int = config.poll_ceiling - (config.poll_ceiling - config.poll_floor) * volatility // step
+        period = max(period, 2 * self.loop_stats.uart_rtt.last // 1000, config.poll_floor)
+        self.loop_stats.period = period
+        return max(0, period - cycle_ms)
 
     def negotiation_relay(self):
         if self.relay.value():
             self.relay.off()
             self.data_layer.data["RELAY"] = 0
+            self.data_layer.commit()
             return False
         else:
             self.relay.on()
             self.data_layer.data["RELAY"] = 1
+            self.data_layer.commit()
             return True
 
 
 class DataLayer:
     def __str__(self) -> dict:
+        # minute and hour histories are kept in ring buffers and copied into the reused JSON lists on demand
+        self.pm.export(self.data["Pm"])
+        self.es.export(self.data["Es"])
         return self.data
 
     def __init__(self) -> None:
@@ -207,108 +313,224 @@ class DataLayer:
         self.data['E_TUV_day'] = 0
         self.data['E_TUV'] = 0
         self.data['P_REGULATION'] = 0
-        self.data["Pm"] = [0]  # minute power
-        self.data["Es"] = [0]  # Hour energy
-        self.data['D'] = []  # Daily energy
-        self.data['M'] = []  # Monthly energy
+        self.data["Pm"] = [0]  # minute power, [length, P...]
+        self.data["Es"] = [0]  # Hour energy, [length, hour, E1_P_hour, E_TUV_hour, HDO, ...]
+        self.pm: RingBuffer = RingBuffer(PM_HISTORY)
+        self.es: RingBuffer = RingBuffer(ES_HISTORY, 4)
         self.data['RUN_TIME'] = 0
         self.data['WATTMETER_TIME'] = 0
         self.data['ID'] = 0
+        self.version: int = 0  # incremented by commit() after every change of data
+        self.tracker: ChangeTracker = ChangeTracker()
+        self.pm_version: int = 0
+        self.es_version: int = 0
+
+    # Mark the end of a cycle, readers serialise the data once per version
+    def commit(self) -> None:
+        # the JSON lists of the rings are filled in place on export, their changes are tracked by ring version
+        if self.pm.version != self.pm_version:
+            self.pm_version = self.pm.version
+            self.tracker.touch("Pm")
+        if self.es.version != self.es_version:
+            self.es_version = self.es.version
+            self.tracker.touch("Es")
+        self.version = self.tracker.commit(self.data)
 
 
 class FileHandler:
-    def __init__(self, debug: int) -> None:
+    """
+    Daily energy history stored as fixed-width binary records behind a small header,
+    so the last N days or any date range are reached with a seek instead of reading the whole file.
+    Monthly sums are kept in a separate rollup file which is updated with every appended day.
+    """
+
+    def __init__(self, debug: int, monthly_file: str) -> None:
         self.logger = ulogging.getLogger("FileHandler")
         if debug == 1:
             self.logger.setLevel(ulogging.DEBUG)
         else:
             self.logger.setLevel(ulogging.INFO)
+        self.buffer: bytearray = bytearray(DAILY_RECORD_SIZE)
+        self.monthly_file: str = monthly_file
+        self.monthly_loaded: bool = False
+        self.months: list = []  # [year, month, P, N, TUV] of the last MONTHLY_HISTORY months
+        self.months_through: int = 0  # YYYYMMDD of the last day included in self.months
 
-    def read_data(self, file: str):
+    def record_count(self, file: str) -> int:
         try:
-            b = mem_free()
-            csv_gen = self.csv_reader(file)
-            row_count = 0
-            data = []
-            for row in csv_gen:
-                collect()
-                row_count += 1
-
-            csv_gen = self.csv_reader(file)
-            cnt = 0
-            for i in csv_gen:
-                cnt += 1
-                if cnt > row_count - 31:
-                    data.append(i.replace("\n", ""))
-                collect()
-            self.logger.debug("Mem free before:{}; after:{}; difference:{} ".format(b, mem_free(), b - mem_free()))
-            return data
-        except Exception as e:
-            self.logger.error("Read wattmeter data error: {}.".format(e))
-            return []
-
-    def csv_reader(self, file_name: str):
-        for row in open(file_name, "r"):
-            try:
-                yield row
-            except StopIteration:
+            size: int = os.stat(file)[6]
+            with open(file, "rb") as f:
+                header: bytes = f.read(DAILY_HEADER_SIZE)
+        except OSError:
+            return 0
+        # a foreign or older file counts as missing, readers see no records and the next write starts it over
+        if len(header) != DAILY_HEADER_SIZE:
+            return 0
+        magic, record_size, reserved = struct.unpack(DAILY_HEADER, header)
+        if magic != DAILY_MAGIC or record_size != DAILY_RECORD_SIZE:
+            return 0
+        # a torn append leaves a partial record at the end, it is ignored and later overwritten
+        return max(0, (size - DAILY_HEADER_SIZE) // DAILY_RECORD_SIZE)
+
+    @staticmethod
+    def format_day(record: tuple) -> str:
+        year, month, day, positive, negative, boiler = record
+        return "{:02}/{:02}/{:02}:[{},{},{}]".format(month, day, year % 100, positive, negative, boiler)
+
+    @staticmethod
+    def format_month(record: list) -> str:
+        year, month, positive, negative, boiler = record
+        return "{}/{}:[{},{},{}]".format(month, year % 100, positive, negative, boiler)
+
+    def read_records(self, file: str, first: int, last: int):
+        first = max(0, first)
+        if first >= last:
+            return
+        with open(file, "rb") as f:
+            f.seek(DAILY_HEADER_SIZE + first * DAILY_RECORD_SIZE)
+            for i in range(first, last):
+                if f.readinto(self.buffer) != DAILY_RECORD_SIZE:
+                    return
+                yield struct.unpack(DAILY_RECORD, self.buffer)
+
+    def read_range(self, file: str, start: int, end: int):
+        """
+        Yield (year, month, day, P, N, TUV) records with start <= YYYYMMDD <= end.
+        """
+        first, last = self.range_bounds(file, start, end)
+        yield from self.read_records(file, first, last)
+
+    def range_bounds(self, file: str, start: int, end: int) -> tuple:
+        """
+        Record indexes [first, last) of the days start <= YYYYMMDD <= end, found by bisection.
+        """
+        count: int = self.record_count(file)
+        if count == 0:
+            return 0, 0
+        return self.find_record(file, count, start), self.find_record(file, count, end + 1)
+
+    def find_record(self, file: str, count: int, key: int) -> int:
+        # records are appended in date order, bisect for the first record with date >= key
+        low: int = 0
+        high: int = count
+        with open(file, "rb") as f:
+            while low < high:
+                middle: int = (low + high) // 2
+                f.seek(DAILY_HEADER_SIZE + middle * DAILY_RECORD_SIZE)
+                f.readinto(self.buffer)
+                year, month, day = struct.unpack_from(DAILY_DATE, self.buffer)
+                if year * 10000 + month * 100 + day < key:
+                    low = middle + 1
+                else:
+                    high = middle
+        return low
+
+    def read_months(self, file: str, start: int, end: int) -> list:
+        """
+        [year, month, P, N, TUV] of the rollup months with start <= YYYYMM <= end.
+        """
+        if not self.monthly_loaded:
+            self.load_monthly(file)
+        months: list = []
+        for month in self.months:
+            if start <= month[0] * 100 + month[1] <= end:
+                months.append(month)
+        return months
+
+    def load_monthly(self, file: str) -> None:
+        """
+        Load the persisted monthly rollup, it is rebuilt from the daily history of file only when
+        it is missing, corrupt or does not end with the last recorded day.
+        """
+        self.monthly_loaded = True
+        count: int = self.record_count(file)
+        through: int = 0
+        if count > 0:
+            for year, month, day, positive, negative, boiler in self.read_records(file, count - 1, count):
+                through = year * 10000 + month * 100 + day
+        try:
+            with open(self.monthly_file, "rb") as f:
+                header = f.read(MONTHLY_HEADER_SIZE)
+                payload = f.read()
+            magic, months, checksum, months_through = struct.unpack(MONTHLY_HEADER, header)
+            if (magic == MONTHLY_MAGIC and months <= MONTHLY_HISTORY and len(payload) == months * DAILY_RECORD_SIZE
+                    and sum(payload) & 0xFFFF == checksum and months_through == through):
+                self.months = []
+                for i in range(0, months):
+                    year, month, day, positive, negative, boiler = struct.unpack_from(DAILY_RECORD, payload, i * DAILY_RECORD_SIZE)
+                    self.months.append([year, month, positive, negative, boiler])
+                self.months_through = months_through
                 return
+        except (OSError, ValueError):
+            pass
+        self.logger.info("Rebuilding monthly energy from {}.".format(file))
+        self.rebuild_monthly(file, count)
+
+    def rebuild_monthly(self, file: str, count: int) -> None:
+        self.months = []
+        self.months_through = 0
+        for year, month, day, positive, negative, boiler in self.read_records(file, 0, count):
+            self.add_monthly(year, month, day, positive, negative, boiler)
+        self.write_monthly()
+
+    def add_monthly(self, year: int, month: int, day: int, positive: int, negative: int, boiler: int) -> None:
+        if len(self.months) > 0 and self.months[-1][0] == year and self.months[-1][1] == month:
+            last: list = self.months[-1]
+            last[2] += positive
+            last[3] += negative
+            last[4] += boiler
+        else:
+            if len(self.months) >= MONTHLY_HISTORY:
+                self.months.pop(0)
+            self.months.append([year, month, positive, negative, boiler])
+        self.months_through = year * 10000 + month * 100 + day
+
+    def write_monthly(self) -> None:
+        payload: bytearray = bytearray(len(self.months) * DAILY_RECORD_SIZE)
+        for i in range(0, len(self.months)):
+            year, month, positive, negative, boiler = self.months[i]
+            struct.pack_into(DAILY_RECORD, payload, i * DAILY_RECORD_SIZE, year, month, 0, positive, negative, boiler)
+        # write a complete copy next to the old one and swap it in, so a reset never leaves a torn rollup
+        with open(self.monthly_file + ".tmp", "wb") as f:
+            f.write(struct.pack(MONTHLY_HEADER, MONTHLY_MAGIC, len(self.months), sum(payload) & 0xFFFF, self.months_through))
+            f.write(payload)
+        os.rename(self.monthly_file + ".tmp", self.monthly_file)
+
+    def write_data(self, file: str, date: tuple, energy: list) -> None:
+        count: int = self.record_count(file)
+        if count == 0:
+            with open(file, "wb") as f:
+                f.write(struct.pack(DAILY_HEADER, DAILY_MAGIC, DAILY_RECORD_SIZE, 0))
+        with open(file, "r+b") as f:
+            f.seek(DAILY_HEADER_SIZE + count * DAILY_RECORD_SIZE)
+            f.write(struct.pack(DAILY_RECORD, date[0], date[1], date[2], energy[0], energy[1], energy[2]))
+        if not self.monthly_loaded:
+            self.load_monthly(file)
+        else:
+            self.add_monthly(date[0], date[1], date[2], energy[0], energy[1], energy[2])
+            self.write_monthly()
 
-    def get_monthly_energy(self, file: str) -> list[str]:
-        energy: list[str] = []
-        last_month: int = 0
-        last_year: int = 0
-        positive_energy: int = 0
-        negative_energy: int = 0
-        boiler_energy: int = 0
-
+    def migrate(self, text_file: str, file: str) -> None:
+        """
+        One-shot conversion of the former MM/DD/YY:[P,N,TUV] text history into the binary store.
+        """
         try:
-            b = mem_free()
-            csv_gen = self.csv_reader(file)
-            for line in csv_gen:
-                line = line.replace("\n", "").replace("/", ":").replace("[", "").replace("]", "").replace(",",
-                                                                                                          ":").replace(
-                    " ", "").split(":")
-                self.logger.debug("Mem free before:{}; after:{}; difference:{} ".format(b, mem_free(), b - mem_free()))
-                if last_month == 0:
-                    last_month = int(line[0])
-                    last_year = int(line[2])
-
-                if last_month != int(line[0]):
-                    if len(energy) >= 36:
-                        energy = energy[1:]
-
-                    energy.append("{}/{}:[{},{},{}]".format(last_month, last_year, positive_energy, negative_energy,
-                                                            boiler_energy))
-
-                    positive_energy = 0
-                    negative_energy = 0
-                    boiler_energy = 0
-                    last_month = int(line[0])
-                    last_year = int(line[2])
-
-                positive_energy += int(line[3])
-                negative_energy += int(line[4])
-                boiler_energy += int(line[5])
-                collect()
-
-            if len(energy) >= 36:
-                energy = energy[1:]
-            energy.append(
-                "{}/{}:[{},{},{}]".format(last_month, last_year, positive_energy, negative_energy, boiler_energy))
-
-            if energy is None:
-                return []
-            return energy
-
-        except Exception as e:
-            self.logger.error("Get monthly energy error: {}.".format(e))
-            return []
-
-    def write_data(self, file: str, data: dict[str, list]) -> None:
-        lines = []
-        for variable, value in data.items():
-            lines.append(("%s:%s\n" % (variable, value)).replace(" ", ""))
-
-        with open(file, "a+") as f:
-            f.write(''.join(lines))
+            os.stat(text_file)
+        except OSError:
+            return
+        if self.record_count(file) == 0:
+            self.logger.info("Migrating {} to {}.".format(text_file, file))
+            # convert into a temporary file first, an interrupted migration is simply repeated on next boot
+            with open(file + ".tmp", "wb") as out:
+                out.write(struct.pack(DAILY_HEADER, DAILY_MAGIC, DAILY_RECORD_SIZE, 0))
+                for line in open(text_file, "r"):
+                    try:
+                        date, values = line.strip().replace(" ", "").split(":")
+                        month, day, year = date.split("/")
+                        positive, negative, boiler = values.strip("[]").split(",")
+                        out.write(struct.pack(DAILY_RECORD, 2000 + int(year), int(month), int(day), int(positive),
+                                              int(negative), int(boiler)))
+                    except ValueError:
+                        self.logger.error("Skipping malformed history line: {}".format(line))
+            os.rename(file + ".tmp", file)
+        os.rename(text_file, text_file + ".old")
@@ -0,0 +1,53 @@
+from main.register_map import RegisterMap, LITTLE_ENDIAN, BIG_ENDIAN
+
+AVERAGE_SAMPLES: int = 5
+
+# Frame of 22 registers at 6002, 32-bit counters are sent low word first.
+# field, address, count, scale, divisor, signed, word order
+WATTMETER_MAP: RegisterMap = RegisterMap((
+    ('HDO', 6002, 1, 1, 1, False, BIG_ENDIAN),
+    ('I1', 6003, 1, 1, 1, False, BIG_ENDIAN),
+    ('P1', 6004, 1, 1, 1, True, BIG_ENDIAN),
+    ('U1', 6005, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_P_min', 6006, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_N_min', 6007, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_P_hour', 6008, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_N_hour', 6009, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_P_day', 6010, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_N_day', 6011, 1, 1, 1, False, BIG_ENDIAN),
+    ('E1_P', 6012, 2, 1, 1, False, LITTLE_ENDIAN),
+    ('E1_N', 6014, 2, 1, 1, False, LITTLE_ENDIAN),
+    ('I_TUV', 6016, 1, 1, 1, False, BIG_ENDIAN),
+    ('P_TUV', 6017, 1, 1, 1, False, BIG_ENDIAN),
+    ('E_TUV_min', 6018, 1, 1, 1, False, BIG_ENDIAN),
+    ('E_TUV_hour', 6019, 1, 1, 1, False, BIG_ENDIAN),
+    ('E_TUV_day', 6020, 1, 1, 1, False, BIG_ENDIAN),
+    ('P_REGULATION', 6021, 1, 1, 1, False, BIG_ENDIAN),
+    ('E_TUV', 6022, 2, 1, 1, False, LITTLE_ENDIAN),
+))
+
+
+class FrameDecoder:
+    """
+    Decodes the 6002 frame into the wattmeter data, P1 is the average of the last AVERAGE_SAMPLES
+    samples kept in a preallocated ring. Kept apart from main.wattmeter so it runs without machine.
+    """
+
+    def __init__(self) -> None:
+        self.average_power: list = [0] * AVERAGE_SAMPLES
+        self.average_index: int = 0
+        self.average_count: int = 0
+
+    def decode(self, receive_data: bytes, data: dict) -> None:
+        WATTMETER_MAP.decode_frame(receive_data, data)
+        self.average_power[self.average_index] = data['P1']
+        self.average_index = (self.average_index + 1) % AVERAGE_SAMPLES
+        if self.average_count < AVERAGE_SAMPLES:
+            self.average_count += 1
+        actual_power: int = 0
+        for power in self.average_power:
+            actual_power += power
+        if actual_power < 0:
+            data['P1'] = -(-actual_power // self.average_count)
+        else:
+            data['P1'] = actual_power // self.average_count
@@ -1,10 +1,21 @@
 import picoweb
 from machine import reset, RTC
-from time import time
 import ujson as json
 from gc import collect, mem_free
 import uasyncio as asyncio
 import ulogging
+import os
+from main.pages.manifest import PAGES
+
+MAX_EVENT_CLIENTS: int = 3  # open /events streams, every one of them holds a socket and a task
+EVENT_KEEPALIVE: int = 15  # seconds without new data before a comment line keeps the stream alive
+PAGE_CHUNK: int = 512  # bytes read from flash and written to the socket at once
+PAGE_MAX_AGE: int = 86400  # seconds a browser may use a page without asking, afterwards it revalidates by ETag
+HISTORY_PAGE: int = 31  # default number of days or months per /history page
+HISTORY_MAX_PAGE: int = 62
+SERIES_STEP: int = 900  # default /series bucket in seconds
+SERIES_WINDOW: int = 86400  # default /series window ending now
+MAX_DELTA_GAP: int = 600  # versions behind (about 3 minutes) after which the full snapshot is sent instead of a delta
 
 
 class WebServerApp:
@@ -17,6 +28,19 @@ class WebServerApp:
         self.port = 8000
         self.datalayer = dict()
         self.setting = setting
+        # /updateData body is serialised once per (wattmeter, inverter) version and shared by all clients
+        self.boot_id: str = ''.join('{:02x}'.format(b) for b in os.urandom(4))
+        self.data_version: tuple = None
+        self.data_json: bytes = b''
+        self.data_etag: bytes = b''
+        # last /updateData?since= answer, clients polling at the same pace share it
+        self.delta_key: tuple = None
+        self.delta_json: bytes = b''
+        # /events streams wait on data_event, notify() sets it and replaces it with a fresh one
+        self.data_event = asyncio.Event()
+        self.event_clients: int = 0
+        # awrite copies the data into the stream buffer, so all page downloads can share one chunk buffer
+        self.page_buffer: bytearray = bytearray(PAGE_CHUNK)
         self.routes = [
             ("/", self.main),
             ("/datatable", self.data_table),
@@ -24,6 +48,10 @@ class WebServerApp:
             ("/updateWificlient", self.update_wificlient),
             ("/updateSetting", self.update_setting),
             ("/updateData", self.update_data),
+            ("/events", self.events),
+            ("/history", self.history),
+            ("/series", self.series),
+            ("/loopStats", self.loop_stats),
             ("/settings", self.settings),
             ("/powerChart", self.power_chart),
             ("/energyChart", self.energy_chart),
@@ -38,32 +66,46 @@ class WebServerApp:
         else:
             self.logger.setLevel(ulogging.INFO)
 
-    def main(self, req, resp) -> None:
-        collect()
-        yield from picoweb.start_response(resp)
-        yield from self.app.render_template(resp, "main.html")
+    async def main(self, req, resp) -> None:
+        await self.send_page(req, resp, "main.html")
 
-    def over_view(self, req, resp) -> None:
-        collect()
-        yield from picoweb.start_response(resp)
-        yield from self.app.render_template(resp, "overview.html")
+    async def over_view(self, req, resp) -> None:
+        await self.send_page(req, resp, "overview.html")
 
-    def settings(self, req, resp) -> None:
-        collect()
-        yield from picoweb.start_response(resp)
-        yield from self.app.render_template(resp, "settings.html", (req,))
+    async def settings(self, req, resp) -> None:
+        await self.send_page(req, resp, "settings.html", (req,))
 
-    def power_chart(self, req, resp) -> None:
-        collect()
-        yield from picoweb.start_response(resp)
-        yield from self.app.render_template(resp, "powerChart.html", (req,))
+    async def power_chart(self, req, resp) -> None:
+        await self.send_page(req, resp, "powerChart.html", (req,))
 
-    def energy_chart(self, req, resp) -> None:
-        collect()
-        yield from picoweb.start_response(resp)
-        yield from self.app.render_template(resp, "energyChart.html", (req,))
+    async def energy_chart(self, req, resp) -> None:
+        await self.send_page(req, resp, "energyChart.html", (req,))
+
+    # Send the prebuilt gzip page in PAGE_CHUNK pieces, render the template only for clients without gzip
+    async def send_page(self, req, resp, page: str, args: tuple = ()) -> None:
+        file, etag, size = PAGES[page]
+        headers = {"ETag": etag, "Cache-Control": "max-age={}".format(PAGE_MAX_AGE), "Vary": "Accept-Encoding"}
+        if req.headers.get(b"If-None-Match") == etag.encode():
+            await picoweb.start_response(resp, "text/html; charset=utf-8", "304", headers)
+            return
+        if b"gzip" not in req.headers.get(b"Accept-Encoding", b""):
+            collect()
+            await picoweb.start_response(resp)
+            await self.app.render_template(resp, page, args)
+            return
 
-    def modbus_rw(self, req, resp) -> None:
+        headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(size)
+        await picoweb.start_response(resp, "text/html; charset=utf-8", headers=headers)
+        buffer = self.page_buffer
+        with open(file, "rb") as f:
+            while True:
+                length = f.readinto(buffer)
+                if not length:
+                    break
+                await resp.awrite(buffer, 0, length)
+
+    async def modbus_rw(self, req, resp) -> None:
         collect()
         if req.method == "POST":
             datalayer: dict = {}
@@ -100,10 +142,10 @@ class WebServerApp:
                     except Exception as e:
                         datalayer = {"process": e}
 
-            yield from picoweb.start_response(resp, "application/json")
-            yield from resp.awrite(json.dumps(datalayer))
+            await picoweb.start_response(resp, "application/json")
+            await resp.awrite(json.dumps(datalayer))
 
-    def update_data(self, req, resp) -> None:
+    async def update_data(self, req, resp) -> None:
         collect()
         datalayer = {}
         if req.method == "POST":
@@ -119,26 +161,194 @@ class WebServerApp:
                     rtc = RTC()
                     rtc.datetime((int(i["time"][2]), int(i["time"][1]), int(i["time"][0]), 0, int(i["time"][3]),
                                   int(i["time"][4]), int(i["time"][5]), 0))
-                    self.wattmeter.start_up_time = time()
-                    self.wattmeter.time_init = True
+                    self.wattmeter.clock.sync()
                     datalayer = {"process": "OK"}
-            yield from picoweb.jsonify(resp, datalayer)
+            await picoweb.jsonify(resp, datalayer)
 
         else:
-            merged_dict = self.wattmeter.data_layer.__str__()
+            # /updateData?since=<ETag> returns only the keys changed after that snapshot
+            version: tuple = self.get_data_version()
+            etag: bytes = self.get_data_etag(version)
+            headers = {"ETag": etag.decode(), "Cache-Control": "no-cache"}
+            if req.headers.get(b"If-None-Match") == etag:
+                await picoweb.start_response(resp, "application/json", "304", headers)
+                return
+            body = None
+            if req.qs:
+                req.parse_qs()
+                body = self.get_data_delta(req.form.get("since", ""), version)
+            if body is None:
+                body, etag = self.get_data_snapshot()
+                headers["X-Update"] = "full"
+            else:
+                headers["X-Update"] = "delta"
+            await picoweb.start_response(resp, "application/json", headers=headers)
+            await resp.awrite(body)
+
+    def get_data_version(self) -> tuple:
+        inverter_version: int = self.inverter.data_layer.version if self.inverter else 0
+        return self.wattmeter.data_layer.version, inverter_version
+
+    def get_data_etag(self, version: tuple) -> bytes:
+        return '"{}-{}-{}"'.format(self.boot_id, version[0], version[1]).encode()
+
+    def get_data_snapshot(self) -> tuple:
+        version: tuple = self.get_data_version()
+        if version != self.data_version:
+            # merge into a fresh dict, the live data layers are never modified by readers
+            merged_dict: dict = {}
+            merged_dict.update(self.wattmeter.data_layer.__str__())
             if self.inverter:
                 merged_dict.update(self.inverter.data_layer.__str__())
-
-            merged_json = json.dumps(merged_dict)
-            yield from picoweb.start_response(resp, "application/json")
-            yield from resp.awrite(merged_json)
+            self.data_json = json.dumps(merged_dict).encode()
+            self.data_etag = self.get_data_etag(version)
+            self.data_version = version
+            merged_dict = None
             collect()
+        return self.data_json, self.data_etag
+
+    # Keys changed since the snapshot tagged since, None when the full snapshot has to be sent
+    def get_data_delta(self, since: str, version: tuple) -> bytes | None:
+        try:
+            boot_id, watt_since, inverter_since = since.strip('"').split("-")
+            watt_since, inverter_since = int(watt_since), int(inverter_since)
+        except ValueError:
+            return None
+        if boot_id != self.boot_id or watt_since > version[0] or inverter_since > version[1]:
+            return None
+        if (version[0] - watt_since) + (version[1] - inverter_since) > MAX_DELTA_GAP:
+            return None
+
+        key: tuple = (watt_since, inverter_since, version)
+        if key != self.delta_key:
+            delta: dict = {}
+            watt_layer = self.wattmeter.data_layer
+            watt_layer.tracker.delta(watt_layer.__str__(), watt_since, delta)
+            if self.inverter:
+                self.inverter.data_layer.tracker.delta(self.inverter.data_layer.data, inverter_since, delta)
+            self.delta_json = json.dumps(delta).encode()
+            self.delta_key = key
+        return self.delta_json
 
-    def update_wificlient(self, req, resp) -> None:
+    # /history?type=daily|monthly&from=YYYYMMDD&to=YYYYMMDD&page=0&size=31
+    # Streams {"type", "page", "size", "total", "data": [...]} with entries in the former D/M format,
+    # daily records are read from flash one by one and written in PAGE_CHUNK sized pieces.
+    async def history(self, req, resp) -> None:
+        req.parse_qs()
+        try:
+            kind: str = req.form.get("type", "daily")
+            start: int = int(req.form.get("from", 0))
+            end: int = int(req.form.get("to", 99991231))
+            page: int = max(0, int(req.form.get("page", 0)))
+            size: int = min(max(1, int(req.form.get("size", HISTORY_PAGE))), HISTORY_MAX_PAGE)
+        except ValueError:
+            await picoweb.http_error(resp, "400")
+            return
+
+        file_handler = self.wattmeter.file_handler
+        if kind == "monthly":
+            months: list = file_handler.read_months(self.wattmeter.daily_consumption, start // 100, end // 100)
+            total: int = len(months)
+            entries = (file_handler.format_month(month) for month in months[page * size:(page + 1) * size])
+        elif kind == "daily":
+            first, last = file_handler.range_bounds(self.wattmeter.daily_consumption, start, end)
+            total = last - first
+            first += page * size
+            records = file_handler.read_records(self.wattmeter.daily_consumption, first, min(last, first + size))
+            entries = (file_handler.format_day(record) for record in records)
+        else:
+            await picoweb.http_error(resp, "400")
+            return
+
+        await picoweb.start_response(resp, "application/json", headers={"Cache-Control": "no-cache"})
+        chunk: str = '{{"type":"{}","page":{},"size":{},"total":{},"data":['.format(kind, page, size, total)
+        separator: str = ''
+        for entry in entries:
+            chunk += separator + '"' + entry + '"'
+            separator = ','
+            if len(chunk) >= PAGE_CHUNK:
+                await resp.awrite(chunk)
+                chunk = ''
+        await resp.awrite(chunk + ']}')
+
+    # /series?from=YYYYMMDDhhmm&to=YYYYMMDDhhmm&step=<s> min/max/avg buckets of the minute power log
+    async def series(self, req, resp) -> None:
+        time_series = self.wattmeter.time_series
+        req.parse_qs()
+        try:
+            end: int = self.wattmeter.clock.seconds
+            if "to" in req.form:
+                end = time_series.to_seconds(int(req.form["to"]))
+            start: int = end - SERIES_WINDOW
+            if "from" in req.form:
+                start = time_series.to_seconds(int(req.form["from"]))
+            step: int = max(1, int(req.form.get("step", SERIES_STEP)))
+        except (ValueError, OverflowError):
+            await picoweb.http_error(resp, "400")
+            return
+
+        level, step = time_series.plan(start, end, step)
+        await picoweb.start_response(resp, "application/json", headers={"Cache-Control": "no-cache"})
+        chunk: str = ('{{"from":{},"to":{},"step":{},"fields":["time","P_min","P_max","P_avg","TUV_min","TUV_max",'
+                      '"TUV_avg","minutes","HDO_minutes"],"data":[').format(time_series.to_stamp(start), time_series.to_stamp(end), step)
+        separator: str = ''
+        for bucket in time_series.query(start, end, step):
+            chunk += '{}[{},{},{},{},{},{},{},{},{}]'.format(separator, time_series.to_stamp(bucket[0]), *bucket[1:])
+            separator = ','
+            if len(chunk) >= PAGE_CHUNK:
+                await resp.awrite(chunk)
+                chunk = ''
+        await resp.awrite(chunk + ']}')
+
+    # Timing of the wattmeter/regulation loop, /loopStats?reset=1 starts a new measurement window
+    async def loop_stats(self, req, resp) -> None:
+        stats = self.wattmeter.loop_stats
+        datalayer: dict = stats.as_dict()
+        if req.qs:
+            req.parse_qs()
+            if req.form.get("reset") == "1":
+                stats.reset()
+        await picoweb.start_response(resp, "application/json", headers={"Cache-Control": "no-cache"})
+        await resp.awrite(json.dumps(datalayer))
+
+    # Wake all /events streams, called after every wattmeter and inverter cycle
+    def notify(self) -> None:
+        event = self.data_event
+        self.data_event = asyncio.Event()
+        event.set()
+
+    # Server-Sent Events stream, one message with the /updateData snapshot per new version
+    async def events(self, req, resp) -> None:
+        if self.event_clients >= MAX_EVENT_CLIENTS:
+            await picoweb.start_response(resp, "text/plain", "503", {"Retry-After": str(EVENT_KEEPALIVE)})
+            return
+        self.event_clients += 1
+        try:
+            await picoweb.start_response(resp, "text/event-stream", headers={"Cache-Control": "no-cache"})
+            await resp.awrite("retry: 3000\n\n")
+            sent_version = None
+            while True:
+                event = self.data_event
+                body, etag = self.get_data_snapshot()
+                if self.data_version != sent_version:
+                    sent_version = self.data_version
+                    await resp.awrite(b"id: " + etag.strip(b'"') + b"\ndata: ")
+                    await resp.awrite(body)
+                    await resp.awrite(b"\n\n")
+                try:
+                    await asyncio.wait_for(event.wait(), EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await resp.awrite(b": keepalive\n\n")
+        except OSError as e:
+            self.logger.debug("Event stream closed: {}".format(e))
+        finally:
+            self.event_clients -= 1
+
+    async def update_wificlient(self, req, resp) -> None:
         collect()
         if req.method == "POST":
             size = int(req.headers[b"Content-Length"])
-            qs = yield from req.reader.read(size)
+            qs = await req.reader.read(size)
             req.qs = qs.decode()
             try:
                 i = json.loads(req.qs)
@@ -148,8 +358,8 @@ class WebServerApp:
             self.ip_address = self.wifi_manager.get_ip()
             datalayer = {"process": datalayer, "ip": self.ip_address}
 
-            yield from picoweb.start_response(resp, "application/json")
-            yield from resp.awrite(json.dumps(datalayer))
+            await picoweb.start_response(resp, "application/json")
+            await resp.awrite(json.dumps(datalayer))
 
         else:
             client = self.wifi_manager.getSSID()
@@ -158,10 +368,10 @@ class WebServerApp:
                 if client[i] > -86 and len(i) > 0:
                     datalayer[i] = client[i]
             datalayer["connectSSID"] = self.wifi_manager.getCurrentConnectSSID()
-            yield from picoweb.start_response(resp, "application/json")
-            yield from resp.awrite(json.dumps(datalayer))
+            await picoweb.start_response(resp, "application/json")
+            await resp.awrite(json.dumps(datalayer))
 
-    def update_setting(self, req, resp) -> None:
+    async def update_setting(self, req, resp) -> None:
         collect()
         if req.method == "POST":
             datalayer = {}
@@ -169,30 +379,30 @@ class WebServerApp:
 
             for i in req.form:
                 i = json.loads(i)
+                if i["variable"] == 'bt,RESET PV-ROUTER':
+                    self.wattmeter.save_state()
                 datalayer = self.setting.handle_configure(i["variable"], i["value"])
                 datalayer = {"process": datalayer}
 
-            yield from picoweb.start_response(resp, "application/json")
-            yield from resp.awrite(json.dumps(datalayer))
+            await picoweb.start_response(resp, "application/json")
+            await resp.awrite(json.dumps(datalayer))
 
         else:
             datalayer = self.setting.get_config()
-            yield from picoweb.start_response(resp, "application/json")
-            yield from resp.awrite(json.dumps(datalayer))
+            await picoweb.start_response(resp, "application/json")
+            await resp.awrite(json.dumps(datalayer))
 
-    def data_table(self, req, resp) -> None:
-        collect()
-        yield from picoweb.start_response(resp)
-        yield from self.app.render_template(resp, "datatable.html", (req,))
+    async def data_table(self, req, resp) -> None:
+        await self.send_page(req, resp, "datatable.html", (req,))
 
-    def get_esp_id(self, req, resp) -> None:
+    async def get_esp_id(self, req, resp) -> None:
         datalayer = {"ID": " PV-router: {}".format(self.setting.get_config()['ID']), "IP": self.wifi_manager.get_ip()}
-        yield from picoweb.start_response(resp, "application/json")
-        yield from resp.awrite(json.dumps(datalayer))
+        await picoweb.start_response(resp, "application/json")
+        await resp.awrite(json.dumps(datalayer))
 
-    def process_msg(self, req) -> dict:
+    async def process_msg(self, req) -> dict:
         size = int(req.headers[b"Content-Length"])
-        qs = yield from req.reader.read(size)
+        qs = await req.reader.read(size)
         req.qs = qs.decode()
         req.parse_qs()
         return req
@@ -0,0 +1,17 @@
+"""
+Host stand-in of micropython-async asyn.Lock, the delay_ms polling interval is not needed on CPython.
+"""
+import asyncio
+
+
+class Lock(asyncio.Lock):
+
+    def __init__(self, delay_ms: int = 0) -> None:
+        super().__init__()
+        self.delay_ms: int = delay_ms
+        self.acquisitions: int = 0
+
+    async def acquire(self) -> bool:
+        result: bool = await super().acquire()
+        self.acquisitions += 1
+        return result
@@ -0,0 +1,13 @@
+"""
+Host stand-in of the OTA bootloader.
+"""
+VERSION: str = "sim"
+
+
+class Bootloader:
+
+    def __init__(self, url: str, token: str = "") -> None:
+        self.url: str = url
+
+    def get_version(self, directory: str) -> str:
+        return VERSION
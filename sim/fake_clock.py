@@ -0,0 +1,44 @@
+"""
+Simulated wall clock shared by the stand-in modules.
+
+Starts at a configurable date and runs `speed` times faster than the host, so a day of
+minute, hour and day roll-overs can be replayed in minutes. The clock is naive like the
+ESP32 RTC, localtime() is the time the firmware wrote into the RTC.
+"""
+import calendar
+import time as host_time
+
+_monotonic = host_time.monotonic
+
+
+class FakeClock:
+
+    def __init__(self, start: tuple = (2024, 6, 1, 10, 0, 0), speed: float = 1.0) -> None:
+        self.speed: float = speed
+        self.base: float = 0
+        self.started: float = 0
+        self.set(start)
+
+    # Seconds since 1970-01-01 on the simulated clock
+    def time(self) -> float:
+        return self.base + (_monotonic() - self.started) * self.speed
+
+    def localtime(self, secs: float | None = None) -> host_time.struct_time:
+        return host_time.gmtime(self.time() if secs is None else secs)
+
+    # Move the clock to (year, month, day, hour, minute, second)
+    def set(self, date: tuple) -> None:
+        self.base = self.mktime(date)
+        self.started = _monotonic()
+
+    @staticmethod
+    def mktime(date: tuple) -> float:
+        year, month, day, hour, minute, second = date[:6]
+        return calendar.timegm((year, month, day, hour, minute, second, 0, 0, 0))
+
+    # Host seconds needed to advance the simulated clock by seconds
+    def host_seconds(self, seconds: float) -> float:
+        return seconds / self.speed
+
+
+clock: FakeClock = FakeClock()
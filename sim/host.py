@@ -0,0 +1,34 @@
+"""
+Puts the stand-in modules in front of the firmware imports and patches the few CPython
+built-in modules the firmware uses with MicroPython-only functions.
+
+    import host
+    host.install(start=(2024, 6, 1, 10, 0, 0), speed=60)
+    from main.task_handler import TaskHandler
+"""
+import gc
+import os
+import sys
+import time
+
+SIM_DIR: str = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR: str = os.path.dirname(SIM_DIR)
+HEAP_SIZE: int = 110000  # free heap reported by gc.mem_free, roughly an ESP32 with the firmware loaded
+
+
+def install(start: tuple | None = None, speed: float = 1.0) -> None:
+    for path in (ROOT_DIR, SIM_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+
+    from fake_clock import clock
+    if start is not None:
+        clock.set(start)
+    clock.speed = speed
+
+    # firmware reads wall time through time.time() and time.localtime() as well as utime
+    time.time = lambda: int(clock.time())
+    time.localtime = clock.localtime
+    gc.mem_free = lambda: HEAP_SIZE
+    gc.mem_alloc = lambda: 0
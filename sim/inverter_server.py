@@ -0,0 +1,192 @@
+"""
+Modbus TCP inverter simulator for the drivers in main/inverters.
+
+Each InverterServer listens on one loopback address (127.0.0.x needs no alias on Linux) and
+serves the identification block the driver probes while scanning together with the
+telemetry registers of the driver's REGISTER_MAP, encoded from engineering values.
+Latency, dropped requests, refused or reset connections and silent hosts are configurable,
+so discovery, polling and reconnects can be measured against a whole simulated subnet.
+
+    python sim/inverter_server.py goodwe --host 127.0.0.120 --port 1502
+"""
+import argparse
+import asyncio
+import os
+import random
+import struct
+import sys
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import host
+    host.install()
+
+READ_HOLDING_REGISTERS: int = 0x03
+READ_INPUT_REGISTERS: int = 0x04
+ILLEGAL_FUNCTION: int = 0x01
+ILLEGAL_DATA_ADDRESS: int = 0x02
+GATEWAY_TARGET_FAILED: int = 0x0B
+
+
+def ascii_pairs(text: str, count: int) -> list:
+    # two characters per register, high byte first, padded with zero registers
+    text = text[:count * 2]
+    words: list = [(ord(text[i]) << 8) | (ord(text[i + 1]) if i + 1 < len(text) else 0) for i in range(0, len(text), 2)]
+    return words + [0] * (count - len(words))
+
+
+def ascii_chars(text: str, count: int) -> list:
+    # one character per register, like the RS485/TCP converter
+    words: list = [ord(c) for c in text[:count]]
+    return words + [0] * (count - len(words))
+
+
+# vendor: (driver module, slave address, identification address, identification registers)
+VENDORS: dict = {
+    "goodwe": ("main.inverters.goodwe", 1, 35011, ascii_pairs("GW10K-ET", 5)),
+    "solax": ("main.inverters.solax", 1, 0x0, ascii_pairs("H34T10I2345678", 7)),
+    "victron": ("main.inverters.victron", 100, 800, ascii_pairs("c0619ab1e2f3", 6)),
+    "huawei": ("main.inverters.huawei", 1, 30000, ascii_pairs("SUN2000-10KTL-M1", 15)),
+    "rs485": ("main.inverters.rs485_tcp", 1, 50, ascii_chars("-SIM-00042", 12)),
+}
+
+# engineering values as the drivers store them in Datalayer.data
+TELEMETRY: dict = {"soc": 80, "u1": 231, "u2": 229, "u3": 232, "i1": 870, "i2": 860, "i3": 880,
+                   "p1": 2000, "p2": 1980, "p3": 2020}
+
+
+def encode(register_map, values: dict, bank: dict) -> None:
+    """
+    Inverse of RegisterMap.decode, writes raw uint16 words of every mapped field into bank.
+    """
+    for start, qty, decoders in register_map.split_blocks:
+        for field, offset, count, scale, divisor, signed, word_order in decoders:
+            raw: int = int(round(values.get(field, 0) * divisor / scale))
+            address: int = start + offset
+            if count == 2:
+                raw &= 0xFFFFFFFF
+                high, low = raw >> 16, raw & 0xFFFF
+                bank[address], bank[address + 1] = (high, low) if word_order == 0 else (low, high)
+            else:
+                bank[address] = raw & 0xFFFF
+
+
+class InverterServer:
+
+    def __init__(self, vendor: str, host: str = "127.0.0.1", port: int = 502, latency: float = 0.0, drop: float = 0.0,
+                 reset: float = 0.0, silent: bool = False, strict: bool = False, values: dict | None = None, seed: int = 1) -> None:
+        module, self.slave_addr, ident_address, ident = VENDORS[vendor]
+        register_map = __import__(module, None, None, ["REGISTER_MAP"]).REGISTER_MAP
+        self.vendor: str = vendor
+        self.host: str = host
+        self.port: int = port
+        self.latency: float = latency  # seconds before every response
+        self.drop: float = drop  # probability a request is never answered
+        self.reset: float = reset  # probability a new connection is closed right away
+        self.silent: bool = silent  # accept connections but never answer, like a host running something else
+        self.strict: bool = strict  # unmapped registers raise ILLEGAL_DATA_ADDRESS instead of reading 0
+        self.random = random.Random(seed)
+        self.function_code: int = register_map.function_code
+        self.holding: dict = {}
+        self.input: dict = {}
+        for i in range(len(ident)):
+            self.holding[ident_address + i] = ident[i]
+        self.set_values(values or TELEMETRY, register_map)
+        self.server = None
+        self.connections: int = 0
+        self.requests: int = 0
+        self.dropped: int = 0
+
+    def set_values(self, values: dict, register_map=None) -> None:
+        if register_map is None:
+            register_map = __import__(VENDORS[self.vendor][0], None, None, ["REGISTER_MAP"]).REGISTER_MAP
+        encode(register_map, values, self.input if self.function_code == READ_INPUT_REGISTERS else self.holding)
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def handle(self, reader, writer) -> None:
+        self.connections += 1
+        try:
+            if self.reset and self.random.random() < self.reset:
+                return
+            while True:
+                header = await reader.readexactly(12)
+                if self.silent:
+                    continue
+                transaction_id, protocol_id, length, unit_id, function, address, quantity = struct.unpack('>HHHBBHH', header)
+                self.requests += 1
+                if self.drop and self.random.random() < self.drop:
+                    self.dropped += 1
+                    continue
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(self.response(transaction_id, unit_id, function, address, quantity))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    def response(self, transaction_id: int, unit_id: int, function: int, address: int, quantity: int) -> bytes:
+        exception: int = 0
+        words: list = []
+        if unit_id != self.slave_addr:
+            exception = GATEWAY_TARGET_FAILED
+        elif function not in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            exception = ILLEGAL_FUNCTION
+        else:
+            bank: dict = self.holding if function == READ_HOLDING_REGISTERS else self.input
+            for register in range(address, address + quantity):
+                if self.strict and register not in bank:
+                    exception = ILLEGAL_DATA_ADDRESS
+                    break
+                words.append(bank.get(register, 0))
+        if exception:
+            return struct.pack('>HHHBBB', transaction_id, 0, 3, unit_id, function | 0x80, exception)
+        payload: bytes = struct.pack('>{}H'.format(len(words)), *words)
+        return struct.pack('>HHHBBB', transaction_id, 0, 3 + len(payload), unit_id, function, len(payload)) + payload
+
+
+async def start_fleet(servers: list) -> list:
+    for server in servers:
+        await server.start()
+    return servers
+
+
+async def stop_fleet(servers: list) -> None:
+    for server in servers:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("vendor", choices=sorted(VENDORS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1502)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop", type=float, default=0.0)
+    parser.add_argument("--reset", type=float, default=0.0)
+    parser.add_argument("--strict", action="store_true")
+    args = parser.parse_args()
+
+    async def serve():
+        server = InverterServer(args.vendor, args.host, args.port, args.latency, args.drop, args.reset, strict=args.strict)
+        await server.start()
+        print("{} inverter on {}:{}".format(args.vendor, args.host, args.port))
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
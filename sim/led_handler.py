@@ -0,0 +1,20 @@
+"""
+Host stand-in of the LED handler, keeps the error/state bits instead of blinking.
+"""
+import uasyncio as asyncio
+
+
+class LedHandler:
+
+    def __init__(self, pin: int, on_time: int = 1, off_time: int = 2, delta: int = 20) -> None:
+        self.pin: int = pin
+        self.state: int = 0
+
+    def add_state(self, state: int) -> None:
+        self.state |= state
+
+    def remove_state(self, state: int) -> None:
+        self.state &= ~state
+
+    async def led_handler(self) -> None:
+        await asyncio.sleep(0)
@@ -0,0 +1,136 @@
+"""
+Host stand-in of the MicroPython machine module.
+
+Pin, PWM, WDT and RTC record what the firmware does with them, so a simulation can
+inspect outputs (pins[33].pwm.duty()) and count events. RTC reads and sets fake_clock.
+"""
+from collections import deque
+from fake_clock import clock
+
+HISTORY: int = 1000  # recorded changes kept per output
+
+pins: dict = {}  # pin number -> Pin
+watchdogs: list = []
+
+
+class ResetError(SystemExit):
+    pass
+
+
+def reset() -> None:
+    raise ResetError("machine.reset()")
+
+
+def unique_id() -> bytes:
+    return b'\x24\x0a\xc4\x00\x00\x01'
+
+
+class Pin:
+    IN: int = 1
+    OUT: int = 3
+    PULL_UP: int = 2
+    PULL_DOWN: int = 1
+
+    def __new__(cls, pin, mode: int = -1, pull: int = -1, value: int | None = None):
+        # the firmware creates the same pin in several modules, they share one recorder
+        pin = pin.id if isinstance(pin, Pin) else pin
+        if pin not in pins:
+            instance = super().__new__(cls)
+            instance.id = pin
+            instance.level = 0
+            instance.pwm = None
+            instance.history = deque((), HISTORY)
+            pins[pin] = instance
+        return pins[pin]
+
+    def __init__(self, pin, mode: int = -1, pull: int = -1, value: int | None = None) -> None:
+        if value is not None:
+            self.value(value)
+
+    def value(self, value: int | None = None) -> int | None:
+        if value is None:
+            return self.level
+        value = 1 if value else 0
+        if value != self.level:
+            self.level = value
+            self.history.append((clock.time(), value))
+        return None
+
+    def on(self) -> None:
+        self.value(1)
+
+    def off(self) -> None:
+        self.value(0)
+
+    __call__ = value
+
+
+class PWM:
+
+    def __init__(self, pin: Pin, freq: int = 5000, duty: int = 0) -> None:
+        self.pin: Pin = pin if isinstance(pin, Pin) else Pin(pin)
+        self.pin.pwm = self
+        self.frequency: int = freq
+        self.level: int = duty
+        self.history = deque((), HISTORY)
+
+    def freq(self, freq: int | None = None) -> int | None:
+        if freq is None:
+            return self.frequency
+        self.frequency = freq
+        return None
+
+    def duty(self, duty: int | None = None) -> int | None:
+        if duty is None:
+            return self.level
+        if duty != self.level:
+            self.level = duty
+            self.history.append((clock.time(), duty))
+        return None
+
+    def deinit(self) -> None:
+        self.duty(0)
+
+
+class WDT:
+
+    def __init__(self, id: int = 0, timeout: int = 5000) -> None:
+        self.timeout: int = timeout
+        self.last_feed: float = clock.time()
+        self.feeds: int = 0
+        self.misses: int = 0  # feeds which came later than the timeout, the device would have reset
+        watchdogs.append(self)
+
+    def feed(self) -> None:
+        now: float = clock.time()
+        if (now - self.last_feed) * 1000 / clock.speed > self.timeout:
+            self.misses += 1
+        self.last_feed = now
+        self.feeds += 1
+
+
+class RTC:
+
+    def datetime(self, value: tuple | None = None) -> tuple | None:
+        if value is None:
+            year, month, day, hour, minute, second, weekday, yearday = clock.localtime()[:8]
+            return year, month, day, weekday, hour, minute, second, 0
+        year, month, day, weekday, hour, minute, second, subseconds = value
+        clock.set((year, month, day, hour, minute, second))
+        return None
+
+
+class UART:
+
+    def __init__(self, id: int, baudrate: int = 9600, **kwargs) -> None:
+        self.id: int = id
+        self.baudrate: int = baudrate
+
+    def any(self) -> int:
+        return 0
+
+    def read(self, nbytes: int = -1) -> bytes | None:
+        return None
+
+    def write(self, buf: bytes) -> int:
+        return len(buf)
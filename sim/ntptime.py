@@ -0,0 +1,12 @@
+"""
+Host stand-in of ntptime. The fake clock is the time source, a sync only counts calls.
+"""
+calls: int = 0
+fail: bool = False  # make settime() raise to exercise the TIME_SYNC_ERR path
+
+
+def settime() -> None:
+    global calls
+    calls += 1
+    if fail:
+        raise OSError(110, "ETIMEDOUT")
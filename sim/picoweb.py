@@ -0,0 +1,156 @@
+"""
+Host stand-in of picoweb on CPython asyncio streams.
+
+Keeps the picoweb surface the firmware uses: WebApp(pkg, routes).run(), handlers called
+as handler(req, resp) with req.method, req.path, req.qs, req.headers (bytes keys),
+req.reader and req.parse_qs(), resp.awrite(), start_response, jsonify, http_error and
+render_template. Unlike picoweb, run() only starts the server, the caller owns the loop.
+"""
+import json
+import uasyncio as asyncio
+
+
+def unquote_plus(s: str) -> str:
+    s = s.replace("+", " ")
+    parts = s.split("%")
+    out = [parts[0]]
+    for part in parts[1:]:
+        try:
+            out.append(chr(int(part[:2], 16)) + part[2:])
+        except ValueError:
+            out.append("%" + part)
+    return "".join(out)
+
+
+def parse_qs(s: str) -> dict:
+    res: dict = {}
+    if s:
+        for pair in s.split("&"):
+            values = [unquote_plus(x) for x in pair.split("=", 1)]
+            if len(values) == 1:
+                values.append(True)
+            if values[0] in res:
+                if not isinstance(res[values[0]], list):
+                    res[values[0]] = [res[values[0]]]
+                res[values[0]].append(values[1])
+            else:
+                res[values[0]] = values[1]
+    return res
+
+
+class HTTPRequest:
+
+    def __init__(self, reader) -> None:
+        self.reader = reader
+        self.method: str = ""
+        self.path: str = ""
+        self.qs: str = ""
+        self.headers: dict = {}
+        self.form: dict = {}
+
+    def parse_qs(self) -> dict:
+        self.form = parse_qs(self.qs)
+        return self.form
+
+
+class Response:
+    """
+    StreamWriter with the uasyncio v2 awrite/aclose API, counts bytes for measurements.
+    """
+
+    def __init__(self, writer) -> None:
+        self.writer = writer
+        self.sent: int = 0
+
+    async def awrite(self, buf, off: int = 0, sz: int = -1) -> None:
+        if isinstance(buf, str):
+            buf = buf.encode()
+        if off != 0 or sz != -1:
+            buf = memoryview(buf)[off:off + sz if sz >= 0 else None]
+        self.writer.write(bytes(buf))
+        self.sent += len(buf)
+        await self.writer.drain()
+
+    async def aclose(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+async def start_response(writer, content_type: str = "text/html; charset=utf-8", status: str = "200", headers=None) -> None:
+    await writer.awrite("HTTP/1.0 %s NA\r\n" % status)
+    await writer.awrite("Content-Type: ")
+    await writer.awrite(content_type)
+    if not headers:
+        await writer.awrite("\r\n\r\n")
+        return
+    await writer.awrite("\r\n")
+    if isinstance(headers, (bytes, str)):
+        await writer.awrite(headers)
+    else:
+        for k, v in headers.items():
+            await writer.awrite(k)
+            await writer.awrite(": ")
+            await writer.awrite(v)
+            await writer.awrite("\r\n")
+    await writer.awrite("\r\n")
+
+
+async def http_error(writer, status: str) -> None:
+    await start_response(writer, status=status)
+    await writer.awrite(status)
+
+
+async def jsonify(writer, data: dict) -> None:
+    await start_response(writer, "application/json")
+    await writer.awrite(json.dumps(data))
+
+
+class WebApp:
+
+    def __init__(self, pkg, routes: list | None = None, serve_static: bool = True) -> None:
+        self.pkg = pkg
+        self.routes: dict = dict(routes or [])
+        self.server = None
+        self.requests: int = 0
+
+    def run(self, host: str = "127.0.0.1", port: int = 8081, debug: bool = False, lazy_init: bool = False, log=None) -> None:
+        asyncio.get_event_loop().create_task(self.start(host or "127.0.0.1", port))
+
+    async def start(self, host: str, port: int) -> None:
+        self.server = await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader, writer) -> None:
+        resp = Response(writer)
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, proto = request_line.decode().split()
+            req = HTTPRequest(reader)
+            req.method = method
+            path, _, req.qs = path.partition("?")
+            req.path = path
+            while True:
+                line = await reader.readline()
+                if line in (b"", b"\r\n"):
+                    break
+                k, v = line.split(b":", 1)
+                req.headers[k] = v.strip()
+            self.requests += 1
+            handler = self.routes.get(path)
+            if handler is None:
+                await http_error(resp, "404")
+            else:
+                await handler(req, resp)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            await resp.aclose()
+
+    async def render_template(self, writer, tmpl_name: str, args: tuple = ()) -> None:
+        module = __import__("main.template." + tmpl_name.replace(".", "_"), None, None, ["render"])
+        for chunk in module.render(*args):
+            await writer.awrite(chunk)
@@ -0,0 +1,223 @@
+"""
+Closed-loop replay of power traces through Regulation.run.
+
+A trace is a sequence of (net, soc) samples, one per 300 ms regulation tick, where net is the
+grid power without the boiler (house load - PV, W, negative is surplus). The plant adds the
+power given by the SSR1 and SSR2 duties and the relay load when the relay is on, the regulation sees
+the resulting grid power on the next tick, like the wattmeter frame it gets on the device.
+
+Needs host.install() to have been called.
+"""
+import os
+import tempfile
+import time
+
+TICK: float = 0.3  # seconds between Regulation.run calls in interface_handler
+PWM_MAX: int = 1023
+SSR_PIN: int = 33
+SSR2_PIN: int = 23
+RELAY_PIN: int = 19
+STEP: int = 200  # W change of net power between two ticks which counts as a step
+SETTLE_HOLD: float = 3.0  # seconds the boiler has to stay within the band to count as settled
+
+
+class DataLayer:
+    def __init__(self) -> None:
+        self.data: dict = {'HDO': 0, 'RELAY': 0}
+
+
+class Wattmeter:
+    # what Regulation reads from the wattmeter, replay() drives the clock with the trace time
+    def __init__(self) -> None:
+        from main.clock import Clock
+        self.data_layer: DataLayer = DataLayer()
+        self.clock = Clock()
+
+
+def make_config(settings: dict | None = None):
+    """
+    Real Config with defaults, created in a temporary directory so setting.dat of the caller is untouched.
+    """
+    from main.__config__ import Config
+    cwd: str = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="wattrouter-replay-"))
+    try:
+        config = Config()
+        for variable, value in (settings or {}).items():
+            config.handle_configure(variable, value)
+    finally:
+        os.chdir(cwd)
+    return config
+
+
+def lcg(seed: int):
+    # small deterministic generator, gives the same traces on every Python
+    while True:
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        yield seed / 0x7FFFFFFF
+
+
+def step_trace(minutes: int = 20, load: int = 500) -> list:
+    # PV steps every two minutes through levels below, inside and above the boiler range
+    levels: tuple = (3000, 1500, 4200, 800, 2600, 3600, 400, 2000, 5000, 1800)
+    samples: list = []
+    ticks_per_level: int = int(120 / TICK)
+    for i in range(int(minutes * 60 / TICK)):
+        samples.append((load - levels[(i // ticks_per_level) % len(levels)], None))
+    return samples
+
+
+def cloud_trace(minutes: int = 60, load: int = 500, pv: int = 3500, seed: int = 7) -> list:
+    # PV shaded by passing clouds, load with appliances switching on and off
+    random = lcg(seed)
+    samples: list = []
+    shade: float = 0
+    appliance: int = 0
+    for i in range(int(minutes * 60 / TICK)):
+        if next(random) < 0.01:
+            shade = next(random) * 0.8
+        if next(random) < 0.004:
+            appliance = int(next(random) * 2000) if appliance == 0 else 0
+        noise: float = (next(random) - 0.5) * 60
+        samples.append((int(load + appliance - pv * (1 - shade) + noise), None))
+    return samples
+
+
+def load_trace(file: str) -> list:
+    """
+    CSV of recorded ticks: net power W, optional SOC. Lines starting with # are skipped.
+    """
+    samples: list = []
+    with open(file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split(",")
+            samples.append((int(float(fields[0])), int(fields[1]) if len(fields) > 1 and fields[1] else None))
+    return samples
+
+
+def replay(regulation, config, trace: list, start: tuple = (12, 0), measure_allocations: bool = False) -> dict:
+    import machine
+    from fake_clock import FakeClock
+    clock = regulation.wattmeter.clock
+    epoch: int = int(FakeClock.mktime((2024, 6, 1, start[0], start[1], 0)))
+    clock.sync(epoch)
+    ssr = machine.pins[SSR_PIN].pwm
+    relay = machine.Pin(RELAY_PIN)
+    relay.off()
+    snapshot = config.snapshot
+    tuv_power: int = snapshot.tuv_power
+    ssr2_power: int = snapshot.ssr2_power
+    band: float = snapshot.power_step + snapshot.power_hyst  # the step ramp cannot get closer than this
+
+    grid: float = 0
+    exported: float = 0  # Wh sent to the grid
+    imported: float = 0
+    boiler_energy: float = 0
+    surplus_energy: float = 0  # Wh of PV surplus before diversion
+    baseline_import: float = 0  # Wh imported without any diversion
+    latencies: list = []
+    allocated: int = 0
+    reversals: int = 0
+    duty_travel: int = 0
+    last_duty: int = ssr.duty()
+    last_direction: int = 0
+    settle_times: list = []
+    unsettled: int = 0
+    step_at: float | None = None
+    in_band_since: float | None = None
+    last_net: int | None = None
+
+    if measure_allocations:
+        import tracemalloc
+        tracemalloc.start()
+
+    for tick in range(len(trace)):
+        net, soc = trace[tick]
+        seconds: float = tick * TICK
+        minute_of_day: int = (start[0] * 60 + start[1] + int(seconds // 60)) % 1440
+        clock.tick(epoch + int(seconds))
+        power: int = int(grid) & 0xFFFF  # P_REGULATION is unsigned in the frame
+
+        if measure_allocations:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            regulation.run(hour=minute_of_day // 60, minute=minute_of_day % 60, power=power, soc=soc)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        else:
+            begin = time.perf_counter_ns()
+            regulation.run(hour=minute_of_day // 60, minute=minute_of_day % 60, power=power, soc=soc)
+            latencies.append(time.perf_counter_ns() - begin)
+
+        duty: int = min(ssr.duty(), PWM_MAX)
+        ssr2 = machine.pins[SSR2_PIN].pwm if SSR2_PIN in machine.pins else None  # created once SSR2 has a rating
+        boiler: float = duty / PWM_MAX * tuv_power
+        if ssr2 is not None:
+            boiler += min(ssr2.duty(), PWM_MAX) / PWM_MAX * ssr2_power
+        grid = net + boiler + (snapshot.relay_load if relay.value() else 0)
+
+        hours: float = TICK / 3600
+        if grid < 0:
+            exported -= grid * hours
+        else:
+            imported += grid * hours
+        boiler_energy += boiler * hours
+        if net < 0:
+            surplus_energy -= net * hours
+        else:
+            baseline_import += net * hours
+
+        if duty != last_duty:
+            direction: int = 1 if duty > last_duty else -1
+            if last_direction and direction != last_direction:
+                reversals += 1
+            last_direction = direction
+            duty_travel += abs(duty - last_duty)
+            last_duty = duty
+
+        # settling after a step of the net power
+        if last_net is not None and abs(net - last_net) >= STEP:
+            if step_at is not None:
+                unsettled += 1
+            step_at = seconds
+            in_band_since = None
+        last_net = net
+        if step_at is not None:
+            # at the export target, or the boiler saturated on the right side of it
+            if (abs(grid - snapshot.overflow_limit) <= band or (boiler == 0 and grid >= snapshot.overflow_limit)
+                    or (boiler >= snapshot.pwm_capacity and grid <= snapshot.overflow_limit)):
+                if in_band_since is None:
+                    in_band_since = seconds
+                elif seconds - in_band_since >= SETTLE_HOLD:
+                    settle_times.append(in_band_since - step_at)
+                    step_at = None
+            else:
+                in_band_since = None
+
+    if measure_allocations:
+        tracemalloc.stop()
+
+    minutes: float = len(trace) * TICK / 60
+    metrics: dict = {
+        "ticks": len(trace),
+        "exported_wh": exported,
+        "imported_wh": imported,
+        "boiler_wh": boiler_energy,
+        "extra_import_wh": imported - baseline_import,  # import caused by the diversion itself
+        "capture": 1 - exported / surplus_energy if surplus_energy else 1.0,  # share of surplus used on site
+        "steps": len(settle_times) + unsettled + (1 if step_at is not None else 0),
+        "settle_mean_s": sum(settle_times) / len(settle_times) if settle_times else None,
+        "settle_max_s": max(settle_times) if settle_times else None,
+        "unsettled": unsettled + (1 if step_at is not None else 0),
+        "reversals_per_min": reversals / minutes if minutes else 0,
+        "duty_travel_per_tick": duty_travel / len(trace) if trace else 0,
+    }
+    if measure_allocations:
+        metrics["bytes_per_call"] = allocated / len(trace)
+    else:
+        latencies.sort()
+        metrics["latency_mean_us"] = sum(latencies) / len(latencies) / 1000
+        metrics["latency_p99_us"] = latencies[int(len(latencies) * 0.99)] / 1000
+    return metrics
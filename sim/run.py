@@ -0,0 +1,71 @@
+"""
+Boot the whole firmware on CPython against the simulated hardware.
+
+    python sim/run.py --duration 60 --speed 60 --port 8000
+
+Settings and energy history are written to --data (a new temporary directory by default),
+the web server listens on 127.0.0.1:--port.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import host
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=0, help="host seconds to run, 0 runs until interrupted")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per host second")
+    parser.add_argument("--start", default="2024-06-01T10:00:00", help="simulated start time")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data", default=None, help="working directory for setting.dat and history files")
+    parser.add_argument("--load", type=float, default=500, help="house load W")
+    parser.add_argument("--pv", type=float, default=3000, help="PV production W")
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args()
+
+
+def boot(args):
+    date, clock_time = args.start.split("T")
+    start = tuple(int(x) for x in date.split("-")) + tuple(int(x) for x in clock_time.split(":"))
+    host.install(start=start, speed=args.speed)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    os.chdir(args.data or tempfile.mkdtemp(prefix="wattrouter-sim-"))
+
+    import uasyncio as asyncio
+    import wattmeter_com_interface
+    from wifi_manager import FakeWifiManager
+    from main.task_handler import TaskHandler
+
+    wattmeter_com_interface.meter.load = args.load
+    wattmeter_com_interface.meter.pv = args.pv
+    handler = TaskHandler(FakeWifiManager())
+    handler.web_server_app.port = args.port
+    loop = asyncio.get_event_loop()
+    if args.duration > 0:
+        loop.call_later(args.duration, loop.stop)
+    return handler, loop
+
+
+def main():
+    args = parse_args()
+    handler, loop = boot(args)
+    print("data: {}  web: http://127.0.0.1:{}/".format(os.getcwd(), args.port))
+    try:
+        handler.main_task_handler_run()
+    except KeyboardInterrupt:
+        pass
+    data = handler.wattmeter.data_layer.data
+    print("P1 {} W, P_TUV {} W, E1_P {} Wh, E1_N {} Wh, E_TUV {} Wh".format(
+        data["P1"], data["P_TUV"], data["E1_P"], data["E1_N"], data["E_TUV"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Host stand-in of uasyncio v3 on top of CPython asyncio.
+"""
+from asyncio import *  # noqa: F401,F403
+import asyncio as _asyncio
+
+
+def get_event_loop():
+    # uasyncio has one global loop which exists before anything runs
+    try:
+        return _asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    policy = _asyncio.get_event_loop_policy()
+    try:
+        loop = policy.get_event_loop()
+        if not loop.is_closed():
+            return loop
+    except RuntimeError:
+        pass
+    loop = _asyncio.new_event_loop()
+    _asyncio.set_event_loop(loop)
+    return loop
+
+
+async def sleep_ms(ms: int) -> None:
+    await _asyncio.sleep(ms / 1000)
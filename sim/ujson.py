@@ -0,0 +1,4 @@
+"""
+Host stand-in of ujson.
+"""
+from json import dumps, loads, dump, load  # noqa: F401
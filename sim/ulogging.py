@@ -0,0 +1,4 @@
+"""
+Host stand-in of ulogging, the firmware only uses getLogger, setLevel and the level names.
+"""
+from logging import getLogger, basicConfig, DEBUG, INFO, WARNING, ERROR, CRITICAL  # noqa: F401
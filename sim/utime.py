@@ -0,0 +1,45 @@
+"""
+Host stand-in of utime. Wall time comes from fake_clock, ticks from the host monotonic clock.
+"""
+import time as host_time
+from fake_clock import clock
+
+
+def time() -> int:
+    return int(clock.time())
+
+
+def localtime(secs: int | None = None) -> tuple:
+    return tuple(clock.localtime(secs)[:8])
+
+
+def mktime(date: tuple) -> int:
+    return int(clock.mktime(date))
+
+
+def ticks_ms() -> int:
+    return int(host_time.monotonic() * 1000)
+
+
+def ticks_us() -> int:
+    return int(host_time.monotonic() * 1000000)
+
+
+def ticks_add(ticks: int, delta: int) -> int:
+    return ticks + delta
+
+
+def ticks_diff(new: int, old: int) -> int:
+    return new - old
+
+
+def sleep(seconds: float) -> None:
+    host_time.sleep(seconds)
+
+
+def sleep_ms(ms: int) -> None:
+    host_time.sleep(ms / 1000)
+
+
+def sleep_us(us: int) -> None:
+    host_time.sleep(us / 1000000)
@@ -0,0 +1,157 @@
+"""
+Host stand-in of the UART wattmeter interface.
+
+SimulatedWattmeter answers the 22 register frame at 6002 and the minute, hour and day
+counter resets written to 100, 101 and 102, also as one multi register write. Grid power is house load + boiler - PV, the
+boiler power follows the SSR PWM duty the regulation sets on machine pin 33. Load and
+PV are watts or callables of the simulated time in seconds.
+
+Minute counters are kept in 0.1 Wh, so Pm (E_min * 6) comes out in W, the hour, day and
+total counters in Wh.
+"""
+import struct
+import uasyncio as asyncio
+import machine
+from fake_clock import clock
+
+FRAME_START: int = 6002
+FRAME_LENGTH: int = 22
+RESET_MINUTE: int = 100
+RESET_HOUR: int = 101
+RESET_DAY: int = 102
+SSR_PIN: int = 33
+PWM_MAX: int = 1023
+
+
+class SimulatedWattmeter:
+
+    def __init__(self, load=500, pv=3000, tuv_power: int = 2200, voltage: int = 230, hdo: int = 1) -> None:
+        self.load = load
+        self.pv = pv
+        self.tuv_power: int = tuv_power
+        self.voltage: int = voltage
+        self.hdo: int = hdo
+        self.registers: dict = {}  # other holding registers, read and written by /modbusRW
+        self.last_update: float = clock.time()
+        self.grid_power: float = 0
+        self.boiler_power: float = 0
+        # energies in Wh, [import, export, boiler]
+        self.minute: list = [0.0, 0.0, 0.0]
+        self.hour: list = [0.0, 0.0, 0.0]
+        self.day: list = [0.0, 0.0, 0.0]
+        self.total: list = [0.0, 0.0, 0.0]
+        self.frames: int = 0
+        self.resets: list = [0, 0, 0]  # minute, hour, day
+
+    @staticmethod
+    def value(source, now: float) -> float:
+        return source(now) if callable(source) else source
+
+    def duty(self) -> int:
+        pin = machine.pins.get(SSR_PIN)
+        return pin.pwm.duty() if pin is not None and pin.pwm is not None else 0
+
+    # Integrate energies from the last update to now with the power of the last interval
+    def update(self) -> None:
+        now: float = clock.time()
+        hours: float = max(0.0, now - self.last_update) / 3600
+        self.last_update = now
+        for counters in (self.minute, self.hour, self.day, self.total):
+            if self.grid_power >= 0:
+                counters[0] += self.grid_power * hours
+            else:
+                counters[1] -= self.grid_power * hours
+            counters[2] += self.boiler_power * hours
+        self.boiler_power = min(self.duty(), PWM_MAX) / PWM_MAX * self.tuv_power
+        self.grid_power = self.value(self.load, now) + self.boiler_power - self.value(self.pv, now)
+
+    def frame(self) -> bytes:
+        self.update()
+        self.frames += 1
+        grid: int = int(self.grid_power)
+        boiler: int = int(self.boiler_power)
+        words: list = [
+            self.hdo,
+            int(abs(grid) * 100 / self.voltage),
+            grid & 0xFFFF,
+            self.voltage,
+            int(self.minute[0] * 10) & 0xFFFF,
+            int(self.minute[1] * 10) & 0xFFFF,
+            int(self.hour[0]) & 0xFFFF,
+            int(self.hour[1]) & 0xFFFF,
+            int(self.day[0]) & 0xFFFF,
+            int(self.day[1]) & 0xFFFF,
+        ]
+        words += self.low_word_first(int(self.total[0]))
+        words += self.low_word_first(int(self.total[1]))
+        words += [
+            int(boiler * 100 / self.voltage),
+            boiler,
+            int(self.minute[2] * 10) & 0xFFFF,
+            int(self.hour[2]) & 0xFFFF,
+            int(self.day[2]) & 0xFFFF,
+            grid & 0xFFFF,
+        ]
+        words += self.low_word_first(int(self.total[2]))
+        return struct.pack(">22H", *words)
+
+    @staticmethod
+    def low_word_first(value: int) -> list:
+        return [value & 0xFFFF, (value >> 16) & 0xFFFF]
+
+    def read(self, reg: int, length: int) -> bytes:
+        if reg == FRAME_START and length == FRAME_LENGTH:
+            return self.frame()
+        return struct.pack(">{}H".format(length), *(self.registers.get(reg + i, 0) for i in range(length)))
+
+    def write(self, reg: int, values: list) -> bytes:
+        self.update()
+        for i in range(len(values)):
+            if reg + i == RESET_MINUTE:
+                self.minute = [0.0, 0.0, 0.0]
+                self.resets[0] += 1
+            elif reg + i == RESET_HOUR:
+                self.hour = [0.0, 0.0, 0.0]
+                self.resets[1] += 1
+            elif reg + i == RESET_DAY:
+                self.day = [0.0, 0.0, 0.0]
+                self.resets[2] += 1
+            else:
+                self.registers[reg + i] = values[i] & 0xFFFF
+        return struct.pack(">{}H".format(len(values)), *(v & 0xFFFF for v in values))
+
+
+meter: SimulatedWattmeter = SimulatedWattmeter()
+
+
+class Interface:
+    """
+    Same API as the firmware interface, `async with interface as w` holds the bus lock.
+    latency is the time of one request/response on the 115200 Bd line.
+    """
+
+    def __init__(self, baudrate: int, lock=None, latency: float = 0.008) -> None:
+        self.baudrate: int = baudrate
+        self.lock = lock
+        self.latency: float = latency
+        self.meter: SimulatedWattmeter = meter
+        self.requests: int = 0
+
+    async def __aenter__(self):
+        if self.lock is not None:
+            await self.lock.acquire()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        if self.lock is not None:
+            self.lock.release()
+
+    async def read_wattmeter_register(self, reg: int, length: int) -> bytes:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return self.meter.read(reg, length)
+
+    async def write_wattmeter_register(self, reg: int, values: list) -> bytes:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return self.meter.write(reg, values)
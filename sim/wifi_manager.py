@@ -0,0 +1,66 @@
+"""
+Fake Wi-Fi manager with the methods TaskHandler and WebServerApp call on the real one.
+"""
+
+
+class FakeWlan:
+
+    def __init__(self, ssid: str) -> None:
+        self.ssid: str = ssid
+        self.ifconfig_value: tuple = ("127.0.0.1", "255.255.255.0", "127.0.0.1", "127.0.0.1")
+
+    def config(self, name: str) -> str:
+        return self.ssid if name == "essid" else ""
+
+    def ifconfig(self, value: tuple | None = None) -> tuple | None:
+        if value is None:
+            return self.ifconfig_value
+        self.ifconfig_value = value
+        return None
+
+    def connect(self, ssid: str, password: str) -> None:
+        self.ssid = ssid
+
+
+class FakeWifiManager:
+
+    def __init__(self, ssid: str = "sim", connected: bool = True, ip: str = "127.0.0.1") -> None:
+        self.connected: bool = connected
+        self.ip: str = ip
+        self.profiles: dict = {ssid: "password"}
+        self.ap: bool = False
+        self.wlan_sta: FakeWlan = FakeWlan(ssid)
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def get_ip(self) -> str:
+        return self.ip if self.connected else "0.0.0.0"
+
+    def read_profiles(self) -> dict:
+        return self.profiles
+
+    def getSSID(self) -> dict:
+        return {self.wlan_sta.ssid: -45}
+
+    def getCurrentConnectSSID(self) -> str:
+        return self.wlan_sta.ssid if self.connected else ""
+
+    async def get_connection(self) -> bool:
+        self.connected = True
+        return True
+
+    async def handle_configure(self, ssid: str, password: str) -> bool:
+        self.profiles[ssid] = password
+        self.wlan_sta.ssid = ssid
+        self.connected = True
+        return True
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+    def turnONAp(self) -> None:
+        self.ap = True
+
+    def turnOfAp(self) -> None:
+        self.ap = False
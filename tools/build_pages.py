@@ -0,0 +1,55 @@
+"""
+Build step for the web pages, run on the host after changing main/template.
+
+Renders every main/template/*_html.py, stores it gzip compressed in main/pages
+and writes main/pages/manifest.py with the file, strong ETag and size of each page.
+Output is reproducible, gzip header carries no name and mtime 0.
+
+    python tools/build_pages.py
+"""
+import gzip
+import hashlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_DIR = os.path.join(ROOT, "main", "template")
+PAGE_DIR = os.path.join(ROOT, "main", "pages")
+SUFFIX = "_html.py"
+
+
+def render(path):
+    scope = {}
+    with open(path) as f:
+        exec(compile(f.read(), path, "exec"), scope)
+    return "".join(scope["render"](None)).encode()
+
+
+def main():
+    pages = []
+    for name in sorted(os.listdir(TEMPLATE_DIR)):
+        if not name.endswith(SUFFIX):
+            continue
+        page = name[:-len(SUFFIX)] + ".html"
+        body = gzip.compress(render(os.path.join(TEMPLATE_DIR, name)), compresslevel=9, mtime=0)
+        with open(os.path.join(PAGE_DIR, page + ".gz"), "wb") as f:
+            f.write(body)
+        etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:16])
+        pages.append((page, etag, len(body)))
+
+    lines = ["# Autogenerated file, run tools/build_pages.py after changing main/template\n",
+             "PAGE_DIR = __file__.rsplit('/', 1)[0] if '/' in __file__ else '.'\n",
+             "\n",
+             "# page: (gzip file, strong ETag, size)\n",
+             "PAGES = {\n"]
+    for page, etag, size in pages:
+        lines.append("    {!r}: (PAGE_DIR + '/{}.gz', {!r}, {}),\n".format(page, page, etag, size))
+    lines.append("}\n")
+    with open(os.path.join(PAGE_DIR, "manifest.py"), "w") as f:
+        f.write("".join(lines))
+    for page, etag, size in pages:
+        print("{:20} {:6} B {}".format(page, size, etag))
+
+
+if __name__ == "__main__":
+    sys.exit(main())